@@ -15,7 +15,7 @@ class Executioner:
     def run(self, plan: Plan) -> ExecutionResult:
         if plan.intent is None:
             result = ExecutionResult(success=False, error="No intent to execute", action_name=None, elapsed_ms=0)
-            self.logger.step("executioner", {"plan": plan.model_dump()}, result.model_dump())
+            self.logger.step("executioner", {"plan": plan}, result)
             return result
 
         start = time.perf_counter()
@@ -69,5 +69,5 @@ class Executioner:
                 elapsed_ms=elapsed_ms,
             )
 
-        self.logger.step("executioner", {"plan": plan.model_dump()}, result.model_dump())
+        self.logger.step("executioner", {"plan": plan}, result)
         return result 
\ No newline at end of file
@@ -23,6 +23,6 @@ class Planner:
         self.logger.step(
             "planner",
             {"user_message": user_message},
-            plan.model_dump(),
+            plan,
         )
         return plan 
\ No newline at end of file
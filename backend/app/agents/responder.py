@@ -61,5 +61,5 @@ class Responder:
             content = self._final_response(plan, result)
 
         message = Message(role="assistant", content=content)
-        self.logger.step("responder", {"plan": plan.model_dump(), "result": (result.model_dump() if result else None)}, message.model_dump())
+        self.logger.step("responder", {"plan": plan, "result": result}, message)
         return message 
\ No newline at end of file
@@ -43,7 +43,7 @@ class Reviewer:
         approved = score >= 5.0  # allow proceeding with clarifications
 
         review = Review(approved=approved, issues=issues, score=score, review_type=ReviewType.plan)
-        self.logger.step("reviewer", {"review_type": "plan", "plan": plan.model_dump()}, review.model_dump())
+        self.logger.step("reviewer", {"review_type": "plan", "plan": plan}, review)
         return review
 
     def review_execution(self, plan: Plan, exec_result: ExecutionResult) -> Review:
@@ -76,7 +76,7 @@ class Reviewer:
         review = Review(approved=approved, issues=issues, score=score, review_type=ReviewType.execution)
         self.logger.step(
             "reviewer",
-            {"review_type": "execution", "plan": plan.model_dump(), "result": exec_result.model_dump()},
-            review.model_dump(),
+            {"review_type": "execution", "plan": plan, "result": exec_result},
+            review,
         )
         return review 
\ No newline at end of file
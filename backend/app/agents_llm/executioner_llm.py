@@ -1,27 +1,34 @@
 from __future__ import annotations
 
+import os
 import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from app.llm.bedrock import call_llm_json, get_bedrock_client
+from app.llm.bedrock import acall_llm_json, call_llm_json, get_bedrock_client
 from app.core.types import Plan, ExecutionResult
 
 
-def execute_plan_llm(plan: Plan) -> ExecutionResult:
-    # Simulate agent/tool availability (80% available)
-    available = random.random() < 0.8
+# Share of simulated agent/tool calls that succeed; the replay tool sets 1.0 for deterministic runs
+LLM_TOOL_AVAILABILITY = float(os.getenv("LLM_TOOL_AVAILABILITY", "0.8"))
+
+
+def _unavailable() -> Optional[ExecutionResult]:
+    # Simulate agent/tool availability (80% available by default)
+    available = random.random() < LLM_TOOL_AVAILABILITY
     if not available:
         return ExecutionResult(success=False, data={}, error="Agent/tool unavailable. Please try again later.")
+    return None
 
-    # Ask LLM to simulate execution; fall back to deterministic mock
-    llm = get_bedrock_client()
-    prompt = f"""
+
+def _execution_prompt(plan: Plan) -> str:
+    return f"""
 You are a banking execution agent. Given this plan, simulate the banking action and return a detailed JSON result. If the plan is invalid, return an error.
 Plan: {plan.model_dump_json()}
 Respond in JSON with keys: success (bool), data (object), error (string or null).
 """
-    parsed = call_llm_json(prompt, llm)
 
+
+def _execution_result(plan: Plan, parsed) -> ExecutionResult:
     if isinstance(parsed, dict):
         success = bool(parsed.get("success", True))
         data = parsed.get("data", {}) if isinstance(parsed.get("data", {}), dict) else {}
@@ -31,4 +38,25 @@ Respond in JSON with keys: success (bool), data (object), error (string or null)
     # Fallback deterministic simulation
     intent = plan.intent.value if plan.intent else "unknown"
     mock_data: Dict[str, Any] = {"intent": intent, **plan.slots}
-    return ExecutionResult(success=True, data=mock_data, error=None) 
\ No newline at end of file
+    return ExecutionResult(success=True, data=mock_data, error=None)
+
+
+def execute_plan_llm(plan: Plan) -> ExecutionResult:
+    unavailable = _unavailable()
+    if unavailable:
+        return unavailable
+
+    # Ask LLM to simulate execution; fall back to deterministic mock
+    llm = get_bedrock_client()
+    parsed = call_llm_json(_execution_prompt(plan), llm, agent="executioner")
+    return _execution_result(plan, parsed)
+
+
+async def aexecute_plan_llm(plan: Plan) -> ExecutionResult:
+    unavailable = _unavailable()
+    if unavailable:
+        return unavailable
+
+    llm = get_bedrock_client()
+    parsed = await acall_llm_json(_execution_prompt(plan), llm, agent="executioner")
+    return _execution_result(plan, parsed)
@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 from typing import Dict, List, Optional
 
+from langchain_aws import ChatBedrock
+
 from app.core.logger import SessionLogger
 from app.core.types import INTENT_TO_REQUIRED_SLOTS, IntentName, Plan
-from app.llm.bedrock import call_llm_json, get_bedrock_client
+from app.llm.bedrock import acall_llm_json, call_llm_json, get_bedrock_client
 from app.core.nlu import detect_intent, extract_slots
 
 
@@ -18,13 +20,23 @@ PLANNER_PROMPT = (
 
 
 class LLMPlanner:
-    def __init__(self, logger: SessionLogger) -> None:
+    def __init__(self, logger: SessionLogger, llm: Optional[ChatBedrock] = None) -> None:
+        # Holds no per-turn resources: the client comes from the shared registry
         self.logger = logger
-        self.llm = get_bedrock_client()
+        self.llm = llm or get_bedrock_client()
+
+    def _prompt(self, user_message: str) -> str:
+        return PLANNER_PROMPT + f"\nUser: {user_message}\nJSON:"
 
     def run(self, user_message: str) -> Plan:
-        prompt = PLANNER_PROMPT + f"\nUser: {user_message}\nJSON:"
-        raw = call_llm_json(prompt, self.llm)
+        raw = call_llm_json(self._prompt(user_message), self.llm, agent="planner")
+        return self._build_plan(user_message, raw)
+
+    async def arun(self, user_message: str) -> Plan:
+        raw = await acall_llm_json(self._prompt(user_message), self.llm, agent="planner")
+        return self._build_plan(user_message, raw)
+
+    def _build_plan(self, user_message: str, raw) -> Plan:
         intent: Optional[IntentName] = None
         slots: Dict[str, Optional[str]] = {}
         try:
@@ -51,5 +63,5 @@ class LLMPlanner:
             missing = rb_missing
 
         plan = Plan(intent=intent, slots=slots, missing_slots=missing, rationale="LLM extracted plan (with rule-based fallback if needed)")
-        self.logger.step("planner_llm", {"user_message": user_message}, plan.model_dump())
-        return plan 
\ No newline at end of file
+        self.logger.step("planner_llm", {"user_message": user_message}, plan)
+        return plan
@@ -1,21 +1,43 @@
 from __future__ import annotations
 
-from app.llm.bedrock import call_llm_json, get_bedrock_client
+from typing import AsyncIterator
+
+from app.llm.bedrock import acall_llm_json, astream_llm_text, call_llm_json, get_bedrock_client
 from app.core.types import ExecutionResult
 
 
-def summarize_result_llm(execution_result: ExecutionResult) -> str:
-    llm = get_bedrock_client()
-    prompt = f"""
+def _summary_prompt(execution_result: ExecutionResult) -> str:
+    return f"""
 You are a banking assistant. Be empathetic and concise.
 Summarize the execution result for the user in 1–2 short sentences. Avoid extra detail, no code, no JSON, no system messages.
 If there was an error, apologize briefly and explain in one sentence.
 Execution Result: {execution_result.model_dump_json()}
 Respond ONLY with the final user-facing message.
 """
-    response = call_llm_json(prompt, llm)
+
+
+def _summary_text(response) -> str:
     if isinstance(response, str):
         return response.strip()
     if isinstance(response, dict) and 'message' in response:
         return str(response['message']).strip()
-    return "Thanks for your patience — your request is complete. If you need anything else, I’m here to help." 
\ No newline at end of file
+    return "Thanks for your patience — your request is complete. If you need anything else, I’m here to help."
+
+
+def summarize_result_llm(execution_result: ExecutionResult) -> str:
+    llm = get_bedrock_client()
+    response = call_llm_json(_summary_prompt(execution_result), llm, agent="responder")
+    return _summary_text(response)
+
+
+async def asummarize_result_llm(execution_result: ExecutionResult) -> str:
+    llm = get_bedrock_client()
+    response = await acall_llm_json(_summary_prompt(execution_result), llm, agent="responder")
+    return _summary_text(response)
+
+
+async def astream_summary_llm(execution_result: ExecutionResult) -> AsyncIterator[str]:
+    """Token-by-token variant of `asummarize_result_llm` for streaming responses."""
+    llm = get_bedrock_client()
+    async for text in astream_llm_text(_summary_prompt(execution_result), llm, agent="responder"):
+        yield text
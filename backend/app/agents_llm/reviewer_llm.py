@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import json
-from typing import List
+from typing import List, Optional
+
+from langchain_aws import ChatBedrock
 
 from app.core.logger import SessionLogger
 from app.core.types import ExecutionResult, Plan, Review, ReviewType
-from app.llm.bedrock import call_llm_json, get_bedrock_client
+from app.llm.bedrock import acall_llm_json, call_llm_json, get_bedrock_client
 
 
 REVIEW_PLAN_PROMPT = (
@@ -22,13 +24,34 @@ REVIEW_EXEC_PROMPT = (
 
 
 class LLMReviewer:
-    def __init__(self, logger: SessionLogger) -> None:
+    def __init__(self, logger: SessionLogger, llm: Optional[ChatBedrock] = None) -> None:
+        # Holds no per-turn resources: the client comes from the shared registry
         self.logger = logger
-        self.llm = get_bedrock_client()
+        self.llm = llm or get_bedrock_client()
+
+    def _plan_prompt(self, plan: Plan) -> str:
+        return REVIEW_PLAN_PROMPT + f"\nPlan: {plan.model_dump_json()}\nJSON:"
+
+    def _exec_prompt(self, plan: Plan, result: ExecutionResult) -> str:
+        return REVIEW_EXEC_PROMPT + f"\nPlan: {plan.model_dump_json()}\nResult: {result.model_dump_json()}\nJSON:"
 
     def review_plan(self, plan: Plan) -> Review:
-        prompt = REVIEW_PLAN_PROMPT + f"\nPlan: {plan.model_dump_json()}\nJSON:"
-        raw = call_llm_json(prompt, self.llm)
+        raw = call_llm_json(self._plan_prompt(plan), self.llm, agent="plan_review")
+        return self._plan_review(plan, raw)
+
+    async def areview_plan(self, plan: Plan) -> Review:
+        raw = await acall_llm_json(self._plan_prompt(plan), self.llm, agent="plan_review")
+        return self._plan_review(plan, raw)
+
+    def review_execution(self, plan: Plan, result: ExecutionResult) -> Review:
+        raw = call_llm_json(self._exec_prompt(plan, result), self.llm, agent="execution_review")
+        return self._execution_review(plan, result, raw)
+
+    async def areview_execution(self, plan: Plan, result: ExecutionResult) -> Review:
+        raw = await acall_llm_json(self._exec_prompt(plan, result), self.llm, agent="execution_review")
+        return self._execution_review(plan, result, raw)
+
+    def _plan_review(self, plan: Plan, raw) -> Review:
         issues: List[str] = []
         approved = True
         score = 7.0
@@ -40,12 +63,10 @@ class LLMReviewer:
         except Exception:
             pass
         review = Review(approved=approved, issues=issues, score=round(score, 1), review_type=ReviewType.plan)
-        self.logger.step("reviewer_llm", {"type": "plan", "plan": plan.model_dump()}, review.model_dump())
+        self.logger.step("reviewer_llm", {"type": "plan", "plan": plan}, review)
         return review
 
-    def review_execution(self, plan: Plan, result: ExecutionResult) -> Review:
-        prompt = REVIEW_EXEC_PROMPT + f"\nPlan: {plan.model_dump_json()}\nResult: {result.model_dump_json()}\nJSON:"
-        raw = call_llm_json(prompt, self.llm)
+    def _execution_review(self, plan: Plan, result: ExecutionResult, raw) -> Review:
         issues: List[str] = []
         approved = bool(result.success)
         score = 7.0 if result.success else 3.0
@@ -59,7 +80,7 @@ class LLMReviewer:
         review = Review(approved=approved, issues=issues, score=round(score, 1), review_type=ReviewType.execution)
         self.logger.step(
             "reviewer_llm",
-            {"type": "execution", "plan": plan.model_dump(), "result": result.model_dump()},
-            review.model_dump(),
+            {"type": "execution", "plan": plan, "result": result},
+            review,
         )
-        return review 
\ No newline at end of file
+        return review
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Generic, Hashable, List, TypeVar, Union
+
+
+SESSION_LOCK_STRIPES = int(os.getenv("SESSION_LOCK_STRIPES", "4096"))
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class LoopLocal(Generic[K, T]):
+    """Objects created per running event loop and key on first use.
+
+    asyncio locks and semaphores belong to the loop they are first awaited
+    on, so async callers get their own instance in each loop.
+    """
+
+    def __init__(self, factory: Callable[[K], T]) -> None:
+        self._factory = factory
+        self._by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[K, T]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            objects = self._by_loop.get(loop)
+            if objects is None:
+                objects = self._by_loop[loop] = {}
+            obj = objects.get(key)
+            if obj is None:
+                obj = objects[key] = self._factory(key)
+        return obj
+
+
+class LockStripes:
+    """Fixed pool of locks; a session always maps to the same stripe.
+
+    Turns for one session are serialized, while sessions on different stripes
+    run in parallel. Memory stays constant no matter how many sessions exist.
+    """
+
+    def __init__(self, stripes: int = SESSION_LOCK_STRIPES) -> None:
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(max(1, stripes))]
+        self._async_locks: LoopLocal[int, asyncio.Lock] = LoopLocal(lambda _: asyncio.Lock())
+
+    def _stripe(self, session_id: str) -> int:
+        return hash(session_id) % len(self._locks)
+
+    def lock_for(self, session_id: str) -> threading.Lock:
+        return self._locks[self._stripe(session_id)]
+
+    @asynccontextmanager
+    async def alock_for(self, session_id: str) -> AsyncIterator[None]:
+        """Async acquisition of the same stripe lock used by `lock_for`.
+
+        Async callers queue on a per-stripe asyncio.Lock first, so the stripe
+        lock itself is only contended by threads (sync `process` callers).
+        """
+        stripe = self._stripe(session_id)
+        async with self._async_locks.get(stripe):
+            lock = self._locks[stripe]
+            await acquire_async(lock)
+            try:
+                yield
+            finally:
+                lock.release()
+
+
+# Threads that wait on behalf of coroutines for locks held by sync callers
+LOCK_WAIT_WORKERS = 64
+
+
+async def acquire_async(lock: Union[threading.Lock, threading.Semaphore]) -> None:
+    """Acquire a threading lock or semaphore without blocking the event loop.
+
+    Uncontended acquisitions never leave the loop; otherwise a worker thread
+    blocks in `acquire()` until the holder releases. Cancellation (e.g. by
+    `asyncio.wait_for`) is safe: a permit taken after the caller gave up is
+    handed back.
+    """
+    if lock.acquire(blocking=False):
+        return
+    future = asyncio.get_running_loop().run_in_executor(shared_executor("lock_wait", LOCK_WAIT_WORKERS), lock.acquire)
+    try:
+        await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(lambda f: lock.release() if not f.cancelled() and f.exception() is None else None)
+        raise
+
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """Process-wide named thread pool, created on first use."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+                _executors[name] = executor
+    return executor
+
+
+def _reset_executors_in_child() -> None:
+    # A forked child (e.g. a ProcessPoolExecutor worker) inherits the pools but not their
+    # threads, so work submitted to them would never run; start over with fresh pools
+    global _executors_lock
+    _executors_lock = threading.Lock()
+    _executors.clear()
+
+
+os.register_at_fork(after_in_child=_reset_executors_in_child)
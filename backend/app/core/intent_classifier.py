@@ -0,0 +1,304 @@
+"""Hashed character n-gram intent classifier: the tier between the regex NLU and the LLM planner.
+
+Messages are featurized with NumPy over the whole batch at once: every text is
+lowercased, padded and concatenated into one byte array, each n-gram window is
+hashed with a polynomial rolling hash into a fixed number of buckets, and the
+counts are L2-normalized. The model is one centroid per intent, and scoring
+only gathers the centroid weights of the buckets a batch actually hits. It is
+trained offline from logged transcripts and saved as an `.npz` artifact that
+the API loads at startup.
+
+    python -m app.core.intent_classifier --logs-dir logs --out intent_classifier.npz
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from app.core.types import IntentName
+
+
+# Empty disables the tier; intents the regex misses then go straight to the LLM (or the fallback)
+INTENT_CLASSIFIER_PATH = os.getenv("INTENT_CLASSIFIER_PATH", "")
+# Minimum cosine similarity to the best centroid, and lead over the runner-up, to accept a prediction
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.35"))
+INTENT_CLASSIFIER_MARGIN = float(os.getenv("INTENT_CLASSIFIER_MARGIN", "0.1"))
+
+DEFAULT_DIM_BITS = 14
+DEFAULT_NGRAMS: Tuple[int, ...] = (2, 3, 4, 5)
+_PRIME = np.uint64(0x100000001B3)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_ARTIFACT_VERSION = 1
+
+
+def _encode(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """All texts as one byte array (each padded with spaces) plus the row each byte belongs to."""
+    encoded = [f" {' '.join(t.lower().split())} ".encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    rows = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+    return data, rows
+
+
+def hashed_ngrams(
+    texts: Sequence[str], dim_bits: int = DEFAULT_DIM_BITS, ngrams: Sequence[int] = DEFAULT_NGRAMS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(row, bucket) of every character n-gram in the batch, hashed into 2**dim_bits buckets."""
+    data, rows = _encode(texts)
+    shift = np.uint64(64 - dim_bits)
+    all_rows, all_buckets = [], []
+    # Rolling hash: the n-gram hashes extend the (n-1)-gram hashes by one byte
+    h = data
+    for n in range(1, max(ngrams) + 1):
+        if n > 1:
+            h = h[:-1] * _PRIME + data[n - 1:]
+        if n not in ngrams or not len(h):
+            continue
+        # Drop windows that straddle two texts
+        same_row = rows[:len(h)] == rows[n - 1:]
+        all_rows.append(rows[:len(h)][same_row])
+        all_buckets.append((((h[same_row] + np.uint64(n)) * _MIX) >> shift).astype(np.int64))
+    if not all_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(all_rows), np.concatenate(all_buckets)
+
+
+def ngram_counts(
+    texts: Sequence[str], dim_bits: int = DEFAULT_DIM_BITS, ngrams: Sequence[int] = DEFAULT_NGRAMS
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sparse n-gram counts as (row, bucket, count), sorted by row then bucket."""
+    rows, buckets = hashed_ngrams(texts, dim_bits, ngrams)
+    keys, counts = np.unique((rows << dim_bits) | buckets, return_counts=True)
+    return keys >> dim_bits, keys & ((1 << dim_bits) - 1), counts.astype(np.float32)
+
+
+class IntentClassifier:
+    """Nearest-centroid model over hashed n-gram features."""
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        labels: Sequence[str],
+        dim_bits: int = DEFAULT_DIM_BITS,
+        ngrams: Sequence[int] = DEFAULT_NGRAMS,
+        threshold: float = INTENT_CLASSIFIER_THRESHOLD,
+        margin: float = INTENT_CLASSIFIER_MARGIN,
+    ) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        # Bucket-major copy for gathering the centroid weights of the buckets a batch hits
+        self._columns = np.ascontiguousarray(self.centroids.T)
+        self.labels = [IntentName(label) for label in labels]
+        self.dim_bits = dim_bits
+        self.ngrams = tuple(ngrams)
+        self.threshold = threshold
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._counts = {"predictions": 0, "accepted": 0}
+
+    @classmethod
+    def train(
+        cls, texts: Sequence[str], labels: Sequence[str], dim_bits: int = DEFAULT_DIM_BITS, ngrams: Sequence[int] = DEFAULT_NGRAMS
+    ) -> "IntentClassifier":
+        if not texts:
+            raise ValueError("no labelled messages to train on")
+        classes = sorted(set(labels))
+        index = {label: i for i, label in enumerate(classes)}
+        classes_of = np.fromiter((index[label] for label in labels), dtype=np.int64, count=len(labels))
+        rows, buckets, counts = ngram_counts(texts, dim_bits, ngrams)
+        weights = counts / np.sqrt(np.bincount(rows, weights=counts * counts, minlength=len(texts)))[rows]
+        dim = 1 << dim_bits
+        # Sum of each class's normalized feature vectors, then normalized: the class centroid direction
+        centroids = np.bincount(classes_of[rows] * dim + buckets, weights=weights, minlength=len(classes) * dim)
+        centroids = centroids.astype(np.float32).reshape(len(classes), dim)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        return cls(centroids, classes, dim_bits, ngrams)
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of each text to each intent centroid, shape (len(texts), len(labels)).
+
+        Works on the sparse counts directly: only the centroid columns of
+        buckets that occur are gathered, so a batch costs O(n-grams).
+        """
+        scores = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        if not texts:
+            return scores
+        rows, buckets, counts = ngram_counts(texts, self.dim_bits, self.ngrams)
+        # Rows are sorted, so each text's n-grams form one contiguous run
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        present = rows[starts]
+        scores[present] = np.add.reduceat(self._columns[buckets] * counts[:, None], starts, axis=0)
+        scores[present] /= np.sqrt(np.add.reduceat(counts * counts, starts))[:, None]
+        return scores
+
+    def predict_batch(self, texts: Sequence[str]) -> Tuple[List[Optional[IntentName]], np.ndarray]:
+        """Best intent per text, or None when its confidence is below the threshold, plus the confidences."""
+        if not texts:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = self.scores(texts)
+        top = np.argmax(scores, axis=1)
+        confidence = scores[np.arange(len(texts)), top]
+        if scores.shape[1] > 1:
+            runner_up = np.partition(scores, -2, axis=1)[:, -2]
+        else:
+            runner_up = np.zeros_like(confidence)
+        accepted = (confidence >= self.threshold) & (confidence - runner_up >= self.margin)
+        intents = [self.labels[t] if ok else None for t, ok in zip(top.tolist(), accepted.tolist())]
+        with self._lock:
+            self._counts["predictions"] += len(texts)
+            self._counts["accepted"] += int(accepted.sum())
+        return intents, confidence
+
+    def predict(self, text: str) -> Tuple[Optional[IntentName], float]:
+        intents, confidence = self.predict_batch([text])
+        return intents[0], float(confidence[0])
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            predictions, accepted = self._counts["predictions"], self._counts["accepted"]
+        return {
+            "intents": len(self.labels),
+            "predictions": predictions,
+            "accepted": accepted,
+            "accept_rate": round(accepted / predictions, 4) if predictions else 0.0,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.int64(_ARTIFACT_VERSION),
+                centroids=self.centroids,
+                labels=np.array([label.value for label in self.labels]),
+                dim_bits=np.int64(self.dim_bits),
+                ngrams=np.array(self.ngrams, dtype=np.int64),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path, allow_pickle=False) as artifact:
+            if int(artifact["version"]) != _ARTIFACT_VERSION:
+                raise ValueError(f"unsupported intent classifier artifact version {int(artifact['version'])}")
+            return cls(
+                artifact["centroids"],
+                [str(label) for label in artifact["labels"]],
+                int(artifact["dim_bits"]),
+                [int(n) for n in artifact["ngrams"]],
+            )
+
+
+# Training data
+
+# Agent steps whose plan is an independent label for the user's message; a turn
+# whose first intent comes from this classifier is skipped so it never trains on itself
+_CLASSIFIER_STEP = "intent_classifier"
+
+
+def _step_intent(payload: Dict[str, object]) -> Optional[str]:
+    output = payload.get("output")
+    if isinstance(output, dict) and output.get("intent"):
+        return str(output["intent"])
+    inputs = payload.get("input")
+    plan = inputs.get("plan") if isinstance(inputs, dict) else None
+    if isinstance(plan, dict) and plan.get("intent"):
+        return str(plan["intent"])
+    return None
+
+
+def _session_examples(lines: Iterable[bytes]) -> Iterator[Tuple[str, str]]:
+    state = "idle"
+    message: Optional[str] = None
+    for line in lines:
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        event, payload = record.get("event"), record.get("payload") or {}
+        if event == "user_message":
+            # Clarification replies carry slots, not the request itself
+            text = payload.get("message")
+            message = text if state != "awaiting_clarification" and isinstance(text, str) and text.strip() else None
+        elif event == "state_transition":
+            state = payload.get("to") or state
+        elif event == "agent_step" and message is not None:
+            intent = _step_intent(payload)
+            if intent is None:
+                continue
+            if payload.get("name") != _CLASSIFIER_STEP and intent in IntentName._value2member_map_:
+                yield message, intent
+            message = None
+
+
+def labelled_messages(logs_dir: str) -> List[Tuple[str, str]]:
+    """(message, intent) pairs from session logs: each new request labelled with the intent its turn planned."""
+    examples: List[Tuple[str, str]] = []
+    for name in sorted(os.listdir(logs_dir)):
+        if name.startswith("session_") and name.endswith(".jsonl"):
+            with open(os.path.join(logs_dir, name), "rb") as f:
+                examples.extend(_session_examples(f))
+    return examples
+
+
+def train_from_logs(logs_dir: str, dim_bits: int = DEFAULT_DIM_BITS) -> IntentClassifier:
+    examples = labelled_messages(logs_dir)
+    return IntentClassifier.train([m for m, _ in examples], [i for _, i in examples], dim_bits)
+
+
+# Runtime
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """The classifier loaded from INTENT_CLASSIFIER_PATH, or None when the tier is disabled."""
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        with _classifier_lock:
+            if not _classifier_loaded:
+                _classifier = IntentClassifier.load(INTENT_CLASSIFIER_PATH) if INTENT_CLASSIFIER_PATH else None
+                _classifier_loaded = True
+    return _classifier
+
+
+def set_intent_classifier(classifier: Optional[IntentClassifier]) -> None:
+    global _classifier, _classifier_loaded
+    with _classifier_lock:
+        _classifier, _classifier_loaded = classifier, True
+
+
+def predict_intent(text: str) -> Optional[IntentName]:
+    """The classifier's intent for a message the regex NLU found none in; None if unsure or disabled."""
+    classifier = get_intent_classifier()
+    return classifier.predict(text)[0] if classifier is not None else None
+
+
+def intent_classifier_stats() -> Dict[str, float]:
+    classifier = get_intent_classifier()
+    return classifier.stats() if classifier is not None else {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs-dir", default="logs")
+    parser.add_argument("--out", default="intent_classifier.npz")
+    parser.add_argument("--dim-bits", type=int, default=DEFAULT_DIM_BITS)
+    args = parser.parse_args()
+
+    examples = labelled_messages(args.logs_dir)
+    classifier = IntentClassifier.train([m for m, _ in examples], [i for _, i in examples], args.dim_bits)
+    classifier.save(args.out)
+    print(json.dumps({"out": args.out, "examples": dict(Counter(i for _, i in examples))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
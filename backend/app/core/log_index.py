@@ -0,0 +1,492 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import orjson
+
+from app.core.log_segments import LOG_SEGMENT_DIR, segment_decompressor
+from app.core.logger import add_append_listener, default_logs_dir, remove_append_listener
+
+
+LOG_INDEX_PATH = os.getenv("LOG_INDEX_PATH", "")
+# Full rescans at most this often, for appends other processes made to existing session files
+LOG_INDEX_RESCAN_SECONDS = float(os.getenv("LOG_INDEX_RESCAN_SECONDS", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    event TEXT NOT NULL,
+    name TEXT,
+    intent TEXT,
+    state TEXT,
+    success INTEGER,
+    file TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_event_intent_ts ON events (event, intent, ts);
+CREATE INDEX IF NOT EXISTS events_intent_ts ON events (intent, ts);
+CREATE INDEX IF NOT EXISTS events_state_ts ON events (state, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_session ON events (session_id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    intent TEXT,
+    state TEXT,
+    first_ts TEXT NOT NULL,
+    last_ts TEXT NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_state_ts ON sessions (state, last_ts);
+CREATE INDEX IF NOT EXISTS sessions_intent_ts ON sessions (intent, last_ts);
+CREATE INDEX IF NOT EXISTS sessions_last_ts ON sessions (last_ts);
+CREATE TABLE IF NOT EXISTS segment_stores (root TEXT PRIMARY KEY, last_frame INTEGER NOT NULL);
+"""
+
+_EVENT_COLUMNS = ("id", "session_id", "ts", "event", "name", "intent", "state", "success")
+_SESSION_COLUMNS = ("session_id", "intent", "state", "first_ts", "last_ts", "records")
+
+
+def normalize_ts(value: Any) -> str:
+    """ISO-8601 datetime (or datetime) -> the `YYYY-MM-DDTHH:MM:SSZ` UTC form SessionLogger writes."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="seconds") + "Z"
+
+
+class _SessionState:
+    __slots__ = ("intent", "state", "first_ts", "last_ts", "records")
+
+    def __init__(self, intent: Optional[str], state: Optional[str], first_ts: Optional[str]) -> None:
+        self.intent = intent
+        self.state = state
+        self.first_ts = first_ts
+        self.last_ts = first_ts
+        self.records = 0
+
+
+class SessionLogIndex:
+    """Incremental sqlite index over the session logs SessionLogger writes.
+
+    Covers the `session_<id>.jsonl` files of the file/buffered backends and
+    the segments of the segment backend. Each record becomes one row keyed
+    on event, agent step name, intent, state and timestamp, plus where it is
+    stored: (file, offset, length) of its line, or for segments the frame's
+    (segment, offset, length) and the line within it. Intent and state are
+    carried forward per session, so e.g. an executor step is tagged with the
+    plan's intent and the state the session was in. A `sessions` table keeps
+    each session's latest intent and state.
+
+    The index listens to the log writers' appends: the first `refresh()`
+    scans the logs directory, later ones only read the bytes (or segment
+    frames) appended to what the writers reported since. Writes by other
+    worker processes never reach the listener, so a refresh also rescans
+    when the logs directory's mtime moved (a new session file), reads new
+    frames when the segment store's index changed, and rescans everything
+    every `LOG_INDEX_RESCAN_SECONDS` for appends to existing files.
+    """
+
+    def __init__(
+        self,
+        logs_dir: Optional[str] = None,
+        db_path: Optional[str] = None,
+        segments_dir: Optional[str] = None,
+    ) -> None:
+        self.logs_dir = os.path.abspath(logs_dir) if logs_dir else default_logs_dir()
+        os.makedirs(self.logs_dir, exist_ok=True)
+        self.db_path = db_path or LOG_INDEX_PATH or os.path.join(self.logs_dir, ".session_index.sqlite3")
+        self.segments_dir = os.path.abspath(segments_dir or LOG_SEGMENT_DIR or os.path.join(self.logs_dir, "segments"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock:
+            # WAL keeps its files in place between commits, so the index's own writes don't move the logs directory's mtime
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            if "line" not in {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}:
+                # Index files from before segment logs were covered
+                self._conn.execute("ALTER TABLE events ADD COLUMN line INTEGER")
+            self._conn.commit()
+        # Files (and segment stores) written since the last refresh, as reported by the writers
+        self._changed_lock = threading.Lock()
+        self._changed_files: Set[str] = set()
+        self._segments_changed = False
+        self._scanned = False
+        self._scanned_at = 0.0
+        self._dir_mtime: Optional[int] = None
+        self._store_mtime: Optional[int] = None
+        add_append_listener(self.appended)
+
+    # Indexing
+
+    def appended(self, paths: Iterable[str]) -> None:
+        """Append listener: note the session files and segment stores a log write touched."""
+        with self._changed_lock:
+            for path in paths:
+                if path == self.segments_dir:
+                    self._segments_changed = True
+                elif os.path.dirname(path) == self.logs_dir:
+                    self._changed_files.add(os.path.basename(path))
+
+    def _session_files(self) -> Set[str]:
+        with os.scandir(self.logs_dir) as entries:
+            return {e.name for e in entries if e.name.startswith("session_") and e.name.endswith(".jsonl")}
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, force: bool = False) -> int:
+        """Index records appended since the last refresh; returns how many were added.
+
+        `force` rescans the whole logs directory right away rather than on
+        the next mtime change or periodic rescan, e.g. to see what another
+        process just appended to an existing file.
+        """
+        with self._lock:
+            with self._changed_lock:
+                names, self._changed_files = self._changed_files, set()
+                segments, self._segments_changed = self._segments_changed, False
+            # Taken before scanning, so a change made meanwhile is seen next time
+            dir_mtime = self._mtime(self.logs_dir)
+            store_mtime = self._mtime(os.path.join(self.segments_dir, "index.sqlite3"))
+            if store_mtime != self._store_mtime:
+                segments, self._store_mtime = True, store_mtime
+            now = time.monotonic()
+            if (
+                force
+                or not self._scanned
+                or dir_mtime != self._dir_mtime
+                or now - self._scanned_at >= LOG_INDEX_RESCAN_SECONDS
+            ):
+                names, segments = self._session_files(), True
+                self._scanned, self._scanned_at, self._dir_mtime = True, now, dir_mtime
+            if not names and not segments:
+                return 0
+            known = dict(self._conn.execute("SELECT path, size FROM files"))
+            sessions: Dict[str, _SessionState] = {}
+            added = 0
+            for name in sorted(names):
+                try:
+                    size = os.stat(os.path.join(self.logs_dir, name)).st_size
+                except FileNotFoundError:
+                    continue
+                offset = known.get(name, 0)
+                if size == offset:
+                    continue
+                if size < offset:
+                    # Truncated or replaced: index the file again from the start
+                    self._conn.execute("DELETE FROM events WHERE file = ?", (name,))
+                    offset = 0
+                added += self._ingest(name, offset, sessions)
+            if segments:
+                added += self._ingest_segments(sessions)
+            self._save_sessions(sessions)
+            self._conn.commit()
+            return added
+
+    def _ingest(self, name: str, offset: int, sessions: Dict[str, _SessionState]) -> int:
+        with open(os.path.join(self.logs_dir, name), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # A trailing partial line is left for the next scan
+        end = data.rfind(b"\n") + 1
+        rows = []
+        position = offset
+        for line in data[:end].splitlines(keepends=True):
+            length = len(line)
+            try:
+                record = orjson.loads(line) if line.strip() else None
+            except orjson.JSONDecodeError:
+                record = None
+            if isinstance(record, dict) and record.get("session_id"):
+                rows.append(self._row(record, name, position, length, None, sessions))
+            position += length
+        self._insert(rows)
+        self._conn.execute(
+            "INSERT INTO files (path, size) VALUES (?, ?) ON CONFLICT(path) DO UPDATE SET size = excluded.size",
+            (name, offset + end),
+        )
+        return len(rows)
+
+    def _ingest_segments(self, sessions: Dict[str, _SessionState]) -> int:
+        """Index the records of segment frames added since the last refresh."""
+        store_db = os.path.join(self.segments_dir, "index.sqlite3")
+        if not os.path.exists(store_db):
+            return 0
+        row = self._conn.execute("SELECT last_frame FROM segment_stores WHERE root = ?", (self.segments_dir,)).fetchone()
+        last_frame = row[0] if row else 0
+        store = sqlite3.connect(f"file:{store_db}?mode=ro", uri=True)
+        try:
+            frames = store.execute(
+                "SELECT rowid, segment, offset, length FROM frames WHERE rowid > ? ORDER BY rowid", (last_frame,)
+            ).fetchall()
+        finally:
+            store.close()
+        rows = []
+        for frame_id, segment, offset, length in frames:
+            last_frame = frame_id
+            path = os.path.join(self.segments_dir, segment)
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = segment_decompressor(segment)(f.read(length))
+            except FileNotFoundError:
+                # Bucket already purged
+                continue
+            for line_no, line in enumerate(data.splitlines()):
+                record = orjson.loads(line) if line.strip() else None
+                if isinstance(record, dict) and record.get("session_id"):
+                    rows.append(self._row(record, path, offset, length, line_no, sessions))
+        self._insert(rows)
+        self._conn.execute(
+            "INSERT INTO segment_stores (root, last_frame) VALUES (?, ?)"
+            " ON CONFLICT(root) DO UPDATE SET last_frame = excluded.last_frame",
+            (self.segments_dir, last_frame),
+        )
+        return len(rows)
+
+    def _insert(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO events (session_id, ts, event, name, intent, state, success, file, offset, length, line)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _session(self, session_id: str, sessions: Dict[str, _SessionState]) -> _SessionState:
+        current = sessions.get(session_id)
+        if current is None:
+            row = self._conn.execute(
+                "SELECT intent, state, first_ts FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            current = sessions[session_id] = _SessionState(*row) if row else _SessionState(None, None, None)
+        return current
+
+    def _row(
+        self,
+        record: Dict[str, Any],
+        name: str,
+        offset: int,
+        length: int,
+        line: Optional[int],
+        sessions: Dict[str, _SessionState],
+    ) -> Tuple[Any, ...]:
+        event = record.get("event") or ""
+        ts = record.get("ts") or ""
+        payload = record.get("payload") if isinstance(record.get("payload"), dict) else {}
+        current = self._session(record["session_id"], sessions)
+        step_name = None
+        success = None
+        if event == "agent_step":
+            step_name = payload.get("name")
+            output = payload.get("output") if isinstance(payload.get("output"), dict) else {}
+            step_input = payload.get("input") if isinstance(payload.get("input"), dict) else {}
+            plan = step_input.get("plan") if isinstance(step_input.get("plan"), dict) else {}
+            if "intent" in output:
+                current.intent = output["intent"]
+            elif plan.get("intent"):
+                current.intent = plan["intent"]
+            if "success" in output:
+                success = int(bool(output["success"]))
+        elif event == "state_transition":
+            current.state = payload.get("to")
+        current.first_ts = current.first_ts or ts
+        current.last_ts = ts
+        current.records += 1
+        return (
+            record["session_id"], ts, event, step_name, current.intent, current.state, success, name, offset, length, line,
+        )
+
+    def _save_sessions(self, sessions: Dict[str, _SessionState]) -> None:
+        self._conn.executemany(
+            "INSERT INTO sessions (session_id, intent, state, first_ts, last_ts, records) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(session_id) DO UPDATE SET intent = excluded.intent, state = excluded.state,"
+            " last_ts = excluded.last_ts, records = sessions.records + excluded.records",
+            [
+                (sid, s.intent, s.state, s.first_ts, s.last_ts, s.records)
+                for sid, s in sessions.items()
+                if s.records
+            ],
+        )
+
+    # Queries
+
+    def _event_query(
+        self,
+        event: Optional[str] = None,
+        name: Optional[str] = None,
+        intent: Optional[str] = None,
+        state: Optional[str] = None,
+        session_id: Optional[str] = None,
+        success: Optional[bool] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: int = 0,
+        limit: int = 100,
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = ["id > ?"], [cursor]
+        for column, value in (
+            ("event", event), ("name", name), ("intent", intent), ("state", state), ("session_id", session_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if success is not None:
+            clauses.append("success = ?")
+            params.append(int(success))
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(normalize_ts(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(normalize_ts(until))
+        params.append(limit)
+        sql = (
+            f"SELECT {', '.join(_EVENT_COLUMNS)}, file, offset, length, line FROM events"
+            f" WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+        )
+        return sql, params
+
+    def search_events(
+        self, *, limit: int = 100, with_records: bool = False, **filters: Any
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of matching events in log order and the cursor for the next page (None when done).
+
+        Filters: event, name (agent step), intent, state, session_id, success,
+        since/until (ISO-8601, `until` exclusive) and cursor (id of the last
+        event already seen).
+        """
+        self.refresh()
+        sql, params = self._event_query(limit=limit + 1, **filters)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        page = rows[:limit]
+        items = self._read(page) if with_records else [self._event(row) for row in page]
+        return items, (page[-1][0] if len(rows) > limit else None)
+
+    def iter_events(self, *, page_size: int = 500, with_records: bool = False, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Every matching event, fetched a page at a time."""
+        cursor = filters.pop("cursor", 0)
+        while True:
+            items, cursor = self.search_events(limit=page_size, with_records=with_records, cursor=cursor, **filters)
+            yield from items
+            if cursor is None:
+                return
+
+    def search_sessions(
+        self,
+        *,
+        state: Optional[str] = None,
+        intent: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: int = 0,
+        limit: int = 100,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Sessions by latest state/intent, with last activity in [since, until)."""
+        self.refresh()
+        clauses, params = ["rowid > ?"], [cursor]
+        if state is not None:
+            clauses.append("state = ?")
+            params.append(state)
+        if intent is not None:
+            clauses.append("intent = ?")
+            params.append(intent)
+        if since is not None:
+            clauses.append("last_ts >= ?")
+            params.append(normalize_ts(since))
+        if until is not None:
+            clauses.append("last_ts < ?")
+            params.append(normalize_ts(until))
+        sql = (
+            f"SELECT rowid, {', '.join(_SESSION_COLUMNS)} FROM sessions"
+            f" WHERE {' AND '.join(clauses)} ORDER BY rowid LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+        page = rows[:limit]
+        items = [dict(zip(_SESSION_COLUMNS, row[1:])) for row in page]
+        return items, (page[-1][0] if len(rows) > limit else None)
+
+    def _event(self, row: Tuple[Any, ...]) -> Dict[str, Any]:
+        item = dict(zip(_EVENT_COLUMNS, row))
+        if item["success"] is not None:
+            item["success"] = bool(item["success"])
+        return item
+
+    def _read(self, rows: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+        """Attach each event's logged record, read with one seek per line (or per segment frame)."""
+        items = []
+        handle, handle_name = None, None
+        frame_at: Optional[Tuple[str, int]] = None
+        frame: List[bytes] = []
+        missing: Set[str] = set()
+        try:
+            for row in rows:
+                file_name, offset, length, line = row[-4:]
+                if file_name != handle_name:
+                    if handle is not None:
+                        handle.close()
+                    handle, handle_name = None, file_name
+                    try:
+                        handle = open(os.path.join(self.logs_dir, file_name), "rb")
+                    except FileNotFoundError:
+                        # Purged since it was indexed (expired segment bucket, deleted session file)
+                        missing.add(file_name)
+                if handle is None:
+                    continue
+                item = self._event(row[:-4])
+                if line is None:
+                    handle.seek(offset)
+                    item["record"] = orjson.loads(handle.read(length))
+                else:
+                    if frame_at != (file_name, offset):
+                        handle.seek(offset)
+                        frame = segment_decompressor(file_name)(handle.read(length)).splitlines()
+                        frame_at = (file_name, offset)
+                    item["record"] = orjson.loads(frame[line])
+                items.append(item)
+        finally:
+            if handle is not None:
+                handle.close()
+        if missing:
+            self._forget(missing)
+        return items
+
+    def _forget(self, files: Set[str]) -> None:
+        """Drop the rows of logs that no longer exist."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM events WHERE file = ?", [(name,) for name in files])
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(name,) for name in files])
+            self._conn.commit()
+
+    def close(self) -> None:
+        remove_append_listener(self.appended)
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[SessionLogIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_log_index() -> SessionLogIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SessionLogIndex()
+    return _index
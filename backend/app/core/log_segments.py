@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.logger import BufferedLogWriter, default_logs_dir, notify_appended
+
+
+LOG_SEGMENT_DIR = os.getenv("LOG_SEGMENT_DIR", "")
+LOG_SEGMENT_CODEC = os.getenv("LOG_SEGMENT_CODEC", "gzip").lower()
+LOG_SEGMENT_MAX_BYTES = int(os.getenv("LOG_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+LOG_SEGMENT_BUCKET_S = int(os.getenv("LOG_SEGMENT_BUCKET_S", "3600"))
+
+_EXTENSIONS = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def _codec(name: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    if name == "none":
+        return (lambda data: data), (lambda data: data)
+    if name == "gzip":
+        return (lambda data: gzip.compress(data, compresslevel=6)), gzip.decompress
+    if name == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise RuntimeError("LOG_SEGMENT_CODEC=zstd requires the 'zstandard' package") from exc
+        compressor, decompressor = zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+        # Compressors are not thread-safe; writes are serialized by SegmentStore's lock
+        return compressor.compress, decompressor.decompress
+    raise ValueError(f"Unknown LOG_SEGMENT_CODEC: {name}")
+
+
+def segment_decompressor(segment: str) -> Callable[[bytes], bytes]:
+    """Decompressor for a segment file, chosen by its extension."""
+    for name in ("gzip", "zstd", "none"):
+        if segment.endswith(_EXTENSIONS[name]):
+            return _codec(name)[1]
+    raise ValueError(f"Not a log segment: {segment}")
+
+
+class SegmentStore:
+    """Session logs packed into time-bucketed, size-rotated segment files.
+
+    Layout: `<root>/<bucket>/seg-000001.jsonl[.gz|.zst]`, where a bucket covers
+    `bucket_s` seconds of wall-clock time and a segment is rotated once it
+    exceeds `max_bytes`. Each append writes one self-contained frame per
+    session (a gzip member / zstd frame, so segments also decompress whole
+    with zcat / zstd -d). Segment files are created exclusively, so processes
+    sharing a root never append to the same segment. `<root>/index.sqlite3` maps session_id to
+    (segment, offset, length) of every frame, so one transcript is read with
+    a few seeks instead of a scan. Retention is a directory delete per bucket.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        codec: str = LOG_SEGMENT_CODEC,
+        max_bytes: int = LOG_SEGMENT_MAX_BYTES,
+        bucket_s: int = LOG_SEGMENT_BUCKET_S,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = os.path.abspath(root or LOG_SEGMENT_DIR or os.path.join(default_logs_dir(), "segments"))
+        os.makedirs(self.root, exist_ok=True)
+        self.codec = codec
+        self._compress, self._decompress = _codec(codec)
+        self.max_bytes = max_bytes
+        self.bucket_s = max(1, bucket_s)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._file: Any = None
+        self._segment: Optional[str] = None  # path relative to root
+        self._bucket: Optional[int] = None
+        self._size = 0
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS frames ("
+                "session_id TEXT NOT NULL, segment TEXT NOT NULL, offset INTEGER NOT NULL, "
+                "length INTEGER NOT NULL, bucket INTEGER NOT NULL, records INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS frames_session ON frames (session_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS frames_bucket ON frames (bucket)")
+            self._conn.commit()
+
+    def _bucket_dir(self, bucket: int) -> str:
+        return time.strftime("%Y%m%dT%H%M%S", time.gmtime(bucket))
+
+    def _open_segment(self, bucket: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        directory = os.path.join(self.root, self._bucket_dir(bucket))
+        os.makedirs(directory, exist_ok=True)
+        number = len([name for name in os.listdir(directory) if name.startswith("seg-")]) + 1
+        while True:
+            segment = os.path.join(self._bucket_dir(bucket), f"seg-{number:06d}{_EXTENSIONS[self.codec]}")
+            try:
+                # Exclusive create: a segment has one writer, so the offsets it indexes match the file
+                self._file = open(os.path.join(self.root, segment), "xb")
+                break
+            except FileExistsError:
+                # Another process (or a restarted one) took this name first
+                number += 1
+        self._segment = segment
+        self._bucket = bucket
+        self._size = 0
+
+    def append(self, sessions: Dict[str, List[bytes]]) -> None:
+        """Append each session's JSONL lines as one frame and index the frames."""
+        now = self._clock()
+        bucket = int(now // self.bucket_s * self.bucket_s)
+        rows = []
+        with self._lock:
+            if self._bucket != bucket:
+                self._open_segment(bucket)
+            for session_id, lines in sessions.items():
+                frame = self._compress(b"\n".join(lines) + b"\n")
+                if self._size and self._size + len(frame) > self.max_bytes:
+                    self._open_segment(bucket)
+                self._file.write(frame)
+                rows.append((session_id, self._segment, self._size, len(frame), bucket, len(lines)))
+                self._size += len(frame)
+            self._file.flush()
+            self._conn.executemany(
+                "INSERT INTO frames (session_id, segment, offset, length, bucket, records) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def read_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """All records logged for a session, in write order."""
+        with self._lock:
+            frames = self._conn.execute(
+                "SELECT segment, offset, length FROM frames WHERE session_id = ? ORDER BY rowid", (session_id,)
+            ).fetchall()
+        records: List[Dict[str, Any]] = []
+        for segment, offset, length in frames:
+            with open(os.path.join(self.root, segment), "rb") as f:
+                f.seek(offset)
+                data = self._decompress(f.read(length))
+            records.extend(orjson.loads(line) for line in data.splitlines() if line)
+        return records
+
+    def purge_before(self, cutoff_ts: float) -> int:
+        """Delete buckets that ended before `cutoff_ts`; returns the number removed."""
+        last_bucket = int(cutoff_ts // self.bucket_s * self.bucket_s) - self.bucket_s
+        with self._lock:
+            buckets = [
+                b
+                for (b,) in self._conn.execute("SELECT DISTINCT bucket FROM frames WHERE bucket <= ?", (last_bucket,))
+                if b != self._bucket
+            ]
+            for bucket in buckets:
+                shutil.rmtree(os.path.join(self.root, self._bucket_dir(bucket)), ignore_errors=True)
+                self._conn.execute("DELETE FROM frames WHERE bucket = ?", (bucket,))
+            self._conn.commit()
+        return len(buckets)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._bucket = None
+            self._conn.close()
+
+
+class SegmentLogWriter(BufferedLogWriter):
+    """Buffered writer that appends batches to a SegmentStore instead of per-session files."""
+
+    name = "segment"
+
+    def __init__(self, store: Optional[SegmentStore] = None, **kwargs: Any) -> None:
+        # Set before the base class starts the flush thread
+        self.store = store or SegmentStore()
+        super().__init__(**kwargs)
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        self.store.append(self._encode_batch(batch, lambda _, record: record["session_id"]))
+        notify_appended((self.store.root,))
+
+    def read_session(self, session_id: str) -> List[Dict[str, Any]]:
+        self.flush()
+        return self.store.read_session(session_id)
+
+    def close(self) -> None:
+        super().close()
+        self.store.close()
@@ -1,21 +1,362 @@
 from __future__ import annotations
 
+import atexit
 import json
+import logging
 import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+from app.core.metrics import LOG_RECORDS_DROPPED, LOG_WRITE_SECONDS
+
+LOG_BACKEND = os.getenv("LOG_BACKEND", "file").lower()
+LOG_FLUSH_MAX_RECORDS = int(os.getenv("LOG_FLUSH_MAX_RECORDS", "256"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "200"))
+# Records a buffered writer holds at most (e.g. while the disk is failing); newer ones are dropped
+LOG_BUFFER_MAX_PENDING = int(os.getenv("LOG_BUFFER_MAX_PENDING", "100000"))
+
+_log = logging.getLogger(__name__)
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for item in spec.split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            rates[key.strip()] = float(value)
+    return rates
+
+
+# Verbosity tier per turn: messages (user/assistant text only) | summary (steps
+# reduced to a few fields) | full (every payload; the original behaviour)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "full").lower()
+# Share of turns logged in full anyway, per intent, e.g. "default=0.01,transfer_money=0.1"
+LOG_SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+# Turns with a review score below this are logged in full (as are fallbacks and failed executions)
+LOG_ESCALATE_BELOW_SCORE = float(os.getenv("LOG_ESCALATE_BELOW_SCORE", "6.0"))
+# Models kept serialized by the file writer; a turn references a handful
+LOG_MODEL_MEMO_SIZE = int(os.getenv("LOG_MODEL_MEMO_SIZE", "64"))
+
+
+class ModelMemo:
+    """Serialized forms of logged pydantic models, keyed by object identity.
+
+    Log payloads carry model objects and are serialized only when written, so
+    a Plan referenced by several agent steps in one turn is dumped once. The
+    memo keeps each model alive while cached, so an id cannot be reused by
+    another object; logged models are never mutated afterwards (they are
+    rebuilt, e.g. by the clarification merge), so cached forms stay valid.
+    """
+
+    def __init__(self, max_entries: int = LOG_MODEL_MEMO_SIZE) -> None:
+        self.max_entries = max(1, max_entries)
+        # id -> (model, JSON-mode dict or None, JSON bytes or None)
+        self._entries: Dict[int, List[Any]] = {}
+        self._lock = threading.Lock()
+        self.serializations = 0
+
+    def _entry(self, model: BaseModel) -> List[Any]:
+        entry = self._entries.get(id(model))
+        if entry is None or entry[0] is not model:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            entry = self._entries[id(model)] = [model, None, None]
+        return entry
+
+    def jsonable(self, model: BaseModel) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entry(model)
+            if entry[1] is None:
+                entry[1] = model.model_dump(mode="json")
+                self.serializations += 1
+            return entry[1]
+
+    def fragment(self, model: BaseModel) -> orjson.Fragment:
+        with self._lock:
+            entry = self._entry(model)
+            if entry[2] is None:
+                entry[2] = orjson.Fragment(model.model_dump_json())
+                self.serializations += 1
+            return entry[2]
+
+
+# Called with the paths every write touched: session files, or a segment store's root
+AppendListener = Callable[[Iterable[str]], None]
+_append_listeners: List[AppendListener] = []
+
+
+def add_append_listener(listener: AppendListener) -> None:
+    """Have `listener` told about every log write (e.g. so the log index reads only what changed)."""
+    _append_listeners.append(listener)
+
+
+def remove_append_listener(listener: AppendListener) -> None:
+    if listener in _append_listeners:
+        _append_listeners.remove(listener)
+
+
+def notify_appended(paths: Iterable[str]) -> None:
+    for listener in list(_append_listeners):
+        listener(paths)
+
+
+class LogWriter(ABC):
+    """Destination for session log records. `append` must be thread-safe."""
+
+    name = "custom"
+
+    @abstractmethod
+    def append(self, file_path: str, record: Dict[str, Any]) -> None:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class FileLogWriter(LogWriter):
+    """Synchronous writer: one open/append/close per record (original behaviour)."""
+
+    name = "file"
+
+    def __init__(self) -> None:
+        self.memo = ModelMemo()
+
+    def _default(self, obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            return self.memo.jsonable(obj)
+        return str(obj)
+
+    def append(self, file_path: str, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=self._default)
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        notify_appended((file_path,))
+
+
+class BufferedLogWriter(LogWriter):
+    """Queues records in memory and appends them in batches from a background thread.
+
+    A batch is written when `max_records` are pending or every `interval_ms`,
+    whichever comes first. Each file touched by a batch is opened once. A
+    batch that fails to write is dropped rather than stopping the thread, and
+    records beyond `max_pending` are dropped until it catches up; both are
+    counted in `dropped` and `session_log_records_dropped_total`.
+    """
+
+    name = "buffered"
+
+    def __init__(
+        self,
+        max_records: int = LOG_FLUSH_MAX_RECORDS,
+        interval_ms: int = LOG_FLUSH_INTERVAL_MS,
+        max_pending: int = LOG_BUFFER_MAX_PENDING,
+    ) -> None:
+        self.max_records = max(1, max_records)
+        self.interval_s = max(1, interval_ms) / 1000.0
+        self.max_pending = max(self.max_records, max_pending)
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self.serializations = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="session-log-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, file_path: str, record: Dict[str, Any]) -> None:
+        with self._cond:
+            if self._closed:
+                # Late records after shutdown are written through rather than dropped
+                self._write_batch([(file_path, record)])
+                return
+            if len(self._pending) >= self.max_pending:
+                self._drop("backlog", 1)
+                return
+            self._pending.append((file_path, record))
+            if len(self._pending) >= self.max_records:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.interval_s
+                while not self._closed and len(self._pending) < self.max_records:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # The batch is already counted as dropped; keep the thread alive for the next ones
+                _log.exception("session log writer failed to write a batch")
+
+    def _drop(self, reason: str, records: int) -> None:
+        self.dropped += records
+        LOG_RECORDS_DROPPED.inc(records, backend=self.name, reason=reason)
+
+    def _drain(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._cond:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _encode_batch(self, batch: List[Tuple[str, Dict[str, Any]]], key: Callable[[str, Dict[str, Any]], str]) -> Dict[str, List[bytes]]:
+        """orjson lines of a batch grouped by `key(file_path, record)`, in arrival order."""
+        # One memo per batch: a turn's records usually land in the same batch
+        memo = ModelMemo(max_entries=len(batch) * 4)
+
+        def default(obj: Any) -> Any:
+            if isinstance(obj, BaseModel):
+                return memo.fragment(obj)
+            return str(obj)
+
+        grouped: Dict[str, List[bytes]] = defaultdict(list)
+        for file_path, record in batch:
+            grouped[key(file_path, record)].append(orjson.dumps(record, default=default))
+        self.serializations += memo.serializations
+        return grouped
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        grouped = self._encode_batch(batch, lambda file_path, _: file_path)
+        for file_path, lines in grouped.items():
+            with open(file_path, "ab") as f:
+                f.write(b"\n".join(lines) + b"\n")
+        notify_appended(grouped)
+
+    def flush(self) -> None:
+        # Serialize flushes so batches from the worker and shutdown hook keep their order
+        with self._write_lock:
+            batch = self._drain()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    self._drop("write_error", len(batch))
+                    raise
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+_default_writer: Optional[LogWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def default_logs_dir() -> str:
+    return os.path.abspath(
+        os.getenv("LOGS_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "logs")
+    )
+
+
+def _build_writer() -> LogWriter:
+    if LOG_BACKEND == "segment":
+        from app.core.log_segments import SegmentLogWriter
+
+        return SegmentLogWriter()
+    if LOG_BACKEND == "buffered":
+        return BufferedLogWriter()
+    return FileLogWriter()
+
+
+def get_log_writer() -> LogWriter:
+    """Process-wide writer selected by LOG_BACKEND (file|buffered|segment)."""
+    global _default_writer
+    if _default_writer is None:
+        with _default_writer_lock:
+            if _default_writer is None:
+                _default_writer = _build_writer()
+    return _default_writer
+
+
+def set_log_writer(writer: Optional[LogWriter]) -> None:
+    """Replace the process-wide writer (None: rebuild from LOG_BACKEND on next use)."""
+    global _default_writer
+    with _default_writer_lock:
+        _default_writer = writer
+
+
+def flush_logs() -> None:
+    """Synchronously write out every queued record; safe to call from shutdown hooks."""
+    if _default_writer is not None:
+        _default_writer.flush()
+
+
+def shutdown_logs() -> None:
+    global _default_writer
+    with _default_writer_lock:
+        writer, _default_writer = _default_writer, None
+    if writer is not None:
+        writer.close()
+
+
+atexit.register(shutdown_logs)
+
+
+_MESSAGE_EVENTS = {"user_message", "assistant_message"}
+# Small and needed for billing, so kept at every tier along with the messages
+_USAGE_EVENTS = {"llm_usage"}
+# Fields kept from logged models at the summary tier
+_SUMMARY_FIELDS = ("intent", "missing_slots", "approved", "score", "success", "error", "action_name", "elapsed_ms")
+
+
+def _summarize(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        fields = type(value).model_fields
+        return {f: getattr(value, f) for f in _SUMMARY_FIELDS if f in fields}
+    return None
+
+
+def _render(record: Dict[str, Any], level: str) -> Optional[Dict[str, Any]]:
+    if level == "full":
+        return record
+    event = record["event"]
+    if event in _MESSAGE_EVENTS or event in _USAGE_EVENTS:
+        return record
+    if level == "messages":
+        return None
+    if event == "agent_step":
+        payload = record["payload"]
+        return {**record, "payload": {"name": payload["name"], "output": _summarize(payload["output"])}}
+    return record
+
+
+class TurnLog:
+    """Records of one turn, held until the turn's verbosity is known."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self.reasons: List[str] = []
+        self.intent: Optional[str] = None
 
 
 class SessionLogger:
-    def __init__(self, session_id: str, base_dir: str | None = None) -> None:
+    def __init__(self, session_id: str, base_dir: str | None = None, writer: LogWriter | None = None) -> None:
         self.session_id = session_id
-        logs_dir = base_dir or os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "..", "logs"
-        )
-        self.logs_dir = os.path.abspath(logs_dir)
+        self.logs_dir = os.path.abspath(base_dir) if base_dir else default_logs_dir()
         Path(self.logs_dir).mkdir(parents=True, exist_ok=True)
         self.file_path = os.path.join(self.logs_dir, f"session_{self.session_id}.jsonl")
+        self.writer = writer or get_log_writer()
+        self._turn: Optional[TurnLog] = None
 
     def write(self, event_type: str, payload: Dict[str, Any]) -> None:
         record = {
@@ -24,10 +365,77 @@ class SessionLogger:
             "event": event_type,
             "payload": payload,
         }
-        with open(self.file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        turn = self._turn
+        if turn is not None:
+            # Timed when the turn is flushed, where the writer is actually called
+            turn.records.append(record)
+        else:
+            self._append(record)
 
-    def step(self, name: str, input_data: Dict[str, Any], output_data: Dict[str, Any]) -> None:
+    def _append(self, record: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        self.writer.append(self.file_path, record)
+        LOG_WRITE_SECONDS.observe(time.perf_counter() - start, backend=getattr(self.writer, "name", "custom"))
+
+    @contextmanager
+    def turn(self) -> Iterator[TurnLog]:
+        """Scope one pipeline turn below the full tier (LOG_LEVEL).
+
+        Records are held until the turn ends, then written at LOG_LEVEL, or in
+        full if the turn was sampled (LOG_SAMPLE_RATES by intent; set
+        `.intent` on the yielded TurnLog), escalated, or raised.
+        """
+        if LOG_LEVEL == "full":
+            # Nothing to decide: records go straight to the writer
+            yield TurnLog()
+            return
+        turn = self.begin_turn()
+        try:
+            yield turn
+        except BaseException:
+            turn.reasons.append("error")
+            raise
+        finally:
+            self.end_turn(turn)
+
+    def begin_turn(self) -> TurnLog:
+        """Hold the records of a turn, at every LOG_LEVEL, until `end_turn`.
+
+        For callers on an event loop: the writer is then only called from
+        `end_turn`, which they run on a worker thread.
+        """
+        turn = self._turn = TurnLog()
+        return turn
+
+    def end_turn(self, turn: TurnLog) -> None:
+        self._turn = None
+        self._write_turn(turn)
+
+    def escalate(self, reason: str) -> None:
+        """Log the current turn in full, e.g. after a fallback or failed execution."""
+        turn = self._turn
+        if turn is not None and reason not in turn.reasons:
+            turn.reasons.append(reason)
+
+    def _turn_level(self, turn: TurnLog) -> str:
+        if turn.reasons:
+            return "full"
+        rate = LOG_SAMPLE_RATES.get(turn.intent or "", LOG_SAMPLE_RATES.get("default", 0.0))
+        if rate and random.random() < rate:
+            return "full"
+        return LOG_LEVEL
+
+    def _write_turn(self, turn: TurnLog) -> None:
+        level = self._turn_level(turn)
+        for record in turn.records:
+            rendered = _render(record, level)
+            if rendered is not None:
+                self._append(rendered)
+        if turn.reasons and LOG_LEVEL != "full":
+            self.info("Turn logged in full", reasons=turn.reasons)
+
+    def step(self, name: str, input_data: Dict[str, Any], output_data: Any) -> None:
+        # Payloads may hold pydantic models; writers serialize them lazily (see ModelMemo)
         self.write(
             "agent_step",
             {"name": name, "input": input_data, "output": output_data},
@@ -42,6 +450,10 @@ class SessionLogger:
     def state_transition(self, prev: str, new: str) -> None:
         self.write("state_transition", {"from": prev, "to": new})
 
+    def llm_usage(self, turn: Dict[str, Dict[str, float]], session_in_process: Dict[str, float]) -> None:
+        # Totals are per worker: summing the last record of each pid gives the session's total
+        self.write("llm_usage", {"turn": turn, "session_in_process": session_in_process, "pid": os.getpid()})
+
     def info(self, message: str, **kwargs: Any) -> None:
         payload = {"message": message, **kwargs}
-        self.write("info", payload) 
\ No newline at end of file
+        self.write("info", payload)
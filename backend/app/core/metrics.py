@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in {"1", "true", "yes"}
+
+# Seconds; spans in-process rule agents (sub-ms) up to slow Bedrock calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+# Collector output: (name, type, help, [(labels, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; one lock and a bisect per observation."""
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(self.labelnames, key, 'le="%s"' % _number(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], List[Family]]] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Family]]) -> None:
+        """Callback evaluated at scrape time, e.g. to export existing stats() dicts as gauges."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TURN_SECONDS = REGISTRY.register(Histogram(
+    "agent_turn_seconds", "Pipeline turn latency.", ("mode", "intent", "outcome"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "agent_stage_seconds", "Latency of each agent call within a turn.", ("stage", "mode", "intent"),
+))
+LLM_CALL_SECONDS = REGISTRY.register(Histogram(
+    "llm_call_seconds", "Latency of LLM calls by calling agent and where the answer came from.", ("agent", "source"),
+))
+LLM_CALL_ERRORS = REGISTRY.register(Counter(
+    "llm_call_errors_total", "LLM calls that raised.", ("agent",),
+))
+LLM_GOVERNOR_EVENTS = REGISTRY.register(Counter(
+    "llm_governor_events_total",
+    "LLM governor outcomes: retry, timeout, throttled, error, overloaded, circuit_open, degraded, rerouted.",
+    ("agent", "event"),
+))
+LLM_COALESCED_CALLS = REGISTRY.register(Counter(
+    "llm_coalesced_calls_total",
+    "LLM calls by single-flight role: leader (sent to the model) or follower (shared a leader's request).",
+    ("agent", "role"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Model tokens billed, by calling agent, turn intent and kind (input or output).",
+    ("agent", "intent", "kind"),
+))
+LLM_COST_USD = REGISTRY.register(Counter(
+    "llm_cost_usd_total", "Estimated model cost in USD (LLM_PRICE_*_PER_1K), by calling agent and turn intent.",
+    ("agent", "intent"),
+))
+LLM_BILLED_CALLS = REGISTRY.register(Counter(
+    "llm_billed_calls_total", "Model calls that reported token usage, by calling agent and turn intent.",
+    ("agent", "intent"),
+))
+LOG_WRITE_SECONDS = REGISTRY.register(Histogram(
+    "session_log_write_seconds", "Time spent handing one record to the session log writer on the request path.", ("backend",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+))
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "session_log_records_dropped_total",
+    "Session log records a buffered writer dropped: backlog (pending buffer full) or write_error (batch failed to write).",
+    ("backend", "reason"),
+))
+
+
+Usage = Dict[str, float]
+
+
+def _emit_tokens(agent: str, intent: str, usage: Usage) -> None:
+    LLM_TOKENS.inc(usage["input_tokens"], agent=agent, intent=intent, kind="input")
+    LLM_TOKENS.inc(usage["output_tokens"], agent=agent, intent=intent, kind="output")
+    LLM_COST_USD.inc(usage["cost_usd"], agent=agent, intent=intent)
+    LLM_BILLED_CALLS.inc(usage["calls"], agent=agent, intent=intent)
+
+
+class TurnTimer:
+    """Collects stage timings and LLM token usage for one turn; labelled with the intent once the turn is done."""
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        # agent -> {calls, input_tokens, output_tokens, cost_usd}; parallel stages add concurrently
+        self.llm_usage: Dict[str, Usage] = {}
+        self._usage_lock = threading.Lock()
+        self.response: Any = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages.append((stage, seconds))
+
+    def record_tokens(self, agent: str, input_tokens: int, output_tokens: int, cost_usd: float) -> None:
+        with self._usage_lock:
+            usage = self.llm_usage.setdefault(agent, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+            usage["calls"] += 1
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+            usage["cost_usd"] += cost_usd
+
+    def finish(self) -> None:
+        response = self.response
+        intent = getattr(getattr(response, "intent", None), "value", None) or "none"
+        for stage, seconds in self.stages:
+            STAGE_SECONDS.observe(seconds, stage=stage, mode=self.mode, intent=intent)
+        with self._usage_lock:
+            usage = list(self.llm_usage.items())
+        for agent, tokens in usage:
+            _emit_tokens(agent, intent, tokens)
+        TURN_SECONDS.observe(time.perf_counter() - self.start, mode=self.mode, intent=intent, outcome=_outcome(response))
+
+
+def _outcome(response: Any) -> str:
+    if response is None:
+        return "error"
+    if response.execution_review_score is not None:
+        return "completed"
+    if response.missing_slots:
+        return "clarification"
+    return "fallback"
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnTimer]] = contextvars.ContextVar("current_turn", default=None)
+
+
+@contextmanager
+def track_turn(mode: str) -> Iterator[TurnTimer]:
+    """Time a pipeline turn; set `.response` on the yielded timer before leaving the block."""
+    timer = TurnTimer(mode)
+    token = _current_turn.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_turn.reset(token)
+        timer.finish()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time an agent call inside the current `track_turn` block (no-op outside one)."""
+    timer = _current_turn.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.record(name, time.perf_counter() - start)
+
+
+def record_llm_tokens(agent: str, input_tokens: int, output_tokens: int, cost_usd: float) -> None:
+    """Count a model call's tokens toward the current `track_turn` block, or under intent "none" outside one."""
+    timer = _current_turn.get()
+    if timer is not None:
+        timer.record_tokens(agent, input_tokens, output_tokens, cost_usd)
+    else:
+        _emit_tokens(agent, "none", {"calls": 1, "input_tokens": input_tokens, "output_tokens": output_tokens, "cost_usd": cost_usd})
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
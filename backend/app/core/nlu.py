@@ -1,110 +1,126 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
 
 from .types import INTENT_TO_REQUIRED_SLOTS, IntentName
 
 
-def detect_intent(text: str) -> Optional[IntentName]:
-    t = text.lower()
+# All patterns are compiled once at import. Intent detection runs a single
+# keyword scan to find candidate intents, then confirms candidates in priority
+# order with their full patterns; slot extraction walks a per-intent table.
+
+# Trigger keywords per intent. Every full intent pattern below requires one of
+# its keywords, so intents without a keyword hit can be skipped. The lookahead
+# makes matches overlap, e.g. both "send" and "damaged" in "sendamaged card".
+_INTENT_KEYWORDS = re.compile(
+    r"(?=(?P<card_replace>lost|stolen|damaged|replace)"
+    r"|(?P<report_fraud>fraud|unauthori[sz]ed|dispute)"
+    r"|(?P<open_account>open|create)"
+    r"|(?P<check_balance>balance|funds available|how much do i have)"
+    r"|(?P<transfer_money>transfer|send|pay))"
+)
+
+_CARD_REPLACE_NEAR = re.compile(r"(lost|stolen|damaged)[^\n]{0,40}\bcard\b")
+_CARD_REPLACE_VERB = re.compile(r"\breplace[^\n]{0,40}\b(card|debit|credit)\b")
+_CARD_REASON_WORD = re.compile(r"\b(lost|stolen|damaged)\b")
+_CARD_WORD = re.compile(r"\b(card|debit|credit)\b")
+
 
+def _card_replace(t: str) -> bool:
     # Card replacement: match lost/stolen/damaged + card, or replace + card
-    if re.search(r"(lost|stolen|damaged)[^\n]{0,40}\bcard\b", t) or re.search(
-        r"\breplace[^\n]{0,40}\b(card|debit|credit)\b", t
-    ) or (re.search(r"\b(lost|stolen|damaged)\b", t) and re.search(r"\b(card|debit|credit)\b", t)):
-        return IntentName.card_replace
+    return bool(
+        _CARD_REPLACE_NEAR.search(t)
+        or _CARD_REPLACE_VERB.search(t)
+        or (_CARD_REASON_WORD.search(t) and _CARD_WORD.search(t))
+    )
 
-    # Fraud report
-    if re.search(r"\b(fraud|unauthori[sz]ed|dispute)\b", t):
-        return IntentName.report_fraud
 
-    # Open account
-    if re.search(r"\b(open|create)\b[^\n]{0,30}\b(account)\b", t):
-        return IntentName.open_account
+def _matches(pattern: str) -> Callable[[str], bool]:
+    compiled = re.compile(pattern)
+    return lambda t: compiled.search(t) is not None
 
-    # Check balance
-    if re.search(r"\b(balance|funds available|how much do i have)\b", t):
-        return IntentName.check_balance
 
-    # Transfer money
-    if re.search(r"\b(transfer|send|pay)\b[^\n]{0,30}\b(money|amount|\$|to|from|[0-9])\b", t):
-        return IntentName.transfer_money
+# Priority order matters: the first confirmed intent wins
+_INTENT_RULES: Tuple[Tuple[IntentName, Callable[[str], bool]], ...] = (
+    (IntentName.card_replace, _card_replace),
+    (IntentName.report_fraud, _matches(r"\b(fraud|unauthori[sz]ed|dispute)\b")),
+    (IntentName.open_account, _matches(r"\b(open|create)\b[^\n]{0,30}\b(account)\b")),
+    (IntentName.check_balance, _matches(r"\b(balance|funds available|how much do i have)\b")),
+    (IntentName.transfer_money, _matches(r"\b(transfer|send|pay)\b[^\n]{0,30}\b(money|amount|\$|to|from|[0-9])\b")),
+)
 
+
+def detect_intent(text: str) -> Optional[IntentName]:
+    t = text.lower()
+    candidates = {m.lastgroup for m in _INTENT_KEYWORDS.finditer(t)}
+    if not candidates:
+        return None
+    for intent, confirm in _INTENT_RULES:
+        if intent.value in candidates and confirm(t):
+            return intent
     return None
 
 
-def extract_slots(intent: Optional[IntentName], text: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
-    if intent is None:
-        return {}, []
+def _i(pattern: str) -> Pattern[str]:
+    return re.compile(pattern, re.I)
+
+
+def _card_type(value: str) -> Optional[str]:
+    # Only lower-case debit/credit count as an explicit card type
+    return value if value in ("debit", "credit") else None
 
-    required = INTENT_TO_REQUIRED_SLOTS[intent]
-    slots: Dict[str, Optional[str]] = {s: None for s in required}
 
-    # Very naive regex/pattern based extraction just for PoC
-    t = text
+# slot -> ordered (pattern, group) alternatives; the first pattern that matches
+# supplies the value, optionally post-processed
+_SlotRule = Tuple[str, Tuple[Tuple[Pattern[str], int], ...], Optional[Callable[[str], Optional[str]]]]
 
-    if intent == IntentName.card_replace:
+_SLOT_RULES: Dict[IntentName, Tuple[_SlotRule, ...]] = {
+    IntentName.card_replace: (
         # Only set when explicitly stated and not just as part of 'credit card'
-        m = re.search(r"(card type|type of card)[:\s]*(debit|credit)", t, re.I)
-        if not m:
-            m = re.search(r"\b(debit|credit)\b(?!\s*card)", t, re.I)
-        if m:
-            slots["card_type"] = m.group(2) if m.lastindex and m.lastindex >= 2 else m.group(1)
-            if slots["card_type"] not in ("debit", "credit"):
-                slots["card_type"] = None
-
-        m = re.search(r"address is ([^.\n]+)", t, re.I)
-        if m:
-            slots["delivery_address"] = m.group(1).strip()
-        m = re.search(r"ship to ([^.\n]+)", t, re.I)
-        if m:
-            slots["delivery_address"] = m.group(1).strip()
-        if re.search(r"lost|stolen|damaged", t, re.I):
-            slots["reason"] = re.search(r"lost|stolen|damaged", t, re.I).group(0)
-
-    elif intent == IntentName.report_fraud:
-        m = re.search(r"transaction(?: id)?[:\s]*([A-Za-z0-9-]{6,})", t, re.I)
-        if m:
-            slots["transaction_id"] = m.group(1)
-        if re.search(r"card|upi|netbank|ach|wire", t, re.I):
-            slots["fraud_type"] = re.search(r"card|upi|netbank|ach|wire", t, re.I).group(0)
-        if re.search(r"\b(confirm|yes|proceed)\b", t, re.I):
-            slots["user_confirmation"] = "yes"
-
-    elif intent == IntentName.open_account:
-        if re.search(r"savings|checking|current", t, re.I):
-            slots["account_type"] = re.search(r"savings|checking|current", t, re.I).group(0)
-        m = re.search(r"name is ([A-Za-z ]{3,})", t, re.I)
-        if m:
-            slots["customer_name"] = m.group(1).strip()
-        m = re.search(r"id(?:\s*proof)?[:\s]*([A-Za-z0-9-]{4,})", t, re.I)
-        if m:
-            slots["id_proof"] = m.group(1)
-
-    elif intent == IntentName.check_balance:
-        m = re.search(r"account(?: number| no\.)?[:\s]*([0-9]{6,})", t, re.I)
-        if m:
-            slots["account_number"] = m.group(1)
-        m = re.search(r"(token|auth|otp)[:\s]*([A-Za-z0-9-]{4,})", t, re.I)
-        if m:
-            slots["auth_token"] = m.group(2)
-
-    elif intent == IntentName.transfer_money:
-        m = re.search(r"from[:\s]*([0-9]{6,})", t, re.I)
-        if m:
-            slots["sender_account"] = m.group(1)
-        m = re.search(r"to[:\s]*([0-9]{6,})", t, re.I)
-        if m:
-            slots["receiver_account"] = m.group(1)
-        m = re.search(r"amount[:\s]*\$?([0-9]+(?:\.[0-9]{1,2})?)", t, re.I)
-        if m:
-            slots["amount"] = m.group(1)
+        ("card_type", ((_i(r"(card type|type of card)[:\s]*(debit|credit)"), 2), (_i(r"\b(debit|credit)\b(?!\s*card)"), 1)), _card_type),
+        # "ship to" takes precedence over "address is"
+        ("delivery_address", ((_i(r"ship to ([^.\n]+)"), 1), (_i(r"address is ([^.\n]+)"), 1)), str.strip),
+        ("reason", ((_i(r"lost|stolen|damaged"), 0),), None),
+    ),
+    IntentName.report_fraud: (
+        ("transaction_id", ((_i(r"transaction(?: id)?[:\s]*([A-Za-z0-9-]{6,})"), 1),), None),
+        ("fraud_type", ((_i(r"card|upi|netbank|ach|wire"), 0),), None),
+        ("user_confirmation", ((_i(r"\b(confirm|yes|proceed)\b"), 0),), lambda _: "yes"),
+    ),
+    IntentName.open_account: (
+        ("account_type", ((_i(r"savings|checking|current"), 0),), None),
+        ("customer_name", ((_i(r"name is ([A-Za-z ]{3,})"), 1),), str.strip),
+        ("id_proof", ((_i(r"id(?:\s*proof)?[:\s]*([A-Za-z0-9-]{4,})"), 1),), None),
+    ),
+    IntentName.check_balance: (
+        ("account_number", ((_i(r"account(?: number| no\.)?[:\s]*([0-9]{6,})"), 1),), None),
+        ("auth_token", ((_i(r"(token|auth|otp)[:\s]*([A-Za-z0-9-]{4,})"), 2),), None),
+    ),
+    IntentName.transfer_money: (
+        ("sender_account", ((_i(r"from[:\s]*([0-9]{6,})"), 1),), None),
+        ("receiver_account", ((_i(r"to[:\s]*([0-9]{6,})"), 1),), None),
         # Fallback: handle 'transfer 10' or 'send 10'
-        if not slots.get("amount"):
-            m = re.search(r"\b(?:transfer|send|pay)\s+\$?([0-9]+(?:\.[0-9]{1,2})?)\b", t, re.I)
+        ("amount", (
+            (_i(r"amount[:\s]*\$?([0-9]+(?:\.[0-9]{1,2})?)"), 1),
+            (_i(r"\b(?:transfer|send|pay)\s+\$?([0-9]+(?:\.[0-9]{1,2})?)\b"), 1),
+        ), None),
+    ),
+}
+
+
+def extract_slots(intent: Optional[IntentName], text: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    if intent is None:
+        return {}, []
+
+    slots: Dict[str, Optional[str]] = {s: None for s in INTENT_TO_REQUIRED_SLOTS[intent]}
+    for slot, alternatives, transform in _SLOT_RULES[intent]:
+        for pattern, group in alternatives:
+            m = pattern.search(text)
             if m:
-                slots["amount"] = m.group(1)
+                value = m.group(group)
+                slots[slot] = transform(value) if transform else value
+                break
 
     missing = [k for k, v in slots.items() if not v]
-    return slots, missing 
\ No newline at end of file
+    return slots, missing
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import os
+import queue
 import re
 import uuid
-from dataclasses import dataclass
-from typing import Dict, Optional
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from app.agents.executioner import Executioner
 from app.agents.planner import Planner
@@ -12,46 +16,180 @@ from app.agents.responder import Responder
 from app.agents.reviewer import Reviewer
 from app.agents_llm.planner_llm import LLMPlanner
 from app.agents_llm.reviewer_llm import LLMReviewer
-from app.agents_llm.executioner_llm import execute_plan_llm
-from app.agents_llm.responder_llm import summarize_result_llm
-from app.agents_llm.fallback_agent_llm import fallback_response_llm
-from app.core.logger import SessionLogger
+from app.agents_llm.executioner_llm import aexecute_plan_llm, execute_plan_llm
+from app.agents_llm.responder_llm import astream_summary_llm, asummarize_result_llm, summarize_result_llm
+from app.agents_llm.fallback_agent_llm import afallback_response_llm, fallback_response_llm
+from app.core.concurrency import LockStripes, shared_executor
+from app.core.logger import LOG_ESCALATE_BELOW_SCORE, SessionLogger, TurnLog
+from app.core.metrics import LLM_GOVERNOR_EVENTS, TurnTimer, stage, track_turn
 from app.core.types import (
     ChatResponse,
+    ExecutionResult,
     INTENT_TO_REQUIRED_SLOTS,
     IntentName,
     Message,
     Plan,
     SessionState,
 )
-from app.core.nlu import extract_slots
+from app.core.intent_classifier import predict_intent
+from app.core.nlu import detect_intent, extract_slots
+from app.core.routing import LLM_ROUTING, HybridRouter
+from app.core.session_store import SessionStore, build_session_store
+from app.llm.governor import LLMUnavailable, get_governor
+from app.llm.usage import usage_totals
+from app.graph.agent_graph import (
+    EXECUTION_FAILED,
+    EXECUTION_REJECTED,
+    MIN_REVIEW_SCORE,
+    NO_INTENT,
+    PLAN_REJECTED,
+    GraphTurn,
+    as_message,
+    get_turn_graph,
+)
+from app.core.state_backend import (
+    IDLE_STATE,
+    SessionMemory,
+    StateBackend,
+    StateConflict,
+    build_state_backend,
+    decode_memory,
+    encode_memory,
+)
 
 
 USE_LLM = os.getenv("USE_LLM", "false").lower() in {"1", "true", "yes"}
+# LLM mode: run plan review and execution concurrently, discarding the result on rejection
+SPECULATIVE_EXECUTION = os.getenv("SPECULATIVE_EXECUTION", "false").lower() in {"1", "true", "yes"}
+# Intents with real side effects are never executed before their plan is approved
+SPECULATIVE_EXCLUDED_INTENTS = {
+    i.strip() for i in os.getenv("SPECULATIVE_EXCLUDED_INTENTS", "transfer_money").split(",") if i.strip()
+}
+SPECULATIVE_MAX_WORKERS = int(os.getenv("SPECULATIVE_MAX_WORKERS", "16"))
+# Sessions processed in parallel by process_many / POST /chat/batch
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "16"))
+# LLM turns: "inline" (the hand-written control flow below) or "graph" (the compiled LangGraph turn graph)
+PIPELINE_ENGINE = os.getenv("PIPELINE_ENGINE", "inline").lower()
+
+
+DEFAULT_FALLBACK_MESSAGE = "Sorry, we couldn't process your request."
+
+# Streaming callback: (event name, JSON-able payload)
+EmitFn = Callable[[str, Dict[str, Any]], None]
+
+
+def _discard_event(event: str, data: Dict[str, Any]) -> None:
+    pass
+
+
+def _default_fallback(user_message: str, reason: str) -> str:
+    return DEFAULT_FALLBACK_MESSAGE
 
 
 @dataclass
-class SessionMemory:
-    state: SessionState
-    plan: Optional[Plan]
+class SessionContext:
+    logger: SessionLogger
+    memory: SessionMemory
+    # State backend bookkeeping: stored version and encoded state as loaded this turn
+    version: int = 0
+    snapshot: bytes = IDLE_STATE
+    # Model tokens and cost of the session's turns served by this process (not shared across workers)
+    llm_usage: Dict[str, float] = field(default_factory=dict)
+
+
+class BatchTurnSkipped(Exception):
+    """A batch item that was not run because an earlier turn of its session failed."""
+
+
+def _is_awaiting_clarification(ctx: SessionContext) -> bool:
+    return ctx.memory.state == SessionState.awaiting_clarification
 
 
 class AgentPipeline:
-    def __init__(self) -> None:
-        self._loggers: dict[str, SessionLogger] = {}
-        self._memory: Dict[str, SessionMemory] = {}
-
-    def _get_logger(self, session_id: str) -> SessionLogger:
-        if session_id not in self._loggers:
-            self._loggers[session_id] = SessionLogger(session_id)
-        return self._loggers[session_id]
-
-    def _get_memory(self, session_id: str) -> SessionMemory:
-        mem = self._memory.get(session_id)
-        if not mem:
-            mem = SessionMemory(state=SessionState.idle, plan=None)
-            self._memory[session_id] = mem
-        return mem
+    def __init__(
+        self,
+        session_store: SessionStore[SessionContext] | None = None,
+        state_backend: StateBackend | None = None,
+    ) -> None:
+        if session_store is None:
+            session_store = build_session_store(is_protected=_is_awaiting_clarification)
+        self._sessions: SessionStore[SessionContext] = session_store
+        # None: session state lives only in this process's session store
+        self._state = state_backend if state_backend is not None else build_state_backend()
+        self._locks = LockStripes()
+        self._router = HybridRouter()
+
+    def _get_session(self, session_id: str) -> SessionContext:
+        ctx = self._sessions.get(session_id)
+        if ctx is None:
+            ctx = SessionContext(
+                logger=SessionLogger(session_id),
+                memory=SessionMemory(state=SessionState.idle, plan=None),
+            )
+            self._sessions.put(session_id, ctx)
+        return ctx
+
+    def session_stats(self) -> Dict[str, int]:
+        return self._sessions.stats()
+
+    def state_stats(self) -> Dict[str, int]:
+        return self._state.stats() if self._state is not None else {}
+
+    def _load_state(self, ctx: SessionContext, sid: str) -> None:
+        # One read per turn: another worker may have advanced the session since we last saw it
+        if self._state is None:
+            return
+        loaded = self._state.load(sid)
+        ctx.snapshot, ctx.version = loaded if loaded is not None else (IDLE_STATE, 0)
+        ctx.memory = decode_memory(ctx.snapshot)
+
+    def _save_state(self, ctx: SessionContext, sid: str, claim: bool = False) -> None:
+        # One conditional write per turn, skipped when the turn left the state unchanged
+        if self._state is None:
+            return
+        data = encode_memory(ctx.memory)
+        if data == ctx.snapshot and not claim:
+            return
+        try:
+            ctx.version = self._state.save(sid, data, ctx.version)
+        except StateConflict:
+            ctx.logger.escalate("state_conflict")
+            raise
+        ctx.snapshot = data
+
+    def _claim_state(self, ctx: SessionContext, sid: str) -> None:
+        """Save the state before the executioner runs, so a turn racing another worker
+        gets its StateConflict before the operation instead of after it."""
+        self._save_state(ctx, sid, claim=True)
+
+    @contextmanager
+    def _session_turn(self, sid: str) -> Iterator[Tuple[SessionContext, TurnLog]]:
+        """Load the session's state, scope the turn's logs, and save the state if the turn succeeds."""
+        ctx = self._get_session(sid)
+        self._load_state(ctx, sid)
+        with ctx.logger.turn() as turn_log:
+            yield ctx, turn_log
+            self._save_state(ctx, sid)
+
+    @asynccontextmanager
+    async def _asession_turn(self, sid: str) -> AsyncIterator[Tuple[SessionContext, TurnLog]]:
+        """`_session_turn` for turns on the event loop: the state backend and the log writer,
+        both blocking, are only called from worker threads."""
+        ctx = self._get_session(sid)
+        await asyncio.to_thread(self._load_state, ctx, sid)
+        logger = ctx.logger
+        turn_log = logger.begin_turn()
+        try:
+            yield ctx, turn_log
+            await asyncio.to_thread(self._save_state, ctx, sid)
+        except BaseException:
+            logger.escalate("error")
+            raise
+        finally:
+            await asyncio.to_thread(logger.end_turn, turn_log)
+
+    async def _aclaim_state(self, ctx: SessionContext, sid: str) -> None:
+        await asyncio.to_thread(self._claim_state, ctx, sid)
 
     def _set_state(self, logger: SessionLogger, mem: SessionMemory, new_state: SessionState) -> None:
         if mem.state != new_state:
@@ -85,8 +223,15 @@ class AgentPipeline:
     def _get_agents(self, logger: SessionLogger):
         if USE_LLM:
             return LLMPlanner(logger), LLMReviewer(logger), execute_plan_llm, summarize_result_llm, fallback_response_llm
+        return self._get_rule_agents(logger)
+
+    def _get_rule_agents(self, logger: SessionLogger):
         return Planner(logger), Reviewer(logger), Executioner(logger), Responder(logger), None
 
+    def _get_async_agents(self, logger: SessionLogger):
+        """LLM agents for `aprocess`: planner.arun, reviewer.areview_*, and async functions."""
+        return LLMPlanner(logger), LLMReviewer(logger), aexecute_plan_llm, asummarize_result_llm, afallback_response_llm
+
     def _normalize_review(self, review_obj) -> tuple[bool, float]:
         """Return (approved, score_1_to_10) handling both 'approved' and legacy 'approval',
         and normalizing score if provided on 0-1 scale."""
@@ -103,14 +248,123 @@ class AgentPipeline:
             score_val = round(score_val * 10.0, 1)
         return approved, score_val
 
-    def process(self, user_message: str, session_id: str | None = None) -> ChatResponse:
-        sid = session_id or str(uuid.uuid4())
-        logger = self._get_logger(sid)
+    def _use_llm_for(self, user_message: str, mem: SessionMemory) -> bool:
+        """Whether this turn goes to the LLM agents (hybrid routing may keep it rule-based)."""
+        if not USE_LLM:
+            return False
+        if get_governor().is_open():
+            # Bedrock is failing: serve the turn with the rule-based agents until the breaker closes
+            LLM_GOVERNOR_EVENTS.inc(agent="pipeline", event="rerouted")
+            return False
+        if LLM_ROUTING != "hybrid":
+            return True
+        pending = mem.plan if mem.state == SessionState.awaiting_clarification else None
+        return self._router.route(user_message, pending) == "llm"
+
+    def routing_stats(self) -> Dict[str, float]:
+        return self._router.stats()
+
+    @staticmethod
+    def _degraded(logger: SessionLogger, agent: str, exc: LLMUnavailable) -> None:
+        logger.info("LLM unavailable; rule-based agent used", agent=agent, reason=exc.reason)
+        logger.escalate("llm_unavailable")
+        LLM_GOVERNOR_EVENTS.inc(agent=agent, event="degraded")
+
+    def _guarded(self, logger: SessionLogger, agent: str, llm_call: Callable[[], Any], rule_call: Callable[[], Any]) -> Any:
+        """`llm_call()`, or `rule_call()` if the LLM governor refused or gave up on it."""
+        try:
+            return llm_call()
+        except LLMUnavailable as exc:
+            self._degraded(logger, agent, exc)
+            return rule_call()
+
+    async def _aguarded(
+        self, logger: SessionLogger, agent: str, llm_call: Callable[[], Awaitable[Any]], rule_call: Callable[[], Any]
+    ) -> Any:
+        try:
+            return await llm_call()
+        except LLMUnavailable as exc:
+            self._degraded(logger, agent, exc)
+            return rule_call()
+
+    def _execution_unavailable(
+        self, logger: SessionLogger, exc: LLMUnavailable, rule_call: Callable[[], ExecutionResult]
+    ) -> ExecutionResult:
+        # A request that timed out or failed may already have moved money; only one
+        # that never went out is safe to run again with the rule executioner
+        if not exc.sent:
+            self._degraded(logger, "executioner", exc)
+            return rule_call()
+        logger.info("LLM executioner failed after the request was sent; not rerun", reason=exc.reason)
+        logger.escalate("llm_unavailable")
+        return ExecutionResult(success=False, error=f"executioner unavailable: {exc.reason}")
+
+    def _guarded_execution(
+        self, logger: SessionLogger, llm_call: Callable[[], ExecutionResult], rule_call: Callable[[], ExecutionResult]
+    ) -> ExecutionResult:
+        """`_guarded` for the executioner: `rule_call()` only if the request was never sent, else a failed result."""
+        try:
+            return llm_call()
+        except LLMUnavailable as exc:
+            return self._execution_unavailable(logger, exc, rule_call)
+
+    async def _aguarded_execution(
+        self,
+        logger: SessionLogger,
+        llm_call: Callable[[], Awaitable[ExecutionResult]],
+        rule_call: Callable[[], ExecutionResult],
+    ) -> ExecutionResult:
+        try:
+            return await llm_call()
+        except LLMUnavailable as exc:
+            return self._execution_unavailable(logger, exc, rule_call)
+
+    async def _astream_response(
+        self,
+        logger: SessionLogger,
+        emit: Callable[[str, Dict[str, Any]], None],
+        plan: Plan,
+        exec_result: ExecutionResult,
+        rule_responder: Any,
+    ) -> Message:
+        """Stream the LLM summary as `token` events, or fall back to `rule_responder` if the governor gives up."""
+        parts: List[str] = []
+        try:
+            async for text in astream_summary_llm(exec_result):
+                parts.append(text)
+                emit("token", {"text": text})
+        except LLMUnavailable as exc:
+            self._degraded(logger, "responder", exc)
+            message = rule_responder.run(plan, exec_result)
+            if not parts:
+                # Tokens already sent can't be taken back; only a silent stream gets the rule text
+                emit("token", {"text": message.content})
+            return message
+        return Message(role="assistant", content="".join(parts).strip())
+
+    @staticmethod
+    def _timed(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        with stage(name):
+            return fn(*args)
+
+    @staticmethod
+    async def _atimed(name: str, awaitable: Awaitable[Any]) -> Any:
+        with stage(name):
+            return await awaitable
+
+    def _speculate(self, plan: Plan) -> bool:
+        return SPECULATIVE_EXECUTION and plan.intent is not None and plan.intent.value not in SPECULATIVE_EXCLUDED_INTENTS
+
+    def _start_turn(self, ctx: SessionContext, user_message: str, sid: str) -> Optional[ChatResponse]:
+        """Log the user message and handle cancel/new-request commands.
+
+        Returns the response to send for a cancel, otherwise None.
+        """
+        logger = ctx.logger
         logger.user_message(user_message)
-        mem = self._get_memory(sid)
 
         if self._is_cancel(user_message):
-            self._memory[sid] = SessionMemory(state=SessionState.idle, plan=None)
+            ctx.memory = SessionMemory(state=SessionState.idle, plan=None)
             logger.assistant_message("Okay, I’ve reset this conversation. How can I help next?")
             return ChatResponse(
                 session_id=sid,
@@ -127,110 +381,507 @@ class AgentPipeline:
             )
 
         if self._is_new_request(user_message):
-            self._memory[sid] = SessionMemory(state=SessionState.idle, plan=None)
+            ctx.memory = SessionMemory(state=SessionState.idle, plan=None)
             logger.info("New request command recognized; state reset")
+        return None
 
-        planner, reviewer, executioner, responder, fallback = self._get_agents(logger)
+    @staticmethod
+    def _tag_turn(turn_log: TurnLog, response: ChatResponse) -> ChatResponse:
+        # The intent picks the log sampling rate for the turn
+        turn_log.intent = response.intent.value if response.intent else None
+        return response
 
-        # LLM fallback wrapper
-        def do_fallback(reason: str):
-            msg = fallback(user_message, reason) if fallback else "Sorry, we couldn't process your request."
-            logger.assistant_message(msg)
-            return ChatResponse(
-                session_id=sid,
-                messages=[Message(role="user", content=user_message), Message(role="assistant", content=msg)],
-                awaiting_user=False,
-                missing_slots=[],
-                intent=None,
-                state=SessionState.idle,
-                plan_review_score=None,
-                execution_review_score=None,
-            )
+    @staticmethod
+    def _log_usage(ctx: SessionContext, turn: TurnTimer) -> None:
+        # Per-agent tokens of the turn plus this process's running totals for the session, for finding expensive prompts
+        if turn.llm_usage:
+            usage_totals(turn.llm_usage.values(), into=ctx.llm_usage)
+            ctx.logger.llm_usage(turn.llm_usage, dict(ctx.llm_usage))
+
+    @staticmethod
+    def _escalate_on_review(logger: SessionLogger, kind: str, approved: bool, score: float) -> None:
+        if not approved or score < LOG_ESCALATE_BELOW_SCORE:
+            logger.escalate(f"low_{kind}_score")
+
+    @staticmethod
+    def _classified_plan(mem: SessionMemory, user_message: str, logger: SessionLogger) -> Optional[Plan]:
+        """The classifier's plan for a new request, or None if it is unsure (clarification replies are never classified)."""
+        if mem.state == SessionState.awaiting_clarification and mem.plan:
+            return None
+        intent = predict_intent(user_message)
+        if intent is None:
+            return None
+        slots, missing = extract_slots(intent, user_message)
+        plan = Plan(intent=intent, slots=slots, missing_slots=missing, rationale="Intent from the n-gram classifier; slots via rule-based NLU.")
+        logger.step("intent_classifier", {"user_message": user_message}, plan)
+        return plan
 
-        # Clarification loop
+    def _classified_before_llm(self, mem: SessionMemory, user_message: str, logger: SessionLogger) -> Optional[Plan]:
+        # Same tiers as the rule path: the classifier only sees messages the regex NLU found no intent in
+        if detect_intent(user_message) is not None:
+            return None
+        return self._classified_plan(mem, user_message, logger)
+
+    def _plan_llm(
+        self, mem: SessionMemory, user_message: str, logger: SessionLogger, llm_plan: Callable[[], Plan]
+    ) -> Plan:
+        """A confident classifier plan for a regex miss, else `llm_plan()`: regex, then classifier, then LLM planner."""
+        classified = self._classified_before_llm(mem, user_message, logger)
+        return classified if classified is not None else llm_plan()
+
+    async def _aplan_llm(
+        self, mem: SessionMemory, user_message: str, logger: SessionLogger, llm_plan: Callable[[], Awaitable[Plan]]
+    ) -> Plan:
+        classified = self._classified_before_llm(mem, user_message, logger)
+        return classified if classified is not None else await llm_plan()
+
+    def _resolve_plan(
+        self, mem: SessionMemory, incoming_plan: Plan, user_message: str, logger: SessionLogger, classify: bool = True
+    ) -> Plan:
+        # Clarification loop: merge slot-only replies into the pending plan; otherwise a message
+        # the rule planner found no intent in gets one from the classifier when it is confident
+        # (LLM turns pass classify=False: the classifier already ran before the LLM planner)
         if mem.state in (SessionState.awaiting_clarification,) and mem.plan:
-            incoming_plan: Plan = planner.run(user_message)
             if not incoming_plan.intent and mem.plan.intent:
                 slots, missing = extract_slots(mem.plan.intent, user_message)
                 incoming_plan = Plan(intent=mem.plan.intent, slots=slots, missing_slots=missing, rationale=incoming_plan.rationale)
-            plan: Plan = self._merge_with_memory(mem.plan, incoming_plan)
-        else:
-            plan = planner.run(user_message)
+            return self._merge_with_memory(mem.plan, incoming_plan)
+        if not incoming_plan.intent and classify:
+            classified = self._classified_plan(mem, user_message, logger)
+            if classified is not None:
+                return classified
+        return incoming_plan
+
+    def _fallback_response(self, sid: str, user_message: str, logger: SessionLogger, msg: str) -> ChatResponse:
+        logger.assistant_message(msg)
+        return ChatResponse(
+            session_id=sid,
+            messages=[Message(role="user", content=user_message), Message(role="assistant", content=msg)],
+            awaiting_user=False,
+            missing_slots=[],
+            intent=None,
+            state=SessionState.idle,
+            plan_review_score=None,
+            execution_review_score=None,
+        )
+
+    def _clarification_response(
+        self, sid: str, user_message: str, logger: SessionLogger, mem: SessionMemory, plan: Plan
+    ) -> ChatResponse:
+        self._set_state(logger, mem, SessionState.awaiting_clarification)
+        mem.plan = plan
+        # Generate a friendly clarification message without exposing the internal plan
+        clarification_message = Responder(logger).run(plan, result=None)
+        logger.assistant_message(clarification_message.content)
+        return ChatResponse(
+            session_id=sid,
+            messages=[
+                Message(role="user", content=user_message),
+                clarification_message,
+            ],
+            awaiting_user=True,
+            missing_slots=plan.missing_slots,
+            intent=plan.intent,
+            state=mem.state,
+            plan_review_score=None, # No review score yet since we ask for clarification
+            execution_review_score=None,
+        )
+
+    def _completed_response(
+        self,
+        sid: str,
+        user_message: str,
+        logger: SessionLogger,
+        mem: SessionMemory,
+        plan: Plan,
+        assistant_msg: Message,
+        plan_score: float,
+        exec_score: float,
+    ) -> ChatResponse:
+        logger.assistant_message(assistant_msg.content)
+        self._set_state(logger, mem, SessionState.completed)
+        mem.plan = None
+        self._set_state(logger, mem, SessionState.idle)
+        return ChatResponse(
+            session_id=sid,
+            messages=[Message(role="user", content=user_message), assistant_msg],
+            awaiting_user=False,
+            missing_slots=[],
+            intent=plan.intent,
+            state=mem.state,
+            plan_review_score=plan_score,
+            execution_review_score=exec_score,
+        )
+
+    def process(self, user_message: str, session_id: str | None = None) -> ChatResponse:
+        sid = session_id or str(uuid.uuid4())
+        # Serialize turns of the same session; other sessions proceed in parallel
+        with self._locks.lock_for(sid):
+            with self._session_turn(sid) as (ctx, turn_log):
+                response = self._start_turn(ctx, user_message, sid)
+                if response is None:
+                    use_llm = self._use_llm_for(user_message, ctx.memory)
+                    response = self._process_turn(ctx, user_message, sid, use_llm)
+                self._tag_turn(turn_log, response)
+            return response
+
+    def iter_many(
+        self, items: Iterable[Tuple[Optional[str], str]]
+    ) -> Iterator[Tuple[int, Union[ChatResponse, Exception]]]:
+        """Process (session_id, message) items, yielding (index, response) in input order.
+
+        Each session's turns run sequentially in input order on one worker of
+        the shared batch pool; different sessions run in parallel. Items
+        without a session_id each start a new session. A turn that raises
+        yields its exception in place of the response, and the session's
+        later turns yield `BatchTurnSkipped`; other sessions carry on.
+        """
+        chains: Dict[str, List[Tuple[int, str]]] = {}
+        total = 0
+        for index, (session_id, message) in enumerate(items):
+            chains.setdefault(session_id or str(uuid.uuid4()), []).append((index, message))
+            total += 1
+
+        done: "queue.Queue[Tuple[int, Union[ChatResponse, Exception]]]" = queue.Queue()
+
+        def run_chain(sid: str, turns: List[Tuple[int, str]]) -> None:
+            failed: Optional[int] = None
+            for index, message in turns:
+                if failed is not None:
+                    done.put((index, BatchTurnSkipped(f"Turn {failed} of session {sid} failed")))
+                    continue
+                try:
+                    done.put((index, self.process(message, session_id=sid)))
+                except Exception as exc:
+                    failed = index
+                    done.put((index, exc))
+
+        executor = shared_executor("batch", BATCH_MAX_WORKERS)
+        for sid, turns in chains.items():
+            executor.submit(run_chain, sid, turns)
+
+        # Reorder completions so callers see input order
+        ready: Dict[int, Union[ChatResponse, Exception]] = {}
+        next_index = 0
+        while next_index < total:
+            index, result = done.get()
+            ready[index] = result
+            while next_index in ready:
+                yield next_index, ready.pop(next_index)
+                next_index += 1
+
+    def process_many(self, items: Iterable[Tuple[Optional[str], str]]) -> List[Union[ChatResponse, Exception]]:
+        return [result for _, result in self.iter_many(items)]
+
+    async def aprocess(self, user_message: str, session_id: str | None = None) -> ChatResponse:
+        """Async `process`: LLM turns await Bedrock via `ainvoke` instead of blocking a thread.
+
+        Rule-based turns still write logs and state synchronously, so they run
+        on a worker thread: the whole turn when LLM mode is off, the turn body
+        when hybrid routing picks the rule agents. LLM turns load and save the
+        state and write their logs on worker threads too (`_asession_turn`).
+        """
+        if not USE_LLM:
+            return await asyncio.to_thread(self.process, user_message, session_id)
+        sid = session_id or str(uuid.uuid4())
+        async with self._locks.alock_for(sid):
+            async with self._asession_turn(sid) as (ctx, turn_log):
+                response = self._start_turn(ctx, user_message, sid)
+                if response is None:
+                    if self._use_llm_for(user_message, ctx.memory):
+                        response = await self._aprocess_turn(ctx, user_message, sid)
+                    else:
+                        response = await asyncio.to_thread(self._process_turn, ctx, user_message, sid, False)
+                self._tag_turn(turn_log, response)
+            return response
+
+    def _process_turn(self, ctx: SessionContext, user_message: str, sid: str, use_llm: bool) -> ChatResponse:
+        with track_turn("llm" if use_llm else "rule") as turn:
+            if use_llm and PIPELINE_ENGINE == "graph":
+                turn.response = self._run_graph_turn(ctx, user_message, sid)
+            else:
+                turn.response = self._run_turn(ctx, user_message, sid, use_llm)
+        self._log_usage(ctx, turn)
+        return turn.response
+
+    def _graph_turn(
+        self, ctx: SessionContext, user_message: str, sid: str, llm_agents: Tuple[Any, ...], emit: Optional[EmitFn]
+    ) -> GraphTurn:
+        rules = self._get_rule_agents(ctx.logger)[:4] + (_default_fallback,)
+        return GraphTurn(
+            pipeline=self,
+            ctx=ctx,
+            user_message=user_message,
+            sid=sid,
+            llm=llm_agents,
+            rules=rules,
+            emit=emit or _discard_event,
+            streaming=emit is not None,
+        )
+
+    def _run_graph_turn(self, ctx: SessionContext, user_message: str, sid: str) -> ChatResponse:
+        """LLM turn through the compiled turn graph (PIPELINE_ENGINE=graph)."""
+        turn = self._graph_turn(ctx, user_message, sid, self._get_agents(ctx.logger), None)
+        return get_turn_graph().invoke({"turn": turn})["response"]
+
+    async def _arun_graph_turn(
+        self, ctx: SessionContext, user_message: str, sid: str, emit: Optional[EmitFn]
+    ) -> ChatResponse:
+        turn = self._graph_turn(ctx, user_message, sid, self._get_async_agents(ctx.logger), emit)
+        return (await get_turn_graph().ainvoke({"turn": turn}))["response"]
+
+    def _run_turn(self, ctx: SessionContext, user_message: str, sid: str, use_llm: bool) -> ChatResponse:
+        logger, mem = ctx.logger, ctx.memory
+
+        agents = self._get_agents(logger) if use_llm else self._get_rule_agents(logger)
+        planner, reviewer, executioner, responder, fallback = agents
+        # Stand-ins for each LLM agent when the governor refuses a call
+        rule_planner, rule_reviewer, rule_executioner, rule_responder, _ = (
+            self._get_rule_agents(logger) if use_llm else agents
+        )
+
+        def guarded(agent: str, llm_call: Callable[[], Any], rule_call: Callable[[], Any]) -> Any:
+            return self._guarded(logger, agent, llm_call, rule_call)
+
+        def execute(plan: Plan) -> ExecutionResult:
+            return self._guarded_execution(logger, lambda: executioner(plan), lambda: rule_executioner.run(plan))
+
+        # LLM fallback wrapper
+        def do_fallback(reason: str):
+            logger.escalate("fallback")
+            with stage("fallback"):
+                if fallback:
+                    msg = guarded("fallback", lambda: fallback(user_message, reason), lambda: DEFAULT_FALLBACK_MESSAGE)
+                else:
+                    msg = DEFAULT_FALLBACK_MESSAGE
+            return self._fallback_response(sid, user_message, logger, msg)
+
+        def plan_turn() -> Plan:
+            return guarded("planner", lambda: planner.run(user_message), lambda: rule_planner.run(user_message))
+
+        with stage("planner"):
+            if use_llm:
+                incoming = self._plan_llm(mem, user_message, logger, plan_turn)
+            else:
+                incoming = plan_turn()
+            plan = self._resolve_plan(mem, incoming, user_message, logger, classify=not use_llm)
 
         # LLM: Validate plan (intent must be present)
-        if USE_LLM and (not plan.intent):
-            return do_fallback("Could not detect a valid banking intent.")
+        if use_llm and (not plan.intent):
+            return do_fallback(NO_INTENT)
 
         # LLM: Check for missing slots
         if plan.intent and plan.missing_slots:
-            self._set_state(logger, mem, SessionState.awaiting_clarification)
-            mem.plan = plan
-            # Generate a friendly clarification message without exposing the internal plan
-            clarification_message = Responder(logger).run(plan, result=None)
-            logger.assistant_message(clarification_message.content)
-            return ChatResponse(
-                session_id=sid,
-                messages=[
-                    Message(role="user", content=user_message),
-                    clarification_message,
-                ],
-                awaiting_user=True,
-                missing_slots=plan.missing_slots,
-                intent=plan.intent,
-                state=mem.state,
-                plan_review_score=None, # No review score yet since we ask for clarification
-                execution_review_score=None,
+            return self._clarification_response(sid, user_message, logger, mem, plan)
+
+        speculative = use_llm and self._speculate(plan)
+        if speculative:
+            self._claim_state(ctx, sid)
+            # Review on a worker thread while executing here; saves one model round-trip
+            review_future = shared_executor("speculation", SPECULATIVE_MAX_WORKERS).submit(
+                contextvars.copy_context().run, self._timed, "plan_review", guarded, "plan_review",
+                lambda: reviewer.review_plan(plan), lambda: rule_reviewer.review_plan(plan),
             )
-        
-        # Plan review only for complete plans
-        plan_review = reviewer.review_plan(plan)
+            with stage("execution"):
+                exec_result = execute(plan)
+            plan_review = review_future.result()
+        else:
+            # Plan review only for complete plans
+            with stage("plan_review"):
+                plan_review = guarded(
+                    "plan_review", lambda: reviewer.review_plan(plan), lambda: rule_reviewer.review_plan(plan)
+                )
         # Normalize review across schemas and scales
         plan_approved, plan_score = self._normalize_review(plan_review)
-        if USE_LLM and (not plan_approved or plan_score < 5.0):
-            return do_fallback("Plan review failed or plan score too low.")
+        self._escalate_on_review(logger, "plan_review", plan_approved, plan_score)
+        if use_llm and (not plan_approved or plan_score < MIN_REVIEW_SCORE):
+            if speculative:
+                logger.info("Speculative execution discarded after plan review rejection", intent=plan.intent.value)
+            return do_fallback(PLAN_REJECTED)
 
         self._set_state(logger, mem, SessionState.executing)
-        if USE_LLM:
-            exec_result = executioner(plan)
+        if not speculative:
+            self._claim_state(ctx, sid)
+        if use_llm:
+            if not speculative:
+                with stage("execution"):
+                    exec_result = execute(plan)
             if not exec_result.success:
-                return do_fallback("Execution failed or agent/tool unavailable.")
+                logger.escalate("execution_failed")
+                return do_fallback(EXECUTION_FAILED)
         else:
-            exec_result = executioner.run(plan)
+            with stage("execution"):
+                exec_result = executioner.run(plan)
+        if not exec_result.success:
+            logger.escalate("execution_failed")
 
-        execution_review = reviewer.review_execution(plan, exec_result)
+        with stage("execution_review"):
+            execution_review = guarded(
+                "execution_review",
+                lambda: reviewer.review_execution(plan, exec_result),
+                lambda: rule_reviewer.review_execution(plan, exec_result),
+            )
         exec_approved, exec_score = self._normalize_review(execution_review)
-        if USE_LLM and (not exec_approved or exec_score < 5.0):
-            return do_fallback("Execution review failed or score too low.")
+        self._escalate_on_review(logger, "execution_review", exec_approved, exec_score)
+        if use_llm and (not exec_approved or exec_score < MIN_REVIEW_SCORE):
+            return do_fallback(EXECUTION_REJECTED)
 
-        if USE_LLM:
-            summary = responder(exec_result)
-            logger.assistant_message(summary)
-            self._set_state(logger, mem, SessionState.completed)
-            mem.plan = None
-            self._set_state(logger, mem, SessionState.idle)
-            return ChatResponse(
-                session_id=sid,
-                messages=[Message(role="user", content=user_message), Message(role="assistant", content=summary)],
-                awaiting_user=False,
-                missing_slots=[],
-                intent=plan.intent,
-                state=mem.state,
-                plan_review_score=plan_score,
-                execution_review_score=exec_score,
+        with stage("responder"):
+            if use_llm:
+                assistant_msg = guarded(
+                    "responder",
+                    lambda: Message(role="assistant", content=responder(exec_result)),
+                    lambda: rule_responder.run(plan, exec_result),
+                )
+            else:
+                assistant_msg = responder.run(plan, exec_result)
+        return self._completed_response(sid, user_message, logger, mem, plan, assistant_msg, plan_score, exec_score)
+
+    async def astream(self, user_message: str, session_id: str | None = None) -> AsyncIterator[Dict[str, Any]]:
+        """`aprocess` that yields progress events as each LLM stage completes.
+
+        Events are `{"event": name, "data": payload}` with names `plan`,
+        `plan_review`, `execution`, `execution_review`, `token` (responder
+        text deltas) and finally `done` carrying the `ChatResponse`. Rule-based
+        and command turns only produce `done`. The turn keeps running if the
+        consumer stops early, so session state stays consistent.
+        """
+        sid = session_id or str(uuid.uuid4())
+        events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+        def emit(event: str, data: Dict[str, Any]) -> None:
+            events.put_nowait({"event": event, "data": data})
+
+        async def run() -> None:
+            try:
+                if not USE_LLM:
+                    response = await asyncio.to_thread(self.process, user_message, sid)
+                    emit("done", response.model_dump(mode="json"))
+                    return
+                async with self._locks.alock_for(sid):
+                    async with self._asession_turn(sid) as (ctx, turn_log):
+                        response = self._start_turn(ctx, user_message, sid)
+                        if response is None:
+                            if self._use_llm_for(user_message, ctx.memory):
+                                response = await self._aprocess_turn(ctx, user_message, sid, emit=emit)
+                            else:
+                                response = await asyncio.to_thread(self._process_turn, ctx, user_message, sid, False)
+                        self._tag_turn(turn_log, response)
+                emit("done", response.model_dump(mode="json"))
+            except Exception as exc:
+                emit("error", {"session_id": sid, "detail": str(exc)})
+            finally:
+                events.put_nowait(None)
+
+        task = asyncio.ensure_future(run())
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            yield item
+        await task
+
+    async def _aprocess_turn(
+        self, ctx: SessionContext, user_message: str, sid: str, emit: Optional[EmitFn] = None
+    ) -> ChatResponse:
+        with track_turn("llm") as turn:
+            if PIPELINE_ENGINE == "graph":
+                turn.response = await self._arun_graph_turn(ctx, user_message, sid, emit)
+            else:
+                turn.response = await self._arun_turn(ctx, user_message, sid, emit)
+        self._log_usage(ctx, turn)
+        return turn.response
+
+    async def _arun_turn(self, ctx: SessionContext, user_message: str, sid: str, emit: Optional[EmitFn]) -> ChatResponse:
+        logger, mem = ctx.logger, ctx.memory
+        streaming = emit is not None
+        emit = emit or _discard_event
+
+        planner, reviewer, executioner, responder, fallback = self._get_async_agents(logger)
+        rule_planner, rule_reviewer, rule_executioner, rule_responder, _ = self._get_rule_agents(logger)
+
+        def guarded(agent: str, llm_call: Callable[[], Awaitable[Any]], rule_call: Callable[[], Any]) -> Awaitable[Any]:
+            return self._aguarded(logger, agent, llm_call, rule_call)
+
+        def execute(plan: Plan) -> Awaitable[ExecutionResult]:
+            return self._aguarded_execution(logger, lambda: executioner(plan), lambda: rule_executioner.run(plan))
+
+        async def do_fallback(reason: str):
+            logger.escalate("fallback")
+            with stage("fallback"):
+                msg = await guarded("fallback", lambda: fallback(user_message, reason), lambda: DEFAULT_FALLBACK_MESSAGE)
+            return self._fallback_response(sid, user_message, logger, msg)
+
+        with stage("planner"):
+            incoming = await self._aplan_llm(
+                mem,
+                user_message,
+                logger,
+                lambda: guarded("planner", lambda: planner.arun(user_message), lambda: rule_planner.run(user_message)),
+            )
+            plan = self._resolve_plan(mem, incoming, user_message, logger, classify=False)
+        emit("plan", plan.model_dump(mode="json"))
+        if not plan.intent:
+            return await do_fallback(NO_INTENT)
+
+        if plan.missing_slots:
+            return self._clarification_response(sid, user_message, logger, mem, plan)
+
+        speculative = self._speculate(plan)
+        if speculative:
+            await self._aclaim_state(ctx, sid)
+            plan_review, exec_result = await asyncio.gather(
+                self._atimed(
+                    "plan_review",
+                    guarded("plan_review", lambda: reviewer.areview_plan(plan), lambda: rule_reviewer.review_plan(plan)),
+                ),
+                self._atimed(
+                    "execution",
+                    execute(plan),
+                ),
             )
         else:
-            assistant_msg = responder.run(plan, exec_result)
-            logger.assistant_message(assistant_msg.content)
-            self._set_state(logger, mem, SessionState.completed)
-            mem.plan = None
-            self._set_state(logger, mem, SessionState.idle)
-            return ChatResponse(
-                session_id=sid,
-                messages=[Message(role="user", content=user_message), assistant_msg],
-                awaiting_user=False,
-                missing_slots=[],
-                intent=plan.intent,
-                state=mem.state,
-                plan_review_score=plan_score,
-                execution_review_score=exec_score,
-            ) 
\ No newline at end of file
+            with stage("plan_review"):
+                plan_review = await guarded(
+                    "plan_review", lambda: reviewer.areview_plan(plan), lambda: rule_reviewer.review_plan(plan)
+                )
+        plan_approved, plan_score = self._normalize_review(plan_review)
+        self._escalate_on_review(logger, "plan_review", plan_approved, plan_score)
+        emit("plan_review", {"approved": plan_approved, "score": plan_score})
+        if not plan_approved or plan_score < MIN_REVIEW_SCORE:
+            if speculative:
+                logger.info("Speculative execution discarded after plan review rejection", intent=plan.intent.value)
+            return await do_fallback(PLAN_REJECTED)
+
+        self._set_state(logger, mem, SessionState.executing)
+        if not speculative:
+            await self._aclaim_state(ctx, sid)
+            with stage("execution"):
+                exec_result = await execute(plan)
+        emit("execution", exec_result.model_dump(mode="json"))
+        if not exec_result.success:
+            logger.escalate("execution_failed")
+            return await do_fallback(EXECUTION_FAILED)
+
+        with stage("execution_review"):
+            execution_review = await guarded(
+                "execution_review",
+                lambda: reviewer.areview_execution(plan, exec_result),
+                lambda: rule_reviewer.review_execution(plan, exec_result),
+            )
+        exec_approved, exec_score = self._normalize_review(execution_review)
+        self._escalate_on_review(logger, "execution_review", exec_approved, exec_score)
+        emit("execution_review", {"approved": exec_approved, "score": exec_score})
+        if not exec_approved or exec_score < MIN_REVIEW_SCORE:
+            return await do_fallback(EXECUTION_REJECTED)
+
+        with stage("responder"):
+            if streaming:
+                assistant_msg = await self._astream_response(logger, emit, plan, exec_result, rule_responder)
+            else:
+                assistant_msg = await guarded(
+                    "responder",
+                    lambda: as_message(responder(exec_result)),
+                    lambda: rule_responder.run(plan, exec_result),
+                )
+        return self._completed_response(sid, user_message, logger, mem, plan, assistant_msg, plan_score, exec_score)
@@ -0,0 +1,345 @@
+"""Offline replay of logged sessions through `AgentPipeline`.
+
+Reads session logs, rebuilds each session's user turns and replays them
+against the current code on a process pool: one session per task, its turns
+in order. The intent, slots, state and review scores each turn ends with are
+derived the same way from the recorded log and from the replay's own log
+records, and diffed. LLM-mode sessions run on `LLM_BACKEND=replay`: every LLM
+agent is answered with what it returned in that turn of the recorded session,
+so no Bedrock calls are made.
+
+    python -m app.core.replay --logs-dir logs --workers 4 --out replay.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+import app.llm.cache as cache_mod
+from app.core.logger import LogWriter, set_log_writer
+from app.core.pipeline import AgentPipeline
+from app.llm.bedrock import clear_clients, get_bedrock_client
+
+
+FIELDS = ("intent", "slots", "state", "plan_review_score", "execution_review_score")
+_LLM_STEPS = {"planner_llm", "reviewer_llm"}
+_REVIEW_STEPS = {"reviewer", "reviewer_llm"}
+
+Record = Dict[str, Any]
+
+
+@dataclass
+class RecordedTurn:
+    message: str
+    outcome: Dict[str, Any]
+    # LLM agent name -> the response it gave in this turn
+    responses: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class RecordedSession:
+    session_id: str
+    llm: bool
+    turns: List[RecordedTurn]
+
+
+# Reading logs
+
+def split_turns(records: Iterable[Record]) -> List[Tuple[str, List[Record]]]:
+    """(user message, records logged while handling it) per turn."""
+    turns: List[Tuple[str, List[Record]]] = []
+    for record in records:
+        if record.get("event") == "user_message":
+            turns.append((str((record.get("payload") or {}).get("message", "")), []))
+        elif turns:
+            turns[-1][1].append(record)
+    return turns
+
+
+def _step(record: Record) -> Tuple[str, Any, Dict[str, Any]]:
+    payload = record.get("payload") or {}
+    inputs = payload.get("input")
+    return payload.get("name", ""), payload.get("output"), inputs if isinstance(inputs, dict) else {}
+
+
+def _review_kind(inputs: Dict[str, Any], reviews_seen: int) -> str:
+    # Summary-level logs drop step inputs; plan review always comes first in a turn
+    return inputs.get("review_type") or inputs.get("type") or ("plan" if reviews_seen == 0 else "execution")
+
+
+def turn_outcome(records: List[Record], state: str) -> Tuple[Dict[str, Any], str]:
+    """What a turn ended with, and the session state after it; `state` is the state before it.
+
+    Turns without agent steps (control commands, or logged at the messages
+    level) only have a state; `slots` is left out when the log has no full
+    plans (summary level).
+    """
+    outcome: Dict[str, Any] = {}
+    if any(r.get("event") == "agent_step" for r in records):
+        outcome = {"intent": None, "slots": {}, "plan_review_score": None, "execution_review_score": None}
+    slots_known = bool(outcome)
+    reviews = 0
+    for record in records:
+        event = record.get("event")
+        if event == "state_transition":
+            state = (record.get("payload") or {}).get("to") or state
+        elif event == "agent_step":
+            name, output, inputs = _step(record)
+            plan = output if isinstance(output, dict) and "intent" in output else inputs.get("plan")
+            if isinstance(plan, dict):
+                outcome["intent"] = plan.get("intent")
+                if "slots" in plan:
+                    outcome["slots"] = plan.get("slots") or {}
+                else:
+                    slots_known = False
+            if name in _REVIEW_STEPS and isinstance(output, dict) and "score" in output:
+                outcome[f"{_review_kind(inputs, reviews)}_review_score"] = output.get("score")
+                reviews += 1
+    outcome["state"] = state
+    if not slots_known:
+        outcome.pop("slots", None)
+    return outcome, state
+
+
+def recorded_responses(records: List[Record]) -> Dict[str, Any]:
+    """The LLM agents' responses in one recorded turn, rebuilt from their logged outputs."""
+    responses: Dict[str, Any] = {}
+    reviews = 0
+    clarified = False
+    reply: Optional[str] = None
+    for record in records:
+        event, payload = record.get("event"), record.get("payload") or {}
+        if event == "state_transition" and payload.get("to") == "awaiting_clarification":
+            clarified = True
+        elif event == "assistant_message":
+            reply = payload.get("message")
+        elif event == "agent_step":
+            name, output, inputs = _step(record)
+            if name == "planner_llm" and isinstance(output, dict):
+                responses["planner"] = {"intent": output.get("intent"), "slots": output.get("slots") or {}}
+            elif name == "reviewer_llm" and isinstance(output, dict):
+                kind = _review_kind(inputs, reviews)
+                reviews += 1
+                responses[f"{kind}_review"] = {
+                    "approved": output.get("approved"), "issues": output.get("issues") or [], "score": output.get("score"),
+                }
+                result = inputs.get("result")
+                if kind == "execution" and isinstance(result, dict):
+                    responses["executioner"] = {k: result.get(k) for k in ("success", "data", "error")}
+    # Clarification questions come from the rule-based responder, not the model
+    if reply is not None and not clarified:
+        responses["responder" if "execution_review" in responses else "fallback"] = reply
+    return responses
+
+
+def parse_session(session_id: str, records: List[Record]) -> RecordedSession:
+    turns: List[RecordedTurn] = []
+    llm = False
+    state = "idle"
+    for message, turn_records in split_turns(records):
+        outcome, state = turn_outcome(turn_records, state)
+        llm = llm or any(r.get("event") == "agent_step" and _step(r)[0] in _LLM_STEPS for r in turn_records)
+        turns.append(RecordedTurn(message, outcome, recorded_responses(turn_records)))
+    return RecordedSession(session_id, llm, turns)
+
+
+def read_sessions(logs_dir: str, limit: Optional[int] = None) -> List[RecordedSession]:
+    sessions: List[RecordedSession] = []
+    for name in sorted(os.listdir(logs_dir)):
+        if not (name.startswith("session_") and name.endswith(".jsonl")):
+            continue
+        records: List[Record] = []
+        with open(os.path.join(logs_dir, name), "rb") as f:
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+        session = parse_session(name[len("session_"):-len(".jsonl")], records)
+        if session.turns:
+            sessions.append(session)
+        if limit is not None and len(sessions) >= limit:
+            break
+    return sessions
+
+
+# Replay workers
+
+def _jsonable(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+class CapturingLogWriter(LogWriter):
+    """Keeps each session's records in memory, in the form they would have on disk."""
+
+    name = "replay"
+
+    def __init__(self) -> None:
+        self._records: Dict[str, List[Record]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def append(self, file_path: str, record: Dict[str, Any]) -> None:
+        rendered = orjson.loads(orjson.dumps(record, default=_jsonable))
+        with self._lock:
+            self._records[record["session_id"]].append(rendered)
+
+    def take(self, session_id: str) -> List[Record]:
+        with self._lock:
+            return self._records.pop(session_id, [])
+
+
+_pipeline: Optional[AgentPipeline] = None
+_writer: Optional[CapturingLogWriter] = None
+
+
+def _init_worker() -> None:
+    global _pipeline, _writer
+    # Full logs captured in memory, recorded LLM responses, no response cache, no simulated outages
+    logger_mod.LOG_LEVEL = "full"
+    _writer = CapturingLogWriter()
+    set_log_writer(_writer)
+    os.environ["LLM_BACKEND"] = "replay"
+    clear_clients()
+    cache_mod.LLM_CACHE_AGENTS = ""
+    executioner_llm.LLM_TOOL_AVAILABILITY = 1.0
+    _pipeline = AgentPipeline()
+
+
+def replay_session(session: RecordedSession, mode: str = "auto") -> Dict[str, Any]:
+    """Replay one session in this worker and diff each turn against the recording."""
+    assert _pipeline is not None and _writer is not None, "call _init_worker() first"
+    use_llm = session.llm if mode == "auto" else mode == "llm"
+    pipeline_mod.USE_LLM = use_llm
+    model = get_bedrock_client() if use_llm else None
+    calls, misses = (model.calls, model.misses) if model is not None else (0, 0)
+    latencies: List[float] = []
+    errors = 0
+    for turn in session.turns:
+        if model is not None:
+            model.load(turn.responses)
+        start = time.perf_counter()
+        try:
+            _pipeline.process(turn.message, session_id=session.session_id)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    replayed = split_turns(_writer.take(session.session_id))
+    diffs: List[Dict[str, Any]] = []
+    matched = 0
+    state = "idle"
+    for index, turn in enumerate(session.turns):
+        actual: Dict[str, Any] = {}
+        if index < len(replayed):
+            actual, state = turn_outcome(replayed[index][1], state)
+        turn_diffs = [
+            {"session_id": session.session_id, "turn": index, "message": turn.message, "field": f,
+             "expected": turn.outcome[f], "actual": actual.get(f)}
+            for f in FIELDS if f in turn.outcome and turn.outcome[f] != actual.get(f)
+        ]
+        matched += not turn_diffs
+        diffs += turn_diffs
+    return {
+        "session_id": session.session_id,
+        "llm": use_llm,
+        "turns": len(session.turns),
+        "turns_matched": matched,
+        "compared": {f: sum(f in t.outcome for t in session.turns) for f in FIELDS},
+        "diffs": diffs,
+        "latencies": latencies,
+        "errors": errors,
+        "llm_recorded_calls": (model.calls - calls) if model is not None else 0,
+        "llm_unrecorded_calls": (model.misses - misses) if model is not None else 0,
+    }
+
+
+def _replay_chunk(sessions: List[RecordedSession], mode: str) -> List[Dict[str, Any]]:
+    return [replay_session(s, mode) for s in sessions]
+
+
+# Report
+
+def summarize(results: List[Dict[str, Any]], elapsed_s: float, max_diffs: int = 50) -> Dict[str, Any]:
+    turns = sum(r["turns"] for r in results)
+    latencies = sorted(l for r in results for l in r["latencies"])
+    diffs = [d for r in results for d in r["diffs"]]
+    field_accuracy = {}
+    for f in FIELDS:
+        compared = sum(r["compared"][f] for r in results)
+        wrong = sum(d["field"] == f for d in diffs)
+        field_accuracy[f] = round(1 - wrong / compared, 4) if compared else None
+
+    def pct(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3) if latencies else 0.0
+
+    return {
+        "sessions": len(results),
+        "llm_sessions": sum(r["llm"] for r in results),
+        "turns": turns,
+        "elapsed_s": round(elapsed_s, 3),
+        "turns_per_s": round(turns / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "turn_match_rate": round(sum(r["turns_matched"] for r in results) / turns, 4) if turns else None,
+        "field_accuracy": field_accuracy,
+        "errors": sum(r["errors"] for r in results),
+        "llm_recorded_calls": sum(r["llm_recorded_calls"] for r in results),
+        "llm_unrecorded_calls": sum(r["llm_unrecorded_calls"] for r in results),
+        "mismatches": len(diffs),
+        "diffs": diffs[:max_diffs],
+    }
+
+
+def replay(
+    logs_dir: str, workers: int = os.cpu_count() or 1, mode: str = "auto", limit: Optional[int] = None, max_diffs: int = 50
+) -> Dict[str, Any]:
+    """Replay the sessions logged in `logs_dir` on `workers` processes; `mode` is auto (as recorded), rule or llm."""
+    sessions = read_sessions(logs_dir, limit)
+    workers = max(1, min(workers, len(sessions) or 1))
+    # A few chunks per worker: amortizes pickling without leaving workers idle at the tail
+    size = max(1, len(sessions) // (workers * 4))
+    chunks = [sessions[i:i + size] for i in range(0, len(sessions), size)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        results = [r for chunk in pool.map(partial(_replay_chunk, mode=mode), chunks) for r in chunk]
+    return summarize(results, time.perf_counter() - start, max_diffs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs-dir", default="logs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", choices=("auto", "rule", "llm"), default="auto")
+    parser.add_argument("--limit", type=int, default=None, help="replay at most this many sessions")
+    parser.add_argument("--max-diffs", type=int, default=50, help="mismatches listed in the report")
+    parser.add_argument("--out", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = replay(args.logs_dir, args.workers, args.mode, args.limit, args.max_diffs)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Optional
+
+from app.core.intent_classifier import predict_intent
+from app.core.nlu import detect_intent, extract_slots
+from app.core.types import INTENT_TO_REQUIRED_SLOTS, IntentName, Plan
+
+
+# llm: every LLM-mode turn goes to the model; hybrid: confident rule-based turns skip it
+LLM_ROUTING = os.getenv("LLM_ROUTING", "llm").lower()
+ROUTING_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTING_CONFIDENCE_THRESHOLD", "1.0"))
+# Model calls in a completed LLM turn: planner, plan review, execution, execution review, responder
+LLM_CALLS_PER_TURN = 5
+
+
+def rule_confidence(intent: Optional[IntentName], slots: Dict[str, Optional[str]]) -> float:
+    """Confidence (0-1) in a rule-based parse: half for the intent match, half for slot coverage."""
+    if intent is None:
+        return 0.0
+    required = INTENT_TO_REQUIRED_SLOTS[intent]
+    filled = sum(1 for k in required if slots.get(k))
+    return 0.5 + 0.5 * filled / max(1, len(required))
+
+
+class HybridRouter:
+    """Decides per turn whether the regex NLU is good enough to skip the LLM agents."""
+
+    def __init__(self, threshold: float = ROUTING_CONFIDENCE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counts = {"rule": 0, "llm": 0}
+
+    def score(self, user_message: str, pending: Optional[Plan] = None) -> float:
+        intent = detect_intent(user_message)
+        if pending is not None and pending.intent and intent in (None, pending.intent):
+            # Clarification reply: score the pending plan with the newly supplied slots merged in
+            slots, _ = extract_slots(pending.intent, user_message)
+            merged = {k: slots.get(k) or pending.slots.get(k) for k in INTENT_TO_REQUIRED_SLOTS[pending.intent]}
+            return rule_confidence(pending.intent, merged)
+        if intent is None:
+            # Middle tier: a confident classifier intent keeps the turn off the LLM like a regex match
+            intent = predict_intent(user_message)
+        slots, _ = extract_slots(intent, user_message)
+        return rule_confidence(intent, slots)
+
+    def route(self, user_message: str, pending: Optional[Plan] = None) -> str:
+        route = "rule" if self.score(user_message, pending) >= self.threshold else "llm"
+        with self._lock:
+            self._counts[route] += 1
+        return route
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            rule, llm = self._counts["rule"], self._counts["llm"]
+        total = rule + llm
+        return {
+            "rule_turns": rule,
+            "llm_turns": llm,
+            "rule_share": round(rule / total, 4) if total else 0.0,
+            "llm_calls_avoided_est": rule * LLM_CALLS_PER_TURN,
+        }
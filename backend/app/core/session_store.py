@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+
+V = TypeVar("V")
+
+SESSION_STORE = os.getenv("SESSION_STORE", "lru").lower()
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "1800"))
+
+
+class SessionStore(ABC, Generic[V]):
+    """Keyed storage for per-session objects owned by the pipeline."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[V]:
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, value: V) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, session_id: str) -> Optional[V]:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class InMemorySessionStore(SessionStore[V]):
+    """Unbounded dict; sessions live until the process exits."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: Dict[str, V] = {}
+
+    def get(self, session_id: str) -> Optional[V]:
+        value = self._data.get(session_id)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, session_id: str, value: V) -> None:
+        self._data[session_id] = value
+
+    def pop(self, session_id: str) -> Optional[V]:
+        return self._data.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LRUSessionStore(SessionStore[V]):
+    """LRU store with an idle TTL and a hard cap on the number of sessions.
+
+    Entries untouched for `idle_ttl_s` are dropped. When the cap is exceeded the
+    least recently used unprotected entry is evicted first; protected entries
+    (per `is_protected`, e.g. sessions awaiting clarification) only go when
+    nothing else is left.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX,
+        idle_ttl_s: float = SESSION_IDLE_TTL_S,
+        is_protected: Callable[[V], bool] | None = None,
+        on_evict: Callable[[str, V], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl_s = idle_ttl_s
+        self._is_protected = is_protected or (lambda _: False)
+        self._on_evict = on_evict
+        self._clock = clock
+        # session_id -> (last_access, value), ordered oldest access first
+        self._data: "OrderedDict[str, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[V]:
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is not None and self._expired(entry[0], now):
+                self._evict(session_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data[session_id] = (now, entry[1])
+            self._data.move_to_end(session_id)
+            return entry[1]
+
+    def put(self, session_id: str, value: V) -> None:
+        now = self._clock()
+        with self._lock:
+            self._data[session_id] = (now, value)
+            self._data.move_to_end(session_id)
+            self._expire(now)
+            while len(self._data) > self.max_sessions:
+                self._evict(self._pick_victim())
+
+    def pop(self, session_id: str) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(session_id, None)
+        return entry[1] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.idle_ttl_s > 0 and now - last_access > self.idle_ttl_s
+
+    def _expire(self, now: float) -> None:
+        # Access order == age order, so expired entries are always at the front
+        while self._data:
+            session_id, (last_access, _) = next(iter(self._data.items()))
+            if not self._expired(last_access, now):
+                break
+            self._evict(session_id)
+
+    def _pick_victim(self) -> str:
+        for session_id, (_, value) in self._data.items():
+            if not self._is_protected(value):
+                return session_id
+        return next(iter(self._data))
+
+    def _evict(self, session_id: str) -> None:
+        _, value = self._data.pop(session_id)
+        self.evictions += 1
+        if self._on_evict:
+            self._on_evict(session_id, value)
+
+
+def build_session_store(is_protected: Callable[[V], bool] | None = None) -> SessionStore[V]:
+    """Store selected by SESSION_STORE (lru|memory)."""
+    if SESSION_STORE == "memory":
+        return InMemorySessionStore()
+    return LRUSessionStore(is_protected=is_protected)
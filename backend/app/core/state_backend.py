@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from app.core.types import INTENT_TO_REQUIRED_SLOTS, IntentName, Plan, SessionState
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # redis is optional; only RedisStateBackend needs it
+
+    class WatchError(Exception):  # type: ignore[no-redef]
+        """Stand-in for redis.exceptions.WatchError when redis-py is not installed."""
+
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "local").lower()
+STATE_DB = os.getenv("STATE_DB", "session_state.sqlite3")
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")
+STATE_TTL_S = float(os.getenv("STATE_TTL_S", "86400"))
+
+
+@dataclass
+class SessionMemory:
+    state: SessionState
+    plan: Optional[Plan]
+
+
+class StateConflict(Exception):
+    """A session's state was saved by another worker since this turn loaded it."""
+
+    def __init__(self, session_id: str) -> None:
+        super().__init__(f"Session {session_id} was modified concurrently by another request")
+        self.session_id = session_id
+
+
+def encode_memory(memory: SessionMemory) -> bytes:
+    """Compact positional encoding: `[state]` or `[state, intent, slots, missing, rationale]`.
+
+    When a plan's slots are exactly its intent's required slots they are stored
+    as a list in `INTENT_TO_REQUIRED_SLOTS` order and the missing slots as a
+    bitmask over that order; anything else falls back to the dict/list form.
+    """
+    plan = memory.plan
+    if plan is None:
+        return orjson.dumps([memory.state.value])
+    required = INTENT_TO_REQUIRED_SLOTS[plan.intent] if plan.intent else []
+    slots: Any = plan.slots
+    missing: Any = plan.missing_slots
+    if required and set(plan.slots) == set(required):
+        slots = [plan.slots[k] for k in required]
+        if [k for k in required if k in plan.missing_slots] == plan.missing_slots:
+            missing = sum(1 << i for i, k in enumerate(required) if k in plan.missing_slots)
+    intent = plan.intent.value if plan.intent else None
+    return orjson.dumps([memory.state.value, intent, slots, missing, plan.rationale])
+
+
+def decode_memory(data: bytes) -> SessionMemory:
+    values = orjson.loads(data)
+    state = SessionState(values[0])
+    if len(values) == 1:
+        return SessionMemory(state=state, plan=None)
+    _, intent_value, slots, missing, rationale = values
+    intent = IntentName(intent_value) if intent_value else None
+    required = INTENT_TO_REQUIRED_SLOTS[intent] if intent else []
+    if isinstance(slots, list):
+        slots = dict(zip(required, slots))
+    if isinstance(missing, int):
+        missing = [k for i, k in enumerate(required) if missing >> i & 1]
+    return SessionMemory(state=state, plan=Plan(intent=intent, slots=slots, missing_slots=missing, rationale=rationale))
+
+
+IDLE_STATE = encode_memory(SessionMemory(state=SessionState.idle, plan=None))
+
+
+class StateBackend(ABC):
+    """Shared per-session state with optimistic concurrency.
+
+    Values are opaque bytes (see `encode_memory`) tagged with a version that
+    starts at 1 on first save. `save(session_id, data, version)` only succeeds
+    if the stored version still equals `version` (0 = not stored yet) and
+    returns the new version; otherwise it raises StateConflict.
+    """
+
+    name = "custom"
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self.saves = 0
+        self.conflicts = 0
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Tuple[bytes, int]]:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, data: bytes, version: int) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def _conflict(self, session_id: str) -> StateConflict:
+        self.conflicts += 1
+        return StateConflict(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"loads": self.loads, "saves": self.saves, "conflicts": self.conflicts}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local reference implementation (one worker only)."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: Dict[str, Tuple[bytes, int]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Tuple[bytes, int]]:
+        self.loads += 1
+        return self._data.get(session_id)
+
+    def save(self, session_id: str, data: bytes, version: int) -> int:
+        with self._lock:
+            current = self._data.get(session_id)
+            if (current[1] if current else 0) != version:
+                raise self._conflict(session_id)
+            self._data[session_id] = (data, version + 1)
+            self.saves += 1
+        return version + 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+
+class SqliteStateBackend(StateBackend):
+    """Single-host persistence shared by all workers through one sqlite file (WAL mode)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = STATE_DB, ttl_s: float = STATE_TTL_S, clock: Callable[[], float] = time.time) -> None:
+        super().__init__()
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_state ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[Tuple[bytes, int]]:
+        with self._lock:
+            self.loads += 1
+            row = self._conn.execute(
+                "SELECT data, version, expires_at FROM session_state WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, version, expires_at = row
+        if self.ttl_s > 0 and expires_at < self._clock():
+            # Expired sessions start over, but keep counting versions so stale writers still conflict
+            return IDLE_STATE, version
+        return bytes(data), version
+
+    def save(self, session_id: str, data: bytes, version: int) -> int:
+        expires_at = self._clock() + self.ttl_s
+        with self._lock:
+            if version == 0:
+                cursor = self._conn.execute(
+                    "INSERT INTO session_state (session_id, version, data, expires_at) VALUES (?, 1, ?, ?)"
+                    " ON CONFLICT(session_id) DO NOTHING",
+                    (session_id, data, expires_at),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE session_state SET version = version + 1, data = ?, expires_at = ?"
+                    " WHERE session_id = ? AND version = ?",
+                    (data, expires_at, session_id, version),
+                )
+            self._conn.commit()
+            if cursor.rowcount != 1:
+                raise self._conflict(session_id)
+            self.saves += 1
+        return version + 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStateBackend(StateBackend):
+    """State in Redis as `<version>|<data>` strings; saves are WATCH/MULTI/EXEC check-and-set.
+
+    `client` is a redis-py compatible client (`get`, `delete`, `pipeline()`).
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any, prefix: str = "agentic:state:", ttl_s: float = STATE_TTL_S) -> None:
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.ttl_s = ttl_s
+
+    @staticmethod
+    def _split(raw: Optional[bytes]) -> Tuple[Optional[bytes], int]:
+        if raw is None:
+            return None, 0
+        version, _, data = raw.partition(b"|")
+        return data, int(version)
+
+    def load(self, session_id: str) -> Optional[Tuple[bytes, int]]:
+        self.loads += 1
+        data, version = self._split(self.client.get(self.prefix + session_id))
+        return (data, version) if data is not None else None
+
+    def save(self, session_id: str, data: bytes, version: int) -> int:
+        key = self.prefix + session_id
+        pipe = self.client.pipeline()
+        try:
+            pipe.watch(key)
+            if self._split(pipe.get(key))[1] != version:
+                raise self._conflict(session_id)
+            pipe.multi()
+            pipe.set(key, str(version + 1).encode() + b"|" + data, ex=int(self.ttl_s) if self.ttl_s > 0 else None)
+            pipe.execute()
+        except WatchError:
+            raise self._conflict(session_id) from None
+        finally:
+            pipe.reset()
+        self.saves += 1
+        return version + 1
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self.prefix + session_id)
+
+
+def build_state_backend() -> Optional[StateBackend]:
+    """Backend selected by STATE_BACKEND (local|memory|sqlite|redis); `local` keeps state in the session store only."""
+    if STATE_BACKEND == "memory":
+        return MemoryStateBackend()
+    if STATE_BACKEND == "sqlite":
+        return SqliteStateBackend()
+    if STATE_BACKEND == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package") from exc
+        return RedisStateBackend(redis.Redis.from_url(STATE_REDIS_URL))
+    return None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Literal, Optional
@@ -95,4 +96,26 @@ class ChatResponse(BaseModel):
     state: Optional[SessionState] = None
     # Optional reviewer scores
     plan_review_score: Optional[float] = None
-    execution_review_score: Optional[float] = None 
\ No newline at end of file
+    execution_review_score: Optional[float] = None
+
+
+# Larger batches are rejected (422); split them or stream several
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatRequest] = Field(..., max_length=BATCH_MAX_ITEMS)
+    # Stream one NDJSON line per turn instead of a single JSON document
+    stream: bool = False
+
+
+class ChatBatchError(BaseModel):
+    index: int
+    error: str  # exception type, e.g. StateConflict
+    detail: str
+
+
+class ChatBatchResponse(BaseModel):
+    # None where the item failed; see `errors`
+    results: List[Optional[ChatResponse]]
+    errors: List[ChatBatchError] = Field(default_factory=list) 
\ No newline at end of file
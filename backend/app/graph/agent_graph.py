@@ -1,37 +1,375 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict, Union
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, START, StateGraph
 
-# Placeholder: We keep our existing pipeline orchestrator. This graph demonstrates
-# how to wire nodes; later we can fully migrate nodes to use the LLM agents.
+from app.core.metrics import stage
+from app.core.types import ChatResponse, ExecutionResult, Message, Plan, SessionState
 
 
-def build_dummy_graph() -> StateGraph:
-    g = StateGraph(dict)
+# Reviews below this score (1-10) send LLM turns to the fallback agent
+MIN_REVIEW_SCORE = 5.0
 
-    def planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Pass-through for now
-        return state
+NO_INTENT = "Could not detect a valid banking intent."
+PLAN_REJECTED = "Plan review failed or plan score too low."
+EXECUTION_FAILED = "Execution failed or agent/tool unavailable."
+EXECUTION_REJECTED = "Execution review failed or score too low."
 
-    def reviewer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        return state
 
-    def executioner_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        return state
+@dataclass
+class GraphTurn:
+    """Per-turn context handed to the nodes: the pipeline, the session and the agents.
 
-    def responder_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        return state
+    `llm` and `rules` are (planner, reviewer, executioner, responder, fallback)
+    tuples; `llm` holds the sync or async LLM agents depending on how the
+    graph is invoked, `rules` the rule-based stand-ins used when the LLM
+    governor refuses a call (for the executioner, only when the request was
+    never sent).
+    """
 
-    g.add_node("planner", planner_node)
-    g.add_node("reviewer", reviewer_node)
-    g.add_node("executioner", executioner_node)
-    g.add_node("responder", responder_node)
+    pipeline: Any
+    ctx: Any
+    user_message: str
+    sid: str
+    llm: Tuple[Any, ...]
+    rules: Tuple[Any, ...]
+    emit: Callable[[str, Dict[str, Any]], None]
+    streaming: bool = False
+
+    @property
+    def logger(self) -> Any:
+        return self.ctx.logger
+
+    def call(self, agent: str, llm_call: Callable[[], Any], rule_call: Callable[[], Any]) -> Any:
+        return self.pipeline._guarded(self.logger, agent, llm_call, rule_call)
+
+    async def acall(self, agent: str, llm_call: Callable[[], Awaitable[Any]], rule_call: Callable[[], Any]) -> Any:
+        return await self.pipeline._aguarded(self.logger, agent, llm_call, rule_call)
+
+    def execute(self, plan: Plan) -> ExecutionResult:
+        return self.pipeline._guarded_execution(self.logger, lambda: self.llm[2](plan), lambda: self.rules[2].run(plan))
+
+    async def aexecute(self, plan: Plan) -> ExecutionResult:
+        return await self.pipeline._aguarded_execution(
+            self.logger, lambda: self.llm[2](plan), lambda: self.rules[2].run(plan)
+        )
+
+
+class TurnState(TypedDict, total=False):
+    turn: GraphTurn
+    plan: Plan
+    # Plan review runs alongside execution (SPECULATIVE_EXECUTION)
+    speculative: bool
+    plan_review: Tuple[bool, float]
+    exec_result: ExecutionResult
+    exec_review: Tuple[bool, float]
+    message: Message
+    response: ChatResponse
+
+
+def _approved(review: Optional[Tuple[bool, float]]) -> bool:
+    return review is not None and review[0] and review[1] >= MIN_REVIEW_SCORE
+
+
+async def as_message(summary: Awaitable[str]) -> Message:
+    return Message(role="assistant", content=await summary)
+
+
+# Nodes: each has a sync body for `invoke` and an async one for `ainvoke`
+
+
+def _planned(t: GraphTurn, incoming: Plan) -> TurnState:
+    plan = t.pipeline._resolve_plan(t.ctx.memory, incoming, t.user_message, t.logger, classify=False)
+    t.emit("plan", plan.model_dump(mode="json"))
+    complete = plan.intent is not None and not plan.missing_slots
+    return {"plan": plan, "speculative": complete and t.pipeline._speculate(plan)}
+
+
+def plan(state: TurnState) -> TurnState:
+    t = state["turn"]
+    with stage("planner"):
+        incoming = t.pipeline._plan_llm(
+            t.ctx.memory,
+            t.user_message,
+            t.logger,
+            lambda: t.call("planner", lambda: t.llm[0].run(t.user_message), lambda: t.rules[0].run(t.user_message)),
+        )
+    return _planned(t, incoming)
+
+
+async def aplan(state: TurnState) -> TurnState:
+    t = state["turn"]
+    with stage("planner"):
+        incoming = await t.pipeline._aplan_llm(
+            t.ctx.memory,
+            t.user_message,
+            t.logger,
+            lambda: t.acall("planner", lambda: t.llm[0].arun(t.user_message), lambda: t.rules[0].run(t.user_message)),
+        )
+    return _planned(t, incoming)
+
+
+def _reviewed(t: GraphTurn, kind: str, review: Any) -> Tuple[bool, float]:
+    approved, score = t.pipeline._normalize_review(review)
+    t.pipeline._escalate_on_review(t.logger, kind, approved, score)
+    t.emit(kind, {"approved": approved, "score": score})
+    return approved, score
+
+
+def review_plan(state: TurnState) -> TurnState:
+    t, p = state["turn"], state["plan"]
+    with stage("plan_review"):
+        review = t.call("plan_review", lambda: t.llm[1].review_plan(p), lambda: t.rules[1].review_plan(p))
+    return {"plan_review": _reviewed(t, "plan_review", review)}
+
+
+async def areview_plan(state: TurnState) -> TurnState:
+    t, p = state["turn"], state["plan"]
+    with stage("plan_review"):
+        review = await t.acall("plan_review", lambda: t.llm[1].areview_plan(p), lambda: t.rules[1].review_plan(p))
+    return {"plan_review": _reviewed(t, "plan_review", review)}
+
+
+def _start_execution(state: TurnState) -> None:
+    t = state["turn"]
+    if not state["speculative"]:
+        t.pipeline._set_state(t.logger, t.ctx.memory, SessionState.executing)
+    t.pipeline._claim_state(t.ctx, t.sid)
+
+
+def _executed(state: TurnState, result: ExecutionResult) -> TurnState:
+    # Speculative results are published by `executed` once the plan is approved
+    if not state["speculative"]:
+        _publish(state["turn"], result)
+    return {"exec_result": result}
+
+
+def _publish(t: GraphTurn, result: ExecutionResult) -> None:
+    t.emit("execution", result.model_dump(mode="json"))
+    if not result.success:
+        t.logger.escalate("execution_failed")
+
+
+def execute(state: TurnState) -> TurnState:
+    t, p = state["turn"], state["plan"]
+    _start_execution(state)
+    with stage("execution"):
+        result = t.execute(p)
+    return _executed(state, result)
+
+
+async def aexecute(state: TurnState) -> TurnState:
+    t, p = state["turn"], state["plan"]
+    # The claim is a blocking state-backend write
+    await asyncio.to_thread(_start_execution, state)
+    with stage("execution"):
+        result = await t.aexecute(p)
+    return _executed(state, result)
+
+
+def executed(state: TurnState) -> TurnState:
+    """Publish a speculative execution once its plan is approved."""
+    t, result = state["turn"], state["exec_result"]
+    t.pipeline._set_state(t.logger, t.ctx.memory, SessionState.executing)
+    _publish(t, result)
+    return {"exec_result": result}
+
+
+def review_execution(state: TurnState) -> TurnState:
+    t, p, result = state["turn"], state["plan"], state["exec_result"]
+    with stage("execution_review"):
+        review = t.call(
+            "execution_review",
+            lambda: t.llm[1].review_execution(p, result),
+            lambda: t.rules[1].review_execution(p, result),
+        )
+    return {"exec_review": _reviewed(t, "execution_review", review)}
+
+
+async def areview_execution(state: TurnState) -> TurnState:
+    t, p, result = state["turn"], state["plan"], state["exec_result"]
+    with stage("execution_review"):
+        review = await t.acall(
+            "execution_review",
+            lambda: t.llm[1].areview_execution(p, result),
+            lambda: t.rules[1].review_execution(p, result),
+        )
+    return {"exec_review": _reviewed(t, "execution_review", review)}
+
+
+def respond(state: TurnState) -> TurnState:
+    t, p, result = state["turn"], state["plan"], state["exec_result"]
+    with stage("responder"):
+        message = t.call(
+            "responder",
+            lambda: Message(role="assistant", content=t.llm[3](result)),
+            lambda: t.rules[3].run(p, result),
+        )
+    return {"message": message}
+
+
+async def arespond(state: TurnState) -> TurnState:
+    t, p, result = state["turn"], state["plan"], state["exec_result"]
+    with stage("responder"):
+        if t.streaming:
+            message = await t.pipeline._astream_response(t.logger, t.emit, p, result, t.rules[3])
+        else:
+            message = await t.acall(
+                "responder", lambda: as_message(t.llm[3](result)), lambda: t.rules[3].run(p, result)
+            )
+    return {"message": message}
+
+
+def clarify(state: TurnState) -> TurnState:
+    t = state["turn"]
+    return {"response": t.pipeline._clarification_response(t.sid, t.user_message, t.logger, t.ctx.memory, state["plan"])}
+
+
+def complete(state: TurnState) -> TurnState:
+    t = state["turn"]
+    response = t.pipeline._completed_response(
+        t.sid,
+        t.user_message,
+        t.logger,
+        t.ctx.memory,
+        state["plan"],
+        state["message"],
+        state["plan_review"][1],
+        state["exec_review"][1],
+    )
+    return {"response": response}
+
+
+def _fallback_reason(state: TurnState) -> str:
+    t = state["turn"]
+    if not state["plan"].intent:
+        return NO_INTENT
+    if not _approved(state.get("plan_review")):
+        if state["speculative"]:
+            t.logger.info("Speculative execution discarded after plan review rejection", intent=state["plan"].intent.value)
+        return PLAN_REJECTED
+    if not state["exec_result"].success:
+        return EXECUTION_FAILED
+    return EXECUTION_REJECTED
+
+
+def _fallback_response(t: GraphTurn, message: str) -> TurnState:
+    return {"response": t.pipeline._fallback_response(t.sid, t.user_message, t.logger, message)}
+
+
+def fallback(state: TurnState) -> TurnState:
+    t, reason = state["turn"], _fallback_reason(state)
+    t.logger.escalate("fallback")
+    with stage("fallback"):
+        message = t.call("fallback", lambda: t.llm[4](t.user_message, reason), lambda: t.rules[4](t.user_message, reason))
+    return _fallback_response(t, message)
+
+
+async def afallback(state: TurnState) -> TurnState:
+    t, reason = state["turn"], _fallback_reason(state)
+    t.logger.escalate("fallback")
+    with stage("fallback"):
+        message = await t.acall(
+            "fallback", lambda: t.llm[4](t.user_message, reason), lambda: t.rules[4](t.user_message, reason)
+        )
+    return _fallback_response(t, message)
+
+
+# Conditional edges
+
+
+def after_plan(state: TurnState) -> Union[str, List[str]]:
+    p = state["plan"]
+    if not p.intent:
+        return "fallback"
+    if p.missing_slots:
+        return "clarify"
+    if state["speculative"]:
+        return ["review_plan", "execute"]
+    return "review_plan"
+
+
+def after_plan_review(state: TurnState) -> str:
+    if not _approved(state["plan_review"]):
+        return "fallback"
+    # A speculative execution finished in the same step
+    return "executed" if state["speculative"] else "execute"
+
+
+def after_execute(state: TurnState) -> str:
+    # Speculative executions are picked up by after_plan_review
+    return END if state["speculative"] else after_executed(state)
+
+
+def after_executed(state: TurnState) -> str:
+    return "review_execution" if state["exec_result"].success else "fallback"
+
+
+def after_execution_review(state: TurnState) -> str:
+    # The responder only runs for approved executions, so a rejection costs no extra model call
+    return "respond" if _approved(state["exec_review"]) else "fallback"
+
+
+def build_turn_graph() -> StateGraph:
+    """One LLM-mode turn: planner -> plan review -> execution -> execution review -> responder.
+
+    Conditional edges send incomplete plans to `clarify` and failed or
+    rejected stages to `fallback`. For speculative intents, plan review and
+    execution run as parallel branches of the same step.
+    """
+    g = StateGraph(TurnState)
+    nodes = {
+        "planner": (plan, aplan),
+        "review_plan": (review_plan, areview_plan),
+        "execute": (execute, aexecute),
+        "executed": (executed, None),
+        "review_execution": (review_execution, areview_execution),
+        "respond": (respond, arespond),
+        "clarify": (clarify, None),
+        "complete": (complete, None),
+        "fallback": (fallback, afallback),
+    }
+    for name, (func, afunc) in nodes.items():
+        # CPU-only nodes run inline on the event loop under ainvoke
+        g.add_node(name, RunnableLambda(func, afunc or _inline(func), name=name))
 
     g.add_edge(START, "planner")
-    g.add_edge("planner", "reviewer")
-    g.add_edge("reviewer", "executioner")
-    g.add_edge("executioner", "responder")
-    g.add_edge("responder", END)
-    return g 
\ No newline at end of file
+    edges = {
+        "planner": (after_plan, ["fallback", "clarify", "review_plan", "execute"]),
+        "review_plan": (after_plan_review, ["fallback", "execute", "executed"]),
+        "execute": (after_execute, ["fallback", "review_execution", END]),
+        "executed": (after_executed, ["fallback", "review_execution"]),
+        "review_execution": (after_execution_review, ["fallback", "respond"]),
+    }
+    for source, (route, targets) in edges.items():
+        g.add_conditional_edges(source, RunnableLambda(route, _inline(route), name=route.__name__), targets)
+    g.add_edge("respond", "complete")
+    for terminal in ("clarify", "complete", "fallback"):
+        g.add_edge(terminal, END)
+    return g
+
+
+def _inline(func: Callable[[TurnState], Any]) -> Callable[[TurnState], Awaitable[Any]]:
+    async def run(state: TurnState) -> Any:
+        return func(state)
+
+    return run
+
+
+_compiled: Any = None
+_compiled_lock = threading.Lock()
+
+
+def get_turn_graph() -> Any:
+    """The turn graph, compiled once per process and shared by every turn."""
+    global _compiled
+    if _compiled is None:
+        with _compiled_lock:
+            if _compiled is None:
+                _compiled = build_turn_graph().compile()
+    return _compiled
@@ -2,28 +2,139 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, Optional, Union
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
+from botocore.config import Config
 from langchain_aws import ChatBedrock
 from pydantic import BaseModel
 
+from app.core.metrics import LLM_CALL_ERRORS, LLM_CALL_SECONDS
+from app.llm.cache import cache_for, prompt_key
+from app.llm.cassette import CassetteChatModel, CassetteRecorder, open_cassette
+from app.llm.fake import FakeChatModel, ReplayChatModel, mock_response
+from app.llm.governor import LLM_CALL_TIMEOUT_S, get_governor
+from app.llm.singleflight import LLM_COALESCE, coalesces, get_singleflight
+from app.llm.usage import record_tokens, record_usage, usage_tokens
 
-def get_bedrock_client() -> ChatBedrock:
-    model_id = os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
-    region = os.getenv("AWS_REGION", "us-east-1")
+
+@dataclass(frozen=True)
+class ClientKey:
+    """What a cached client is built from; fields a backend doesn't use keep their defaults."""
+
+    backend: str
+    model_id: str = ""
+    region: str = ""
+    temperature: float = 0.0
+    max_tokens: int = 0
+    # LLM_BACKEND=fake|replay
+    fake_latency_ms: float = 0.0
+    # LLM_BACKEND=cassette: the cassette replayed and the scale of its recorded latencies
+    cassette: str = ""
+    cassette_latency: float = 0.0
+    # LLM_CASSETTE_RECORD: cassette the live (or fake) client's calls are recorded to
+    record: str = ""
+
+
+_clients: Dict[ClientKey, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _client_key(
+    model_id: Optional[str] = None,
+    region: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> ClientKey:
+    backend = os.getenv("LLM_BACKEND", "bedrock").lower()
+    record = os.getenv("LLM_CASSETTE_RECORD", "")
+    if backend == "cassette":
+        return ClientKey(
+            backend,
+            cassette=os.getenv("LLM_CASSETTE", ""),
+            cassette_latency=float(os.getenv("LLM_CASSETTE_LATENCY", "0")),
+        )
+    if backend in ("fake", "replay"):
+        return ClientKey(backend, fake_latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")), record=record)
+    return ClientKey(
+        backend,
+        model_id=model_id or os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0"),
+        region=region or os.getenv("AWS_REGION", "us-east-1"),
+        temperature=temperature if temperature is not None else float(os.getenv("BEDROCK_TEMPERATURE", "0.2")),
+        max_tokens=max_tokens if max_tokens is not None else int(os.getenv("BEDROCK_MAX_TOKENS", "1024")),
+        record=record,
+    )
+
+
+def _build_client(key: ClientKey) -> ChatBedrock:
+    if key.backend == "cassette":
+        if not key.cassette:
+            raise ValueError("LLM_BACKEND=cassette needs LLM_CASSETTE set to a recorded cassette")
+        return CassetteChatModel(open_cassette(key.cassette), latency_scale=key.cassette_latency)  # type: ignore[return-value]
+    client = _build_model(key)
+    if key.record:
+        return CassetteRecorder(client, open_cassette(key.record))  # type: ignore[return-value]
+    return client
+
+
+def _build_model(key: ClientKey) -> ChatBedrock:
+    if key.backend in ("fake", "replay"):
+        model = ReplayChatModel if key.backend == "replay" else FakeChatModel
+        return model(latency_ms=key.fake_latency_ms)  # type: ignore[return-value]
     # Assumes AWS credentials are configured via env/role
     llm = ChatBedrock(
-        model_id=model_id,
-        region_name=region,
+        model_id=key.model_id,
+        region_name=key.region,
         # You can tweak inference params here
         model_kwargs={
-            "temperature": float(os.getenv("BEDROCK_TEMPERATURE", "0.2")),
-            "max_tokens": int(os.getenv("BEDROCK_MAX_TOKENS", "1024")),
+            "temperature": key.temperature,
+            "max_tokens": key.max_tokens,
         },
+        # Timeouts and retries are owned by the LLM governor
+        config=Config(
+            connect_timeout=5,
+            read_timeout=LLM_CALL_TIMEOUT_S,
+            retries={"mode": "standard", "total_max_attempts": 1},
+        ),
     )
     return llm
 
 
+def get_bedrock_client(
+    model_id: Optional[str] = None,
+    region: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> ChatBedrock:
+    """Shared client for (model_id, region, inference params), built once per process.
+
+    Clients are thread-safe and reused across requests and agents, which keeps
+    the boto3 session and its HTTP connection pool warm.
+    """
+    key = _client_key(model_id, region, temperature, max_tokens)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _build_client(key)
+                _clients[key] = client
+    return client
+
+
+def warm_clients() -> None:
+    """Build the default client ahead of the first request (BEDROCK_WARM_ON_STARTUP)."""
+    get_bedrock_client()
+
+
+def clear_clients() -> None:
+    """Drop cached clients, e.g. after rotating credentials."""
+    with _clients_lock:
+        _clients.clear()
+
+
 def format_system_prompt() -> str:
     return (
         "You are an assistant in a retail bank contact center. "
@@ -53,24 +164,143 @@ def _missing_aws_credentials() -> bool:
     return not (os.getenv("AWS_ACCESS_KEY_ID") or os.getenv("AWS_PROFILE") or os.getenv("AWS_SESSION_TOKEN"))
 
 
-def call_llm_json(prompt: str, llm: Optional[ChatBedrock] = None) -> Union[Dict[str, Any], str]:
-    # Safe-mode mock if creds are missing
-    if _missing_aws_credentials():
-        # Generate a minimal deterministic mock based on keywords in prompt
-        lower = prompt.lower()
-        if "json" in lower and "intent" in lower and "slots" in lower:
-            return {"intent": None, "slots": {}}
-        if "review" in lower and "score" in lower:
-            return {"approved": True, "issues": [], "score": 7.0}
-        if "respond" in lower and "execution" in lower:
-            return "All set!"
-        # Generic fallback
-        return "Okay."
+def _use_mock(client: Any) -> bool:
+    # Safe-mode mock only applies to the real Bedrock client when creds are missing
+    client = client.inner if isinstance(client, CassetteRecorder) else client
+    return isinstance(client, ChatBedrock) and _missing_aws_credentials()
 
-    client = llm or get_bedrock_client()
-    resp = client.invoke([
+
+def _chat_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
         {"role": "system", "content": format_system_prompt()},
         {"role": "user", "content": prompt},
-    ])
+    ]
+
+
+def _parse_response(resp: Any) -> Union[Dict[str, Any], str]:
     content = resp.content if hasattr(resp, "content") else str(resp)
-    return _best_effort_parse_json(content) 
\ No newline at end of file
+    return _best_effort_parse_json(content)
+
+
+def _observed(result: Union[Dict[str, Any], str], agent: Optional[str], source: str, start: float):
+    LLM_CALL_SECONDS.observe(time.perf_counter() - start, agent=agent or "", source=source)
+    return result
+
+
+def call_llm_json(
+    prompt: str, llm: Optional[ChatBedrock] = None, agent: Optional[str] = None
+) -> Union[Dict[str, Any], str]:
+    """Invoke the model and parse its reply as JSON when possible.
+
+    `agent` names the calling step (planner, plan_review, ...) and decides
+    whether the response cache is consulted (see LLM_CACHE_AGENTS). Concurrent
+    calls of read-only agents with the same prompt and model params share one
+    model request (LLM_COALESCE, LLM_COALESCE_AGENTS). Model calls go through the LLM governor and raise
+    `LLMUnavailable` when it refuses or gives up on them.
+    """
+    start = time.perf_counter()
+    client = llm or get_bedrock_client()
+    if _use_mock(client):
+        return _observed(mock_response(prompt), agent, "mock", start)
+    cache = cache_for(agent)
+    coalesce = LLM_COALESCE and coalesces(agent)
+    key = prompt_key(prompt, client, format_system_prompt()) if cache is not None or coalesce else ""
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return _observed(cached, agent, "cache", start)
+    messages = _chat_messages(prompt)
+
+    def invoke() -> Any:
+        return get_governor().call(agent or "", lambda: client.invoke(messages))
+
+    try:
+        resp, shared = get_singleflight().do(key, invoke, agent or "") if coalesce else (invoke(), False)
+    except Exception:
+        LLM_CALL_ERRORS.inc(agent=agent or "")
+        raise
+    if not shared:
+        # Followers got the leader's reply for free
+        record_usage(agent, resp)
+    # Each caller parses the shared reply itself, so followers never share a mutable dict
+    parsed = _observed(_parse_response(resp), agent, "coalesced" if shared else "model", start)
+    if cache is not None and not shared:
+        cache.put(key, parsed)
+    return parsed
+
+
+async def acall_llm_json(
+    prompt: str, llm: Optional[ChatBedrock] = None, agent: Optional[str] = None
+) -> Union[Dict[str, Any], str]:
+    """Async variant of `call_llm_json`; awaits `ainvoke` instead of blocking a thread."""
+    start = time.perf_counter()
+    client = llm or get_bedrock_client()
+    if _use_mock(client):
+        return _observed(mock_response(prompt), agent, "mock", start)
+    cache = cache_for(agent)
+    coalesce = LLM_COALESCE and coalesces(agent)
+    key = prompt_key(prompt, client, format_system_prompt()) if cache is not None or coalesce else ""
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return _observed(cached, agent, "cache", start)
+    messages = _chat_messages(prompt)
+
+    def ainvoke() -> Any:
+        return get_governor().acall(agent or "", lambda: client.ainvoke(messages))
+
+    try:
+        if coalesce:
+            resp, shared = await get_singleflight().ado(key, ainvoke, agent or "")
+        else:
+            resp, shared = await ainvoke(), False
+    except Exception:
+        LLM_CALL_ERRORS.inc(agent=agent or "")
+        raise
+    if not shared:
+        record_usage(agent, resp)
+    parsed = _observed(_parse_response(resp), agent, "coalesced" if shared else "model", start)
+    if cache is not None and not shared:
+        cache.put(key, parsed)
+    return parsed
+
+
+def _chunk_text(chunk: Any) -> str:
+    content = chunk.content if hasattr(chunk, "content") else str(chunk)
+    if isinstance(content, str):
+        return content
+    # Content blocks, e.g. [{"type": "text", "text": "..."}]
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+async def astream_llm_text(
+    prompt: str, llm: Optional[ChatBedrock] = None, agent: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Stream the model's reply as text deltas via the Bedrock streaming API.
+
+    Streaming bypasses the response cache and single-flight but not the LLM
+    governor, which raises `LLMUnavailable` like it does for other calls.
+    Token usage arrives on the final chunks and is counted once the stream
+    is exhausted.
+    """
+    client = llm or get_bedrock_client()
+    if _use_mock(client):
+        reply = mock_response(prompt)
+        yield reply if isinstance(reply, str) else json.dumps(reply)
+        return
+    messages = _chat_messages(prompt)
+    input_tokens = output_tokens = 0
+    reported = False
+    try:
+        async for chunk in get_governor().astream(agent or "", lambda: client.astream(messages)):
+            tokens = usage_tokens(chunk)
+            if tokens is not None:
+                input_tokens, output_tokens, reported = input_tokens + tokens[0], output_tokens + tokens[1], True
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    except Exception:
+        LLM_CALL_ERRORS.inc(agent=agent or "")
+        raise
+    if reported:
+        record_tokens(agent, input_tokens, output_tokens)
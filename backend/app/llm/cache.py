@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import orjson
+
+
+LLM_CACHE_AGENTS = os.getenv("LLM_CACHE_AGENTS", "planner,plan_review")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
+LLMResult = Union[Dict[str, Any], str]
+
+
+def prompt_key(prompt: str, client: Any, system_prompt: str = "") -> str:
+    """Content address for a prompt sent to a given model configuration."""
+    model = getattr(client, "model_id", None) or type(client).__name__
+    params = json.dumps(getattr(client, "model_kwargs", None) or {}, sort_keys=True)
+    h = hashlib.sha256()
+    for part in (model, params, system_prompt, prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SqliteCacheTier:
+    """On-disk tier that survives restarts; entries carry a wall-clock expiry."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < time.time():
+            self.delete(key)
+            return None
+        return bytes(value), expires_at
+
+    def put(self, key: str, value: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """Content-addressed cache of parsed LLM responses.
+
+    The memory tier is LRU with a per-entry TTL and a total size bound in
+    bytes. Values are stored serialized, so every hit returns a fresh object.
+    An optional `SqliteCacheTier` backs the memory tier across restarts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_s: float = LLM_CACHE_TTL_S,
+        disk: Optional[SqliteCacheTier] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.disk = disk
+        self._clock = clock
+        # key -> (expires_at, serialized value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[LLMResult]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return orjson.loads(entry[1])
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                value, expires_at = stored
+                with self._lock:
+                    self.disk_hits += 1
+                    self._insert(key, value, expires_at)
+                return orjson.loads(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: LLMResult) -> None:
+        data = orjson.dumps(value)
+        expires_at = self._clock() + self.ttl_s
+        with self._lock:
+            self._insert(key, data, expires_at)
+        if self.disk is not None:
+            self.disk.put(key, data, expires_at)
+
+    def _insert(self, key: str, data: bytes, expires_at: float) -> None:
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, data)
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                disk = SqliteCacheTier(LLM_CACHE_DB) if LLM_CACHE_DB else None
+                _cache = LLMResponseCache(disk=disk)
+    return _cache
+
+
+def cache_enabled_agents() -> set[str]:
+    return {a.strip() for a in LLM_CACHE_AGENTS.split(",") if a.strip()}
+
+
+def cache_for(agent: Optional[str]) -> Optional[LLMResponseCache]:
+    """The shared cache if caching is switched on for `agent` (LLM_CACHE_AGENTS), else None."""
+    if agent and agent in cache_enabled_agents():
+        return get_llm_cache()
+    return None
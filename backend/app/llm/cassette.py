@@ -0,0 +1,320 @@
+"""Record/replay cassettes of LLM calls for hermetic LLM-mode tests and benchmarks.
+
+With `LLM_CASSETTE_RECORD=path` every client `get_bedrock_client()` builds is
+wrapped in a `CassetteRecorder`, which appends each prompt, reply and measured
+latency (plus time to first token for streams, and token usage when the model
+reports it) to a gzip-compressed JSONL file. `LLM_BACKEND=cassette` with
+`LLM_CASSETTE=path` serves the agents from that file instead: a prompt maps to
+its recordings in order, repeated prompts cycle through them, and
+`LLM_CASSETTE_LATENCY` scales the recorded latency that is slept before
+answering (0, the default, answers at once; 1 replays real Bedrock timing).
+
+    python -m app.llm.cassette cassette.jsonl.gz   # per-agent call counts and latency
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from app.llm.fake import prompt_agent
+
+
+LLM_CASSETTE = os.getenv("LLM_CASSETTE", "")
+LLM_CASSETTE_LATENCY = float(os.getenv("LLM_CASSETTE_LATENCY", "0"))
+# Recordings are appended to the file in batches of this many calls (and at exit)
+CASSETTE_FLUSH_EVERY = 64
+
+Entry = Dict[str, Any]
+
+
+class CassetteMiss(LookupError):
+    """The cassette has no recording for a prompt."""
+
+
+def cassette_key(messages: List[Dict[str, str]]) -> str:
+    """Content address of a chat request (roles and contents, in order)."""
+    h = hashlib.sha256()
+    for message in messages:
+        h.update(message.get("role", "").encode("utf-8"))
+        h.update(b"\0")
+        h.update(message.get("content", "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class Cassette:
+    """Recordings keyed by `cassette_key`, loaded from and appended to one file.
+
+    Each line is `{"k": key, "a": agent, "r": reply, "ms": latency}` with
+    optional `"ft"` (ms to first streamed token) and `"u"` (usage metadata).
+    Every `save()` appends a new gzip member, so a cassette grows across
+    recording sessions without rewriting what is already on disk.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries: Dict[str, List[Entry]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+        self._pending: List[Entry] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(path):
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        entry = orjson.loads(line)
+                        self._entries[entry["k"]].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def next(self, key: str) -> Entry:
+        """The next recording for `key`; repeated prompts cycle through theirs in recorded order."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(key)
+            i = self._cursors[key]
+            self._cursors[key] = i + 1
+            self.hits += 1
+            return entries[i % len(entries)]
+
+    def add(self, key: str, agent: str, reply: str, latency_s: float, **extra: Any) -> None:
+        entry: Entry = {"k": key, "a": agent, "r": reply, "ms": round(latency_s * 1000.0, 3)}
+        entry.update({k: v for k, v in extra.items() if v is not None})
+        with self._lock:
+            self._entries[key].append(entry)
+            self._pending.append(entry)
+            self.recorded += 1
+            flush = len(self._pending) >= CASSETTE_FLUSH_EVERY
+        if flush:
+            self.save()
+
+    def save(self) -> None:
+        """Append the recordings made since the last save."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, "ab") as f:
+                f.write(b"".join(orjson.dumps(e) + b"\n" for e in pending))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Recorded calls and latency percentiles (ms) per agent."""
+        by_agent: Dict[str, List[float]] = defaultdict(list)
+        with self._lock:
+            for entries in self._entries.values():
+                for e in entries:
+                    by_agent[e.get("a") or "unknown"].append(e["ms"])
+        return {
+            agent: {"calls": len(ms), "p50_ms": _percentile(ms, 0.5), "p99_ms": _percentile(ms, 0.99), "max_ms": max(ms)}
+            for agent, ms in sorted(by_agent.items())
+        }
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": sum(len(v) for v in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def open_cassette(path: str) -> Cassette:
+    """The process-wide `Cassette` for `path`, shared by every client recording to or replaying it."""
+    path = os.path.abspath(path)
+    cassette = _cassettes.get(path)
+    if cassette is None:
+        with _cassettes_lock:
+            cassette = _cassettes.get(path)
+            if cassette is None:
+                cassette = _cassettes[path] = Cassette(path)
+    return cassette
+
+
+def save_cassettes() -> None:
+    """Write out pending recordings of every open cassette."""
+    with _cassettes_lock:
+        cassettes = list(_cassettes.values())
+    for cassette in cassettes:
+        cassette.save()
+
+
+def close_cassettes() -> None:
+    """Save and forget open cassettes, so the next `open_cassette` rereads the file."""
+    save_cassettes()
+    with _cassettes_lock:
+        _cassettes.clear()
+
+
+def cassette_stats() -> Dict[str, float]:
+    with _cassettes_lock:
+        cassettes = list(_cassettes.values())
+    totals: Dict[str, float] = {}
+    for cassette in cassettes:
+        for key, value in cassette.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+atexit.register(save_cassettes)
+
+
+def _prompt(messages: List[Dict[str, str]]) -> str:
+    return messages[-1]["content"] if messages else ""
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    # Content blocks, e.g. [{"type": "text", "text": "..."}]
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+class CassetteRecorder:
+    """Wraps a chat model and records every successful call into a cassette.
+
+    Everything else (model_id, model_kwargs, ...) is delegated to the wrapped
+    model, so response-cache keys are the same with and without recording.
+    """
+
+    def __init__(self, inner: Any, cassette: Cassette) -> None:
+        self.inner = inner
+        self.cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    def _record(self, messages: List[Dict[str, str]], resp: Any, latency_s: float) -> None:
+        usage = getattr(resp, "usage_metadata", None)
+        self.cassette.add(
+            cassette_key(messages), prompt_agent(_prompt(messages)), _text(resp.content), latency_s,
+            u=dict(usage) if usage else None,
+        )
+
+    def invoke(self, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        resp = self.inner.invoke(messages, **kwargs)
+        self._record(messages, resp, time.perf_counter() - start)
+        return resp
+
+    async def ainvoke(self, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        resp = await self.inner.ainvoke(messages, **kwargs)
+        self._record(messages, resp, time.perf_counter() - start)
+        return resp
+
+    async def astream(self, messages: List[Dict[str, str]], **kwargs: Any) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        first: Optional[float] = None
+        parts: List[str] = []
+        usage = None
+        async for chunk in self.inner.astream(messages, **kwargs):
+            if first is None:
+                first = time.perf_counter() - start
+            parts.append(_text(chunk.content))
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        self.cassette.add(
+            cassette_key(messages), prompt_agent(_prompt(messages)), "".join(parts), time.perf_counter() - start,
+            ft=round(first * 1000.0, 3) if first is not None else None, u=dict(usage) if usage else None,
+        )
+
+
+class CassetteChatModel:
+    """Offline chat model answering from a cassette (LLM_BACKEND=cassette).
+
+    Implements the same `invoke`/`ainvoke`/`astream` subset as FakeChatModel.
+    Each call sleeps `latency_scale` times the recorded latency before
+    answering; a prompt with no recording raises `CassetteMiss`, which the
+    governor treats like any failed model call.
+    """
+
+    model_id = "cassette"
+
+    def __init__(self, cassette: Cassette, latency_scale: Optional[float] = None) -> None:
+        self.cassette = cassette
+        self.latency_scale = LLM_CASSETTE_LATENCY if latency_scale is None else max(0.0, latency_scale)
+        self.calls = 0
+
+    def _entry(self, messages: List[Dict[str, str]]) -> Entry:
+        entry = self.cassette.next(cassette_key(messages))
+        self.calls += 1
+        return entry
+
+    @staticmethod
+    def _message(entry: Entry) -> AIMessage:
+        usage = entry.get("u")
+        return AIMessage(content=entry["r"], usage_metadata=usage) if usage else AIMessage(content=entry["r"])
+
+    def invoke(self, messages: List[Dict[str, str]], **_: Any) -> AIMessage:
+        entry = self._entry(messages)
+        if self.latency_scale:
+            time.sleep(entry["ms"] * self.latency_scale / 1000.0)
+        return self._message(entry)
+
+    async def ainvoke(self, messages: List[Dict[str, str]], **_: Any) -> AIMessage:
+        entry = self._entry(messages)
+        if self.latency_scale:
+            await asyncio.sleep(entry["ms"] * self.latency_scale / 1000.0)
+        return self._message(entry)
+
+    async def astream(self, messages: List[Dict[str, str]], **_: Any) -> AsyncIterator[AIMessageChunk]:
+        entry = self._entry(messages)
+        tokens = re.split(r"(?<=\s)(?=\S)", entry["r"])
+        total_s = entry["ms"] * self.latency_scale / 1000.0
+        # Without a recorded time to first token the whole latency is spent up front
+        first_s = entry.get("ft", entry["ms"]) * self.latency_scale / 1000.0
+        gap_s = max(0.0, total_s - first_s) / max(1, len(tokens) - 1)
+        if first_s:
+            await asyncio.sleep(first_s)
+        usage = entry.get("u")
+        for i, token in enumerate(tokens):
+            if i and gap_s:
+                await asyncio.sleep(gap_s)
+            if usage and i == len(tokens) - 1:
+                yield AIMessageChunk(content=token, usage_metadata=usage)
+            else:
+                yield AIMessageChunk(content=token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=LLM_CASSETTE or "cassette.jsonl.gz")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path)
+    print(json.dumps({"path": args.path, "entries": len(cassette), "agents": cassette.summary()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
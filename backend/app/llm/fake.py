@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def mock_response(prompt: str) -> Union[Dict[str, Any], str]:
+    """Minimal deterministic reply based on keywords in the prompt."""
+    lower = prompt.lower()
+    if "json" in lower and "intent" in lower and "slots" in lower:
+        return {"intent": None, "slots": {}}
+    if "review" in lower and "score" in lower:
+        return {"approved": True, "issues": [], "score": 7.0}
+    if "respond" in lower and "execution" in lower:
+        return "All set!"
+    # Generic fallback
+    return "Okay."
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Claude token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class FakeThrottlingException(Exception):
+    """Shaped like the botocore ClientError Bedrock raises when throttling."""
+
+    def __init__(self) -> None:
+        super().__init__("Rate exceeded (fake)")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}
+
+
+class FakeChatModel:
+    """Offline stand-in for ChatBedrock with configurable latency and injected errors.
+
+    Implements the `invoke`/`ainvoke`/`astream` subset the agents use and
+    answers with `mock_response`, so LLM-mode throughput can be benchmarked
+    without AWS. `astream` waits `latency_ms` before the first token and
+    `token_latency_ms` between tokens. A share `error_rate` of invoke calls
+    fail after the latency with a throttling error (`error="throttle"`) or a
+    generic RuntimeError (`error="error"`).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float | None = None,
+        token_latency_ms: float | None = None,
+        error_rate: float | None = None,
+        error: str | None = None,
+        seed: int | None = None,
+    ) -> None:
+        if latency_ms is None:
+            latency_ms = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+        if token_latency_ms is None:
+            token_latency_ms = float(os.getenv("FAKE_LLM_TOKEN_LATENCY_MS", "0"))
+        if error_rate is None:
+            error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.latency_s = max(0.0, latency_ms) / 1000.0
+        self.token_latency_s = max(0.0, token_latency_ms) / 1000.0
+        self.error_rate = error_rate
+        self.error = error or os.getenv("FAKE_LLM_ERROR", "throttle")
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.calls += 1
+            if self.error == "throttle":
+                raise FakeThrottlingException()
+            raise RuntimeError("Injected fake LLM error")
+
+    @staticmethod
+    def _message(messages: List[Dict[str, str]], content: str) -> AIMessage:
+        # Bedrock-shaped usage so token accounting has something to count offline
+        input_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        output_tokens = estimate_tokens(content)
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def _reply(self, messages: List[Dict[str, str]]) -> AIMessage:
+        self.calls += 1
+        prompt = messages[-1]["content"] if messages else ""
+        content = mock_response(prompt)
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        return self._message(messages, content)
+
+    def invoke(self, messages: List[Dict[str, str]], **_: Any) -> AIMessage:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        self._maybe_fail()
+        return self._reply(messages)
+
+    async def ainvoke(self, messages: List[Dict[str, str]], **_: Any) -> AIMessage:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        self._maybe_fail()
+        return self._reply(messages)
+
+    async def astream(self, messages: List[Dict[str, str]], **_: Any) -> AsyncIterator[AIMessageChunk]:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        reply = self._reply(messages)
+        # Word-sized tokens that concatenate back to the full reply; usage comes with the last one
+        tokens = re.split(r"(?<=\s)(?=\S)", reply.content)
+        for i, token in enumerate(tokens):
+            if i and self.token_latency_s:
+                await asyncio.sleep(self.token_latency_s)
+            if i == len(tokens) - 1:
+                yield AIMessageChunk(content=token, usage_metadata=reply.usage_metadata)
+            else:
+                yield AIMessageChunk(content=token)
+
+
+# First-line phrases of each LLM agent's prompt (app/agents_llm), used to tell the callers apart
+PROMPT_AGENTS = (
+    ("You extract user intent", "planner"),
+    ("You review a plan", "plan_review"),
+    ("You review an execution result", "execution_review"),
+    ("You are a banking execution agent", "executioner"),
+    ("Summarize the execution result", "responder"),
+    ("help the user proceed after this issue", "fallback"),
+)
+
+
+def prompt_agent(prompt: str) -> str:
+    """Which LLM agent built `prompt` ("" if none matches)."""
+    for marker, agent in PROMPT_AGENTS:
+        if marker in prompt:
+            return agent
+    return ""
+
+
+class ReplayChatModel(FakeChatModel):
+    """FakeChatModel that answers each agent with a recorded response (LLM_BACKEND=replay).
+
+    `load()` sets the responses for the next turn, keyed by agent name; an
+    agent without one gets `mock_response` and is counted in `misses`. Used by
+    the session replay tool (app/core/replay.py) to run LLM-mode turns offline.
+    """
+
+    def __init__(self, latency_ms: float | None = None, **kwargs: Any) -> None:
+        super().__init__(latency_ms=latency_ms, **kwargs)
+        self.responses: Dict[str, Any] = {}
+        self.misses = 0
+
+    def load(self, responses: Dict[str, Any]) -> None:
+        self.responses = dict(responses)
+
+    def _reply(self, messages: List[Dict[str, str]]) -> AIMessage:
+        prompt = messages[-1]["content"] if messages else ""
+        content = self.responses.get(prompt_agent(prompt))
+        if content is None:
+            self.misses += 1
+            return super()._reply(messages)
+        self.calls += 1
+        return self._message(messages, content if isinstance(content, str) else json.dumps(content))
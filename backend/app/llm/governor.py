@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.core.concurrency import LoopLocal, acquire_async, shared_executor
+from app.core.metrics import LLM_GOVERNOR_EVENTS
+
+
+T = TypeVar("T")
+
+# In-flight model calls across all agents, and per agent, e.g. "planner=16,fallback=4"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_AGENT_CONCURRENCY = os.getenv("LLM_AGENT_CONCURRENCY", "")
+# Deadline for one governed call: waiting for a slot, every attempt and the backoff between them
+LLM_CALL_TIMEOUT_S = float(os.getenv("LLM_CALL_TIMEOUT_S", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.2"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "2"))
+# Consecutive failed calls that open the breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+# Refused before the request went out, so nothing reached the model
+_UNSENT_REASONS = {"circuit_open", "overloaded"}
+
+_THROTTLING_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+class LLMUnavailable(Exception):
+    """A governed LLM call did not produce a reply; callers degrade to the rule-based agents.
+
+    `reason` is one of circuit_open, overloaded (no concurrency slot before the
+    deadline), timeout, throttled (retries exhausted) or error.
+    """
+
+    def __init__(self, agent: str, reason: str) -> None:
+        super().__init__(f"LLM call for {agent or 'unknown'} unavailable: {reason}")
+        self.agent = agent
+        self.reason = reason
+
+    def __reduce__(self) -> Any:
+        # Rebuilt from its fields, so single-flight can hand each waiter a copy
+        return type(self), (self.agent, self.reason)
+
+    @property
+    def sent(self) -> bool:
+        """False if the call was refused before any request went out (circuit_open, overloaded)."""
+        return self.reason not in _UNSENT_REASONS
+
+
+def is_throttling(exc: BaseException) -> bool:
+    """botocore ClientError with a throttling/capacity code (or anything named like one)."""
+    code = (getattr(exc, "response", None) or {}).get("Error", {}).get("Code")
+    return code in _THROTTLING_CODES or "Throttl" in type(exc).__name__
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for item in spec.split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            limits[key.strip()] = int(value)
+    return limits
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures; after `cooldown_s` one probe is let through.
+
+    A probe that never reports back (e.g. a cancelled request) is replaced by
+    a new one after another `cooldown_s`.
+    """
+
+    def __init__(
+        self,
+        failures: int = LLM_BREAKER_FAILURES,
+        cooldown_s: float = LLM_BREAKER_COOLDOWN_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failures = max(1, failures)
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._clock() - self._opened_at >= self.cooldown_s else "open"
+
+    def _probing(self) -> bool:
+        return self._probe_started is not None and self._clock() - self._probe_started < self.cooldown_s
+
+    def is_open(self) -> bool:
+        """True while calls would be refused (the pipeline routes such turns to the rule agents)."""
+        state = self.state
+        return state == "open" or (state == "half_open" and self._probing())
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing():
+                self._probe_started = self._clock()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._probe_started is not None or self._consecutive >= self.failures:
+                if self._opened_at is None:
+                    self.opens += 1
+                self._opened_at = self._clock()
+                self._probe_started = None
+
+
+class LLMGovernor:
+    """Admission, deadline, retry and circuit-breaking policy around each model call.
+
+    A call needs a slot in the global semaphore and in its agent's semaphore
+    (threading semaphores, shared by sync and async callers), must finish
+    within `timeout_s` overall, and is retried on throttling with full-jitter
+    exponential backoff. Sync calls run on a dedicated pool so the caller can
+    stop waiting at the deadline; their slots are released only when the
+    underlying request actually returns, so the caps bound real in-flight
+    requests.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        agent_limits: Optional[Dict[str, int]] = None,
+        timeout_s: float = LLM_CALL_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_s: float = LLM_RETRY_BASE_S,
+        retry_max_s: float = LLM_RETRY_MAX_S,
+        breaker: Optional[CircuitBreaker] = None,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_s = timeout_s
+        self.max_retries = max(0, max_retries)
+        self.retry_base_s = retry_base_s
+        self.retry_max_s = retry_max_s
+        self.breaker = breaker or CircuitBreaker()
+        self._rng = rng
+        self._global = threading.BoundedSemaphore(self.max_concurrency)
+        self._agent_limits = agent_limits if agent_limits is not None else _parse_limits(LLM_AGENT_CONCURRENCY)
+        self._agents: Dict[str, threading.BoundedSemaphore] = {}
+        # Async callers queue on asyncio semaphores of the same size (keyed by agent, "" = global)
+        # in front of the shared ones, so waiting for a slot costs no polling or threads
+        self._gates: LoopLocal[str, asyncio.Semaphore] = LoopLocal(lambda key: asyncio.Semaphore(self._limit(key)))
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counts: Dict[str, int] = {}
+
+    # Bookkeeping
+
+    def _count(self, agent: str, event: str) -> None:
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + 1
+        LLM_GOVERNOR_EVENTS.inc(agent=agent, event=event)
+
+    def _limit(self, key: str) -> int:
+        if not key:
+            return self.max_concurrency
+        return max(1, self._agent_limits.get(key, self._agent_limits.get("default", self.max_concurrency)))
+
+    def _agent_semaphore(self, agent: str) -> Optional[threading.BoundedSemaphore]:
+        limit = self._agent_limits.get(agent, self._agent_limits.get("default"))
+        if limit is None:
+            return None
+        semaphore = self._agents.get(agent)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._agents.setdefault(agent, threading.BoundedSemaphore(max(1, limit)))
+        return semaphore
+
+    def _semaphores(self, agent: str) -> List[threading.BoundedSemaphore]:
+        # Agent slot first, so calls queued behind their agent's cap don't hold global slots
+        agent_semaphore = self._agent_semaphore(agent)
+        return ([agent_semaphore] if agent_semaphore is not None else []) + [self._global]
+
+    def _release(self, semaphores: List[threading.BoundedSemaphore]) -> None:
+        for semaphore in reversed(semaphores):
+            semaphore.release()
+        with self._lock:
+            self.in_flight -= 1
+
+    def _acquired(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return self._rng() * min(self.retry_max_s, self.retry_base_s * (2 ** attempt))
+
+    def _admit(self, agent: str) -> None:
+        if not self.breaker.allow():
+            self._count(agent, "circuit_open")
+            raise LLMUnavailable(agent, "circuit_open")
+
+    def _failed(self, agent: str, reason: str) -> LLMUnavailable:
+        self.breaker.record_failure()
+        self._count(agent, reason)
+        return LLMUnavailable(agent, reason)
+
+    def is_open(self) -> bool:
+        return self.breaker.is_open()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight,
+            "breaker_open": int(self.breaker.is_open()),
+            "breaker_opens": self.breaker.opens,
+            **{k: v for k, v in sorted(self.counts.items())},
+        }
+
+    # Sync path
+
+    def call(self, agent: str, fn: Callable[[], T]) -> T:
+        self._admit(agent)
+        deadline = time.monotonic() + self.timeout_s
+        attempt = 0
+        while True:
+            future = self._submit(agent, fn, deadline)
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                raise self._failed(agent, "timeout") from None
+            except Exception as exc:
+                delay = self._backoff(attempt)
+                if not is_throttling(exc) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    raise self._failed(agent, "throttled" if is_throttling(exc) else "error") from exc
+                self._count(agent, "retry")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _submit(self, agent: str, fn: Callable[[], T], deadline: float) -> "Future[T]":
+        semaphores = self._semaphores(agent)
+        taken = []
+        for semaphore in semaphores:
+            if not semaphore.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                for held in reversed(taken):
+                    held.release()
+                self._count(agent, "overloaded")
+                raise LLMUnavailable(agent, "overloaded")
+            taken.append(semaphore)
+        self._acquired()
+        future = shared_executor("llm", self.max_concurrency).submit(contextvars.copy_context().run, fn)
+        future.add_done_callback(lambda _: self._release(semaphores))
+        return future
+
+    # Async path
+
+    @asynccontextmanager
+    async def _aslots(self, agent: str, deadline: float) -> AsyncIterator[None]:
+        semaphores = self._semaphores(agent)
+        # Same order as `_semaphores`: the agent's slot (if capped), then the global one
+        gates = ([self._gates.get(agent)] if len(semaphores) > 1 else []) + [self._gates.get("")]
+        taken: List[Any] = []
+        try:
+            for gate, semaphore in zip(gates, semaphores):
+                await asyncio.wait_for(gate.acquire(), max(0.0, deadline - time.monotonic()))
+                taken.append(gate)
+                await asyncio.wait_for(acquire_async(semaphore), max(0.0, deadline - time.monotonic()))
+                taken.append(semaphore)
+        except BaseException as exc:
+            # Timed out or cancelled (client gone, caller's wait_for, discarded branch) mid-acquire
+            for held in reversed(taken):
+                held.release()
+            if not isinstance(exc, asyncio.TimeoutError):
+                raise
+            self._count(agent, "overloaded")
+            raise LLMUnavailable(agent, "overloaded") from None
+        self._acquired()
+        try:
+            yield
+        finally:
+            self._release(semaphores)
+            for gate in gates:
+                gate.release()
+
+    async def acall(self, agent: str, fn: Callable[[], Awaitable[T]]) -> T:
+        self._admit(agent)
+        deadline = time.monotonic() + self.timeout_s
+        attempt = 0
+        while True:
+            async with self._aslots(agent, deadline):
+                try:
+                    result = await asyncio.wait_for(fn(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise self._failed(agent, "timeout") from None
+                except Exception as exc:
+                    delay = self._backoff(attempt)
+                    if not is_throttling(exc) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                        raise self._failed(agent, "throttled" if is_throttling(exc) else "error") from exc
+                    self._count(agent, "retry")
+                    attempt += 1
+                else:
+                    self.breaker.record_success()
+                    return result
+            await asyncio.sleep(delay)
+
+    async def astream(self, agent: str, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Governed streaming call: the slots are held until the stream ends and the deadline covers all of it.
+
+        Streams are not retried, since the caller may already have passed
+        earlier chunks on to the user.
+        """
+        self._admit(agent)
+        deadline = time.monotonic() + self.timeout_s
+        async with self._aslots(agent, deadline):
+            stream = fn()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - time.monotonic()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise self._failed(agent, "timeout") from None
+                    except Exception as exc:
+                        raise self._failed(agent, "throttled" if is_throttling(exc) else "error") from exc
+                    yield chunk
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        self.breaker.record_success()
+
+
+_governor: Optional[LLMGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> LLMGovernor:
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = LLMGovernor()
+    return _governor
+
+
+def set_governor(governor: Optional[LLMGovernor]) -> None:
+    """Replace the process-wide governor (None rebuilds it from the environment on next use)."""
+    global _governor
+    with _governor_lock:
+        _governor = governor
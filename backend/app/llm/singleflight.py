@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.core.metrics import LLM_COALESCED_CALLS
+
+
+T = TypeVar("T")
+
+LLM_COALESCE = os.getenv("LLM_COALESCE", "true").lower() in {"1", "true", "yes"}
+# Only read-only steps may share a reply; the executioner's calls stand for account operations
+LLM_COALESCE_AGENTS = os.getenv("LLM_COALESCE_AGENTS", "planner,plan_review,execution_review")
+
+
+def _fresh(exc: BaseException) -> BaseException:
+    """A copy of a shared call's exception for one more caller, chained to the original.
+
+    Raising the one instance in every waiter would have them all rewrite its
+    `__traceback__`. Exceptions that can't be rebuilt from their args are
+    raised as is.
+    """
+    try:
+        copied = copy.copy(exc)
+    except Exception:
+        return exc
+    copied.__cause__ = exc
+    return copied
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight (followers) wait for it and receive the same result,
+    or each their own copy of its exception. Nothing is kept once the call finishes, so this only merges
+    requests that overlap in time (the response cache covers later repeats).
+    Sync and async callers are tracked separately, and async flights are
+    scoped to their event loop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, agent: str, role: str) -> None:
+        with self._lock:
+            if role == "leader":
+                self.leaders += 1
+            else:
+                self.followers += 1
+        LLM_COALESCED_CALLS.inc(agent=agent, role=role)
+
+    def do(self, key: str, fn: Callable[[], T], agent: str = "") -> Tuple[T, bool]:
+        """Run `fn` once per in-flight `key`; returns (result, shared) where shared is True for followers."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self._count(agent, "follower")
+            flight.done.wait()
+            if flight.error is not None:
+                raise _fresh(flight.error)
+            return flight.result, True
+        self._count(agent, "leader")
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]], agent: str = "") -> Tuple[T, bool]:
+        """Async variant of `do`; the shared call runs as a task, so a cancelled caller doesn't cancel it for the others."""
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(task_key))
+        self._count(agent, "leader" if leader else "follower")
+        try:
+            return await asyncio.shield(task), not leader
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            # Every awaiter of the task is handed the same instance
+            raise _fresh(exc)
+
+    def _forget(self, task_key: Tuple[int, str]) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self) -> Dict[str, float]:
+        calls = self.leaders + self.followers
+        return {
+            "in_flight": len(self._flights) + len(self._tasks),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalescing_ratio": round(self.followers / calls, 4) if calls else 0.0,
+        }
+
+
+def coalesce_enabled_agents() -> set[str]:
+    return {a.strip() for a in LLM_COALESCE_AGENTS.split(",") if a.strip()}
+
+
+def coalesces(agent: Optional[str]) -> bool:
+    """True if concurrent identical calls of `agent` may share one request (LLM_COALESCE_AGENTS)."""
+    return bool(agent) and agent in coalesce_enabled_agents()
+
+
+_singleflight: Optional[SingleFlight] = None
+_singleflight_lock = threading.Lock()
+
+
+def get_singleflight() -> SingleFlight:
+    global _singleflight
+    if _singleflight is None:
+        with _singleflight_lock:
+            if _singleflight is None:
+                _singleflight = SingleFlight()
+    return _singleflight
@@ -0,0 +1,86 @@
+"""Token and cost accounting for model calls.
+
+`record_usage(agent, resp)` reads the token counts Bedrock reports on a reply
+(`usage_metadata`, or the `usage` block of `response_metadata`) and adds them
+to the current turn; when the turn finishes they are counted by agent and
+intent on `/metrics` (`llm_tokens_total`, `llm_cost_usd_total`) and the
+pipeline logs the turn's totals and the session's totals in this process as
+an `llm_usage` event.
+Cost is estimated from LLM_PRICE_INPUT_PER_1K / LLM_PRICE_OUTPUT_PER_1K (USD
+per 1000 tokens, Claude 3.5 Sonnet on-demand pricing by default).
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.metrics import LLM_BILLED_CALLS, LLM_COST_USD, LLM_TOKENS, Usage, record_llm_tokens
+
+
+LLM_PRICE_INPUT_PER_1K = float(os.getenv("LLM_PRICE_INPUT_PER_1K", "0.003"))
+LLM_PRICE_OUTPUT_PER_1K = float(os.getenv("LLM_PRICE_OUTPUT_PER_1K", "0.015"))
+
+
+def usage_tokens(resp: Any) -> Optional[Tuple[int, int]]:
+    """(input_tokens, output_tokens) reported on a model reply or stream chunk, if any."""
+    usage = getattr(resp, "usage_metadata", None)
+    if usage:
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    usage = (getattr(resp, "response_metadata", None) or {}).get("usage")
+    if usage:
+        return (
+            int(usage.get("prompt_tokens", usage.get("input_tokens", 0))),
+            int(usage.get("completion_tokens", usage.get("output_tokens", 0))),
+        )
+    return None
+
+
+def token_cost(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * LLM_PRICE_INPUT_PER_1K + output_tokens * LLM_PRICE_OUTPUT_PER_1K) / 1000.0
+
+
+def record_tokens(agent: Optional[str], input_tokens: int, output_tokens: int) -> None:
+    record_llm_tokens(agent or "", input_tokens, output_tokens, token_cost(input_tokens, output_tokens))
+
+
+def record_usage(agent: Optional[str], resp: Any) -> None:
+    """Count the tokens of one model reply; replies without usage (mock, cache) are free."""
+    tokens = usage_tokens(resp)
+    if tokens is not None:
+        record_tokens(agent, *tokens)
+
+
+def usage_totals(per_agent: Iterable[Usage], into: Optional[Usage] = None) -> Usage:
+    """Sum per-agent usage dicts, optionally into a running total (e.g. a session's)."""
+    totals = into if into is not None else {}
+    for usage in per_agent:
+        for key, value in usage.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def usage_summary() -> Dict[str, Any]:
+    """Process-wide token usage and cost, overall and by agent and intent, from the counters."""
+    by_agent: Dict[str, Usage] = {}
+    by_intent: Dict[str, Usage] = {}
+
+    def add(labels: Dict[str, str], key: str, value: float) -> None:
+        for group, name in ((by_agent, labels["agent"]), (by_intent, labels["intent"])):
+            usage = group.setdefault(name, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+            usage[key] += value
+
+    for labels, value in LLM_TOKENS.samples():
+        add(labels, f"{labels['kind']}_tokens", value)
+    for labels, value in LLM_COST_USD.samples():
+        add(labels, "cost_usd", value)
+    for labels, value in LLM_BILLED_CALLS.samples():
+        add(labels, "calls", value)
+    for group in (by_agent, by_intent):
+        for usage in group.values():
+            calls = usage["calls"] or 1
+            usage["input_tokens_per_call"] = round(usage["input_tokens"] / calls, 1)
+            usage["cost_usd_per_call"] = usage["cost_usd"] / calls
+    totals = usage_totals(
+        {k: v for k, v in u.items() if k in ("calls", "input_tokens", "output_tokens", "cost_usd")} for u in by_agent.values()
+    )
+    return {"totals": totals, "by_agent": by_agent, "by_intent": by_intent}
@@ -1,22 +1,56 @@
 from __future__ import annotations
 
+import hmac
 import os
-from typing import List
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
 import orjson
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 
-from app.core.pipeline import AgentPipeline
-from app.core.types import ChatRequest, ChatResponse
+from app.core.intent_classifier import get_intent_classifier, intent_classifier_stats
+from app.core.log_index import get_log_index, normalize_ts
+from app.core.logger import shutdown_logs
+from app.core.metrics import REGISTRY, Family, render_metrics
+from app.core.pipeline import PIPELINE_ENGINE, USE_LLM, AgentPipeline
+from app.core.state_backend import StateConflict
+from app.core.types import ChatBatchError, ChatBatchRequest, ChatBatchResponse, ChatRequest, ChatResponse
+from app.graph.agent_graph import get_turn_graph
+from app.llm.bedrock import warm_clients
+from app.llm.cache import get_llm_cache
+from app.llm.cassette import cassette_stats, save_cassettes
+from app.llm.governor import get_governor
+from app.llm.singleflight import get_singleflight
+from app.llm.usage import usage_summary
+
+
+# The /admin endpoints answer 404 until a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 
 def _orjson_dumps(v, *, default):
     return orjson.dumps(v, default=default).decode()
 
 
-app = FastAPI(title="AgenticBank API", default_response_class=ORJSONResponse)
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if USE_LLM and os.getenv("BEDROCK_WARM_ON_STARTUP", "false").lower() in {"1", "true", "yes"}:
+        warm_clients()
+    if USE_LLM and PIPELINE_ENGINE == "graph":
+        # Compile the turn graph before the first request instead of on it
+        get_turn_graph()
+    # Load the intent classifier artifact (if configured) before the first request
+    get_intent_classifier()
+    yield
+    # Flush buffered session logs so nothing queued is lost when uvicorn stops
+    shutdown_logs()
+    save_cassettes()
+
+
+app = FastAPI(title="AgenticBank API", default_response_class=ORJSONResponse, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -28,14 +62,196 @@ app.add_middleware(
 pipeline = AgentPipeline()
 
 
+def _stats_families() -> List[Family]:
+    # Export the existing stats() counters alongside the latency histograms
+    families: List[Family] = []
+    for prefix, stats in (
+        ("agent_sessions", pipeline.session_stats()),
+        ("llm_cache", get_llm_cache().stats()),
+        ("llm_singleflight", get_singleflight().stats()),
+        ("llm_cassette", cassette_stats()),
+        ("agent_routing", pipeline.routing_stats()),
+        ("intent_classifier", intent_classifier_stats()),
+        ("agent_state", pipeline.state_stats()),
+        ("llm_governor", get_governor().stats()),
+    ):
+        for key, value in stats.items():
+            families.append((f"{prefix}_{key}", "gauge", f"{prefix} stats: {key}", [({}, value)]))
+    return families
+
+
+REGISTRY.add_collector(_stats_families)
+
+
+@app.exception_handler(StateConflict)
+async def state_conflict(_: Request, exc: StateConflict) -> ORJSONResponse:
+    # Another worker saved this session mid-turn. Turns claim the session before executing, so a
+    # conflict usually means nothing ran, but the session may have moved on: not safe to resend blindly
+    return ORJSONResponse(status_code=409, content={"detail": str(exc), "session_id": exc.session_id})
+
+
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/usage")
+def usage() -> Dict[str, Any]:
+    """Model tokens and estimated cost since startup, overall and by agent and intent."""
+    return usage_summary()
+
+
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
-    return pipeline.process(req.message, session_id=req.session_id)
+async def chat(req: ChatRequest) -> ChatResponse:
+    return await pipeline.aprocess(req.message, session_id=req.session_id)
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """Server-sent events: stage results as they complete, responder tokens, then `done`."""
+
+    async def sse() -> AsyncIterator[bytes]:
+        async for item in pipeline.astream(req.message, session_id=req.session_id):
+            yield b"event: " + item["event"].encode() + b"\ndata: " + orjson.dumps(item["data"]) + b"\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _batch_error(index: int, exc: Exception) -> ChatBatchError:
+    return ChatBatchError(index=index, error=type(exc).__name__, detail=str(exc))
+
+
+@app.post("/chat/batch", response_model=None)
+def chat_batch(req: ChatBatchRequest) -> Union[ChatBatchResponse, StreamingResponse]:
+    # Sync route: turns are CPU/IO-bound in the batch pool, not on the event loop
+    items = [(item.session_id, item.message) for item in req.items]
+    if not req.stream:
+        results: List[Optional[ChatResponse]] = []
+        errors: List[ChatBatchError] = []
+        for index, result in pipeline.iter_many(items):
+            if isinstance(result, Exception):
+                errors.append(_batch_error(index, result))
+                result = None
+            results.append(result)
+        return ChatBatchResponse(results=results, errors=errors)
+
+    def ndjson() -> Iterator[bytes]:
+        for index, result in pipeline.iter_many(items):
+            if isinstance(result, Exception):
+                yield orjson.dumps(_batch_error(index, result).model_dump()) + b"\n"
+            else:
+                yield orjson.dumps({"index": index, "response": result.model_dump(mode="json")}) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+
+def _time_range(since: Optional[str], until: Optional[str], within_s: Optional[int]) -> Dict[str, Any]:
+    """since/until normalized up front, so a bad timestamp is a 400 even when the reply is streamed."""
+    if within_s is not None:
+        since = (datetime.utcnow() - timedelta(seconds=within_s)).isoformat(timespec="seconds")
+    try:
+        return {"since": normalize_ts(since) if since else None, "until": normalize_ts(until) if until else None}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"invalid timestamp: {exc}") from exc
+
+
+def _page(search, stream: bool, refresh: bool = False, **filters: Any) -> Union[Dict[str, Any], StreamingResponse]:
+    if refresh:
+        # Rescan now for what other worker processes just wrote, rather than on the index's next periodic rescan
+        get_log_index().refresh(force=True)
+    try:
+        if stream:
+            filters.pop("limit")
+            items = get_log_index().iter_events(**filters)
+        else:
+            items, next_cursor = search(**filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not stream:
+        return {"items": items, "next_cursor": next_cursor}
+
+    def ndjson() -> Iterator[bytes]:
+        for item in items:
+            yield orjson.dumps(item) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.get("/admin/sessions", dependencies=[Depends(require_admin)])
+def admin_sessions(
+    state: Optional[str] = None,
+    intent: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    within_s: Optional[int] = Query(None, ge=0),
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Sessions by latest state/intent, e.g. `?state=awaiting_clarification`."""
+    return _page(
+        get_log_index().search_sessions, False, refresh,
+        state=state, intent=intent, cursor=cursor, limit=limit, **_time_range(since, until, within_s),
+    )
+
+
+@app.get("/admin/sessions/events", response_model=None, dependencies=[Depends(require_admin)])
+def admin_session_events(
+    event: Optional[str] = None,
+    name: Optional[str] = None,
+    intent: Optional[str] = None,
+    state: Optional[str] = None,
+    session_id: Optional[str] = None,
+    success: Optional[bool] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    within_s: Optional[int] = Query(None, ge=0),
+    records: bool = False,
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    stream: bool = False,
+    refresh: bool = False,
+) -> Union[Dict[str, Any], StreamingResponse]:
+    """Logged events, e.g. failed transfers in the last hour:
+    `?name=executioner&intent=transfer_money&success=false&within_s=3600`. `stream=true` returns every match as NDJSON.
+    """
+    return _page(
+        get_log_index().search_events, stream, refresh,
+        event=event, name=name, intent=intent, state=state, session_id=session_id, success=success,
+        with_records=records, cursor=cursor, limit=limit, **_time_range(since, until, within_s),
+    )
+
+
+@app.get("/admin/sessions/{session_id}", response_model=None, dependencies=[Depends(require_admin)])
+def admin_session(
+    session_id: str,
+    event: Optional[str] = None,
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    stream: bool = False,
+    refresh: bool = False,
+) -> Union[Dict[str, Any], StreamingResponse]:
+    """A session's transcript: its logged records in order, paginated or streamed."""
+    return _page(
+        get_log_index().search_events, stream, refresh,
+        session_id=session_id, event=event, with_records=True, cursor=cursor, limit=limit,
+    )
 
 
 # Local dev convenience: uvicorn entry point
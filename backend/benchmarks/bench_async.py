@@ -0,0 +1,81 @@
+"""Throughput of LLM-mode turns: threadpool `process` vs native async `aprocess`.
+
+Runs entirely offline against the fake LLM (LLM_BACKEND=fake) with an injected
+per-call latency, so the numbers reflect how many model round-trips each path
+can keep in flight rather than Bedrock itself.
+
+    python -m benchmarks.bench_async --turns 400 --latency-ms 50 --threads 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+
+
+MESSAGE = "transfer 10 from 111111 to 222222"
+
+
+def bench_threadpool(turns: int, threads: int) -> float:
+    pipe = AgentPipeline()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: pipe.process(MESSAGE), range(turns)))
+    return time.perf_counter() - start
+
+
+def bench_async(turns: int) -> float:
+    pipe = AgentPipeline()
+
+    async def run() -> None:
+        await asyncio.gather(*(pipe.aprocess(MESSAGE) for _ in range(turns)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def run_bench(turns: int, latency_ms: float, threads: int, log_backend: str = "buffered") -> Dict[str, Any]:
+    logger_mod.LOG_BACKEND = log_backend
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+    pipeline_mod.USE_LLM = True
+    threaded = bench_threadpool(turns, threads)
+    native = bench_async(turns)
+    return {
+        "turns": turns,
+        "latency_ms": latency_ms,
+        "threads": threads,
+        "log_backend": log_backend,
+        "threadpool_turns_per_s": round(turns / threaded, 1),
+        "async_turns_per_s": round(turns / native, 1),
+        "speedup": round(threaded / native, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--threads", type=int, default=40, help="FastAPI's default threadpool size")
+    parser.add_argument("--log-backend", choices=["file", "buffered", "segment"], default="buffered")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        os.environ.setdefault("LOGS_DIR", logs_dir)
+        report = run_bench(args.turns, args.latency_ms, args.threads, args.log_backend)
+        logger_mod.shutdown_logs()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
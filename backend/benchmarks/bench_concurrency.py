@@ -0,0 +1,86 @@
+"""Stress benchmark: interleaved multi-turn sessions against one shared AgentPipeline.
+
+Every session opens a card replacement request and then sends its three missing
+slots as concurrent turns. With per-session locking each session must complete
+exactly once and the missing-slot count must shrink by one per turn; lost
+updates in the clarification merge show up as repeated counts or sessions that
+never complete.
+
+    python -m benchmarks.bench_concurrency --sessions 2000 --workers 64
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from app.core.pipeline import AgentPipeline
+from app.core.types import SessionState
+
+
+SLOT_REPLIES = ["credit", "ship to 123 Main St", "it's lost"]
+
+
+def run_stress(pipe: AgentPipeline, sessions: int, workers: int) -> Dict[str, Any]:
+    sids = [f"stress-{i}" for i in range(sessions)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        openers = list(pool.map(lambda sid: pipe.process("Please replace my card", session_id=sid), sids))
+        # Adjacent jobs belong to the same session so its turns race each other
+        jobs = [(sid, reply) for sid in sids for reply in SLOT_REPLIES]
+        replies = list(pool.map(lambda job: pipe.process(job[1], session_id=job[0]), jobs))
+    elapsed = time.perf_counter() - start
+
+    by_session: Dict[str, List[Any]] = {sid: [] for sid in sids}
+    for (sid, _), resp in zip(jobs, replies):
+        by_session[sid].append(resp)
+
+    inconsistent: List[str] = []
+    for opener, (sid, responses) in zip(openers, by_session.items()):
+        completed = [r for r in responses if not r.awaiting_user]
+        pending = sorted(len(r.missing_slots) for r in responses if r.awaiting_user)
+        if (
+            len(opener.missing_slots) != 3
+            or len(completed) != 1
+            or completed[0].state != SessionState.idle
+            or pending != [1, 2]
+        ):
+            inconsistent.append(sid)
+
+    turns = sessions * (1 + len(SLOT_REPLIES))
+    return {
+        "sessions": sessions,
+        "workers": workers,
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(turns / elapsed, 1) if elapsed else None,
+        "inconsistent_sessions": len(inconsistent),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument(
+        "--switch-interval-us", type=float, default=1.0,
+        help="GIL switch interval; tiny values force more thread interleaving",
+    )
+    args = parser.parse_args()
+    sys.setswitchinterval(args.switch_interval_us / 1e6)
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        os.environ.setdefault("LOGS_DIR", logs_dir)
+        report = run_stress(AgentPipeline(), args.sessions, args.workers)
+    print(json.dumps(report, indent=2))
+    if report["inconsistent_sessions"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""LLM-mode turns on the inline engine vs the compiled LangGraph engine (PIPELINE_ENGINE).
+
+Runs offline against the fake LLM (LLM_BACKEND=fake) for a sweep of per-call
+latencies. Both engines run the same stages in the same order; the graph
+engine additionally spends several milliseconds of CPU per turn in the graph
+runtime, which shows most when the fake latency is close to zero.
+
+    python -m benchmarks.bench_graph --turns 200 --concurrency 16 --latency-ms 0,50,200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.llm.bedrock import clear_clients
+
+
+MESSAGE = "transfer 10 from 111111 to 222222"
+
+
+def _timed(fn: Any) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_async(turns: int, concurrency: int) -> Dict[str, float]:
+    pipe = AgentPipeline()
+    latencies: List[float] = []
+
+    async def run() -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                t0 = time.perf_counter()
+                await pipe.aprocess(MESSAGE)
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one() for _ in range(turns)))
+
+    elapsed = _timed(lambda: asyncio.run(run()))
+    return {"turns_per_s": round(turns / elapsed, 1), "p50_ms": round(statistics.median(latencies) * 1000, 1)}
+
+
+def bench_threads(turns: int, concurrency: int) -> Dict[str, float]:
+    pipe = AgentPipeline()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        elapsed = _timed(lambda: list(pool.map(lambda _: pipe.process(MESSAGE), range(turns))))
+    return {"turns_per_s": round(turns / elapsed, 1)}
+
+
+def run_bench(turns: int, concurrency: int, latencies_ms: List[float]) -> List[Dict[str, Any]]:
+    os.environ["LLM_BACKEND"] = "fake"
+    pipeline_mod.USE_LLM = True
+    rows = []
+    for latency_ms in latencies_ms:
+        os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+        clear_clients()
+        for engine in ("inline", "graph"):
+            pipeline_mod.PIPELINE_ENGINE = engine
+            rows.append({
+                "latency_ms": latency_ms,
+                "engine": engine,
+                "async": bench_async(turns, concurrency),
+                "threads": bench_threads(turns, concurrency),
+            })
+    pipeline_mod.PIPELINE_ENGINE = "inline"
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", default="0,50,200", help="comma-separated fake per-call latencies")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        os.environ.setdefault("LOGS_DIR", logs_dir)
+        latencies = [float(v) for v in args.latency_ms.split(",") if v]
+        report = run_bench(args.turns, args.concurrency, latencies)
+        logger_mod.shutdown_logs()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Per-turn logging cost: eager model_dump() payloads vs lazy model serialization.
+
+`eager` reproduces the previous behaviour, where every agent step dumped the
+Plan/result/review to dicts on the request path before the writer encoded
+them again. `lazy` is the current path: steps log the model objects and the
+writer serializes each one once per turn (ModelMemo). Reports model
+serializations, the bytes of dicts/strings those serializations build, and
+wall time per rule-mode turn; for the buffered backend also the bytes each
+turn leaves queued for the writer thread (tracemalloc). Finally, bytes
+written per turn at each LOG_LEVEL tier (full / summary / messages).
+
+    python -m benchmarks.bench_logging --turns 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from pydantic import BaseModel
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from app.core.logger import BufferedLogWriter, FileLogWriter, LogWriter
+from app.core.pipeline import AgentPipeline
+
+
+MESSAGE = "transfer 10 from 111111 to 222222"
+
+
+class EagerWriter(LogWriter):
+    """Dumps every model reference at append time, as the agents used to."""
+
+    def __init__(self, inner: LogWriter) -> None:
+        self.inner = inner
+        self.name = inner.name
+        self.serializations = 0
+
+    def _dump(self, value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            self.serializations += 1
+            return value.model_dump()
+        if isinstance(value, dict):
+            return {k: self._dump(v) for k, v in value.items()}
+        return value
+
+    def append(self, file_path: str, record: Dict[str, Any]) -> None:
+        self.inner.append(file_path, self._dump(record))
+
+    def flush(self) -> None:
+        self.inner.flush()
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def _deep_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_size(v) for v in value)
+    return size
+
+
+@contextmanager
+def _count_dump_bytes() -> Iterator[List[int]]:
+    """Sum the size of every object model_dump/model_dump_json builds while active."""
+    total = [0]
+    dump, dump_json = BaseModel.model_dump, BaseModel.model_dump_json
+
+    def counted_dump(self, *args, **kwargs):
+        out = dump(self, *args, **kwargs)
+        total[0] += _deep_size(out)
+        return out
+
+    def counted_dump_json(self, *args, **kwargs):
+        out = dump_json(self, *args, **kwargs)
+        total[0] += sys.getsizeof(out)
+        return out
+
+    BaseModel.model_dump, BaseModel.model_dump_json = counted_dump, counted_dump_json
+    try:
+        yield total
+    finally:
+        BaseModel.model_dump, BaseModel.model_dump_json = dump, dump_json
+
+
+def _serializations(writer: LogWriter) -> int:
+    if isinstance(writer, EagerWriter):
+        return writer.serializations
+    if isinstance(writer, FileLogWriter):
+        return writer.memo.serializations
+    return getattr(writer, "serializations", 0)
+
+
+def _build(backend: str, mode: str) -> LogWriter:
+    # Buffered writer with a huge interval so batches are flushed by the benchmark itself
+    inner = FileLogWriter() if backend == "file" else BufferedLogWriter(max_records=1_000_000, interval_ms=3_600_000)
+    return EagerWriter(inner) if mode == "eager" else inner
+
+
+def measure(backend: str, mode: str, turns: int) -> Dict[str, Any]:
+    writer = _build(backend, mode)
+    logger_mod._default_writer = writer
+    pipe = AgentPipeline()
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        pipe.process(MESSAGE, session_id="bench")
+        writer.flush()
+    elapsed = time.perf_counter() - start
+    serializations = _serializations(writer)
+
+    sample = min(turns, 500)
+    with _count_dump_bytes() as dumped:
+        for _ in range(sample):
+            pipe.process(MESSAGE, session_id="bench")
+            writer.flush()
+    dump_bytes = round(dumped[0] / sample)
+
+    queued_bytes = None
+    if backend == "buffered":
+        # Memory the request path hands to the background writer, per turn
+        sample = min(turns, 500)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        for _ in range(sample):
+            pipe.process(MESSAGE, session_id="bench")
+        queued_bytes = round((tracemalloc.get_traced_memory()[0] - base) / sample)
+        tracemalloc.stop()
+        writer.flush()
+
+    writer.close()
+    logger_mod._default_writer = None
+    result = {
+        "model_serializations_per_turn": round(serializations / turns, 2),
+        "serialized_bytes_per_turn": dump_bytes,
+        "us_per_turn": round(elapsed / turns * 1e6, 1),
+    }
+    if queued_bytes is not None:
+        result["queued_bytes_per_turn"] = queued_bytes
+    return result
+
+
+def bytes_per_turn(level: str, turns: int, logs_dir: str) -> float:
+    """Bytes written per completed turn at a LOG_LEVEL tier."""
+    logger_mod.LOG_LEVEL = level
+    logger_mod._default_writer = FileLogWriter()
+    pipe = AgentPipeline()
+    sid = f"tier-{level}"
+    for _ in range(turns):
+        pipe.process(MESSAGE, session_id=sid)
+    logger_mod._default_writer = None
+    logger_mod.LOG_LEVEL = "full"
+    return round(os.path.getsize(os.path.join(logs_dir, f"session_{sid}.jsonl")) / turns, 1)
+
+
+def run_tiers(turns: int, logs_dir: str) -> Dict[str, Any]:
+    pipeline_mod.USE_LLM = False
+    sizes = {level: bytes_per_turn(level, turns, logs_dir) for level in ("full", "summary", "messages")}
+    return {
+        "bytes_per_turn": sizes,
+        "reduction_vs_full": {level: round(sizes["full"] / size, 1) for level, size in sizes.items()},
+    }
+
+
+def run_bench(turns: int) -> Dict[str, Any]:
+    pipeline_mod.USE_LLM = False
+    report: Dict[str, Any] = {"turns": turns}
+    for backend in ("file", "buffered"):
+        eager = measure(backend, "eager", turns)
+        lazy = measure(backend, "lazy", turns)
+        report[backend] = {
+            "eager": eager,
+            "lazy": lazy,
+            "serialized_bytes_reduction": round(1 - lazy["serialized_bytes_per_turn"] / eager["serialized_bytes_per_turn"], 3),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as logs_dir:
+        os.environ["LOGS_DIR"] = logs_dir
+        report = run_bench(args.turns)
+        report["tiers"] = run_tiers(min(args.turns, 500), logs_dir)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
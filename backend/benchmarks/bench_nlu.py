@@ -0,0 +1,47 @@
+"""Microbenchmark: messages/sec for the original vs precompiled NLU.
+
+    python -m benchmarks.bench_nlu --messages 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from app.core import nlu
+from benchmarks import legacy_nlu
+from benchmarks.nlu_corpus import generate_corpus
+
+
+def _throughput(detect: Callable, extract: Callable, corpus: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            extract(detect(text), text)
+    elapsed = time.perf_counter() - start
+    return len(corpus) * repeat / elapsed
+
+
+def run_bench(messages: int, repeat: int = 3) -> Dict[str, Any]:
+    corpus = generate_corpus(messages)
+    before = _throughput(legacy_nlu.detect_intent, legacy_nlu.extract_slots, corpus, repeat)
+    after = _throughput(nlu.detect_intent, nlu.extract_slots, corpus, repeat)
+    return {
+        "messages": messages * repeat,
+        "legacy_msgs_per_s": round(before),
+        "compiled_msgs_per_s": round(after),
+        "speedup": round(after / before, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run_bench(args.messages, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic banking messages for NLU differential tests and microbenchmarks."""
+from __future__ import annotations
+
+import random
+from typing import List
+
+
+FRAGMENTS = [
+    # intent triggers
+    "I lost my credit card", "my debit card was stolen", "card is damaged", "please replace my card",
+    "replace the debit", "I lost my wallet", "stolen", "there is a fraud on my account",
+    "unauthorized charge", "unauthorised payment", "I want to dispute a transaction",
+    "open a savings account", "create an account", "I'd like to open account",
+    "check my balance", "funds available?", "how much do I have", "what's my balance",
+    "transfer 10 from 111111 to 222222", "send $25 to 333333", "pay 99.50", "transfer money",
+    "send amount 40", "pay to 123456", "sendamaged card", "repay my loan", "opened", "balances",
+    # slot fragments
+    "card type: debit", "type of card credit", "credit", "debit", "Credit", "DEBIT card",
+    "address is 12 Oak Ave", "ship to 456 Elm St", "ship to  ", "address is 9 Pine Rd. thanks",
+    "transaction id: TX-123456", "transaction AB12CD34", "via upi", "netbanking", "ach", "wire",
+    "yes", "confirm", "please proceed", "name is Jane Doe", "name is Al", "id proof: P-1234",
+    "ID: ABCD", "account number 12345678", "account no. 987654", "token ABCD", "otp: 1234",
+    "auth X9-99", "from: 111111", "to:222222", "amount $12.34", "amount 7",
+    # noise
+    "hello", "thanks", "ok", "hmm", "", "CANCEL", "new request", "12345", "$", "to", "from",
+]
+JOINERS = [" ", ", ", ". ", "\n", " and "]
+
+
+def generate_corpus(n: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    corpus: List[str] = []
+    for _ in range(n):
+        parts = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 4))]
+        text = parts[0]
+        for part in parts[1:]:
+            text += rng.choice(JOINERS) + part
+        roll = rng.random()
+        if roll < 0.1:
+            text = text.upper()
+        elif roll < 0.2:
+            text = text.title()
+        corpus.append(text)
+    return corpus
@@ -0,0 +1,292 @@
+"""Repeatable benchmark suite with JSON results and baseline comparison.
+
+Layers: the regex NLU and the n-gram intent classifier, `AgentPipeline` in-process (single-turn and multi-turn
+clarification flows, rule mode and optionally LLM mode against the fake LLM),
+and the FastAPI app through an in-process ASGI client at a given concurrency.
+
+    python -m benchmarks.suite --out results.json
+    python -m benchmarks.suite --out baseline.json          # record a baseline on the benchmark host
+    python -m benchmarks.suite --baseline baseline.json     # exit 1 on regression
+    python -m benchmarks.suite --scenarios api_chat --concurrency 64 --llm-latency-ms 50
+    python -m benchmarks.suite --scenarios pipeline_llm_async --record-cassette bedrock.jsonl.gz   # needs AWS
+    python -m benchmarks.suite --scenarios pipeline_llm_async --llm-cassette bedrock.jsonl.gz      # offline
+
+Metrics ending in `_per_s` are higher-is-better, metrics ending in `_ms`
+lower-is-better. Each scenario runs `--repeat` times and keeps the best value
+per metric; a regression is a change beyond `--tolerance` (default 50%, as
+sub-millisecond rule-mode latencies are noisy on shared machines). Baselines
+are host-specific, so record and compare them on the same machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from app.core.intent_classifier import IntentClassifier
+from app.core.nlu import detect_intent, extract_slots
+from app.core.pipeline import AgentPipeline
+from app.llm.cassette import save_cassettes
+from benchmarks.nlu_corpus import generate_corpus
+
+
+SINGLE_TURN = "transfer 10 from 111111 to 222222"
+CLARIFICATION_FLOW = ["Please replace my card", "credit", "ship to 123 Main St", "it's lost"]
+
+Metrics = Dict[str, float]
+
+
+def _summary(latencies_s: List[float], elapsed_s: float, units: int) -> Metrics:
+    ordered = sorted(latencies_s)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 4)
+
+    return {
+        "throughput_per_s": round(units / elapsed_s, 1),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def _timed_loop(fn: Callable[[int], Any], n: int) -> Metrics:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    return _summary(latencies, time.perf_counter() - start, n)
+
+
+def bench_nlu(n: int) -> Metrics:
+    corpus = generate_corpus(n)
+    return _timed_loop(lambda i: extract_slots(detect_intent(corpus[i]), corpus[i]), n)
+
+
+def bench_intent_classifier(n: int, batch: int = 64) -> Metrics:
+    # One unit = scoring a batch of messages; trained on the regex labels of the same corpus
+    corpus = generate_corpus(max(n * batch, 500))
+    labelled = [(text, intent.value) for text in corpus if (intent := detect_intent(text)) is not None]
+    classifier = IntentClassifier.train([t for t, _ in labelled], [i for _, i in labelled])
+    return _timed_loop(lambda i: classifier.predict_batch(corpus[i * batch:(i + 1) * batch]), n)
+
+
+def bench_pipeline_single(n: int) -> Metrics:
+    pipe = AgentPipeline()
+    return _timed_loop(lambda i: pipe.process(SINGLE_TURN), n)
+
+
+def bench_pipeline_clarification(n: int) -> Metrics:
+    # One unit = a whole four-turn clarification flow in a fresh session
+    pipe = AgentPipeline()
+
+    def flow(i: int) -> None:
+        sid = f"bench-flow-{i}"
+        for message in CLARIFICATION_FLOW:
+            pipe.process(message, session_id=sid)
+
+    return _timed_loop(flow, n)
+
+
+def bench_pipeline_llm_async(n: int, concurrency: int, engine: str = "inline") -> Metrics:
+    pipeline_mod.PIPELINE_ENGINE = engine
+    try:
+        pipe = AgentPipeline()
+        return asyncio.run(_concurrent(lambda i: pipe.aprocess(SINGLE_TURN), n, concurrency))
+    finally:
+        pipeline_mod.PIPELINE_ENGINE = "inline"
+
+
+def bench_api_chat(n: int, concurrency: int) -> Metrics:
+    import httpx
+
+    from app.main import app
+
+    async def run() -> Metrics:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def request(i: int) -> None:
+                r = await client.post("/chat", json={"message": SINGLE_TURN, "session_id": f"bench-api-{i}"})
+                r.raise_for_status()
+
+            return await _concurrent(request, n, concurrency)
+
+    return asyncio.run(run())
+
+
+async def _concurrent(make: Callable[[int], Any], n: int, concurrency: int) -> Metrics:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            await make(i)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return _summary(latencies, time.perf_counter() - start, n)
+
+
+def _set_llm(enabled: bool, latency_ms: float) -> None:
+    from app.llm.bedrock import clear_clients
+
+    pipeline_mod.USE_LLM = enabled
+    # Replay a cassette if one is given, real Bedrock while recording one, the fake LLM otherwise
+    if os.getenv("LLM_CASSETTE"):
+        os.environ["LLM_BACKEND"] = "cassette"
+    elif os.getenv("LLM_CASSETTE_RECORD"):
+        os.environ["LLM_BACKEND"] = "bedrock"
+    else:
+        os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+    clear_clients()
+
+
+SCENARIOS = ["nlu", "intent_classifier", "pipeline_single", "pipeline_clarification", "pipeline_llm_async", "pipeline_llm_graph", "api_chat"]
+
+
+def _best(runs: List[Metrics]) -> Metrics:
+    # Best-of-N damps scheduler noise, which otherwise dominates tail latencies
+    return {
+        key: max(r[key] for r in runs) if key.endswith("_per_s") else min(r[key] for r in runs)
+        for key in runs[0]
+    }
+
+
+def run_suite(
+    scenarios: List[str],
+    iterations: int,
+    concurrency: int,
+    llm_latency_ms: float,
+    api_llm: bool = False,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    results: Dict[str, Metrics] = {}
+    for name in scenarios:
+        results[name] = _best([_run_scenario(name, iterations, concurrency, llm_latency_ms, api_llm) for _ in range(repeat)])
+    _set_llm(False, 0)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "llm_latency_ms": llm_latency_ms,
+            "api_llm": api_llm,
+            "repeat": repeat,
+            "log_backend": logger_mod.LOG_BACKEND,
+            "llm_cassette": os.getenv("LLM_CASSETTE", ""),
+        },
+        "results": results,
+    }
+
+
+def _run_scenario(name: str, iterations: int, concurrency: int, llm_latency_ms: float, api_llm: bool) -> Metrics:
+    _set_llm(False, llm_latency_ms)
+    if name == "nlu":
+        return bench_nlu(iterations * 50)
+    if name == "intent_classifier":
+        return bench_intent_classifier(iterations)
+    if name == "pipeline_single":
+        return bench_pipeline_single(iterations)
+    if name == "pipeline_clarification":
+        return bench_pipeline_clarification(max(1, iterations // 4))
+    if name == "pipeline_llm_async":
+        _set_llm(True, llm_latency_ms)
+        return bench_pipeline_llm_async(iterations, concurrency)
+    if name == "pipeline_llm_graph":
+        _set_llm(True, llm_latency_ms)
+        return bench_pipeline_llm_async(iterations, concurrency, engine="graph")
+    if name == "api_chat":
+        _set_llm(api_llm, llm_latency_ms)
+        return bench_api_chat(iterations, concurrency)
+    raise ValueError(f"unknown scenario: {name}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions of `current` against `baseline` beyond `tolerance` (fraction)."""
+    regressions = []
+    for scenario, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base:
+            continue
+        for key, value in metrics.items():
+            ref = base.get(key)
+            if not ref:
+                continue
+            if key.endswith("_per_s"):
+                change = (ref - value) / ref
+            elif key.endswith("_ms"):
+                change = (value - ref) / ref
+            else:
+                continue
+            if change > tolerance:
+                regressions.append(f"{scenario}.{key}: {ref} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0, help="fake Bedrock latency per call")
+    parser.add_argument("--api-llm", action="store_true", help="run api_chat in LLM mode against the fake Bedrock")
+    parser.add_argument("--llm-cassette", help="answer LLM calls from this recorded cassette instead of the fake Bedrock")
+    parser.add_argument("--cassette-latency", type=float, default=1.0, help="share of the recorded latency to replay")
+    parser.add_argument("--record-cassette", help="run LLM scenarios against real Bedrock and record them here")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; the best run is reported")
+    parser.add_argument("--log-backend", choices=["file", "buffered", "segment"], default="buffered")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    logger_mod.LOG_BACKEND = args.log_backend
+    # Rebuilt from LOG_BACKEND on first use
+    logger_mod.shutdown_logs()
+    if args.llm_cassette:
+        os.environ["LLM_CASSETTE"] = args.llm_cassette
+        os.environ["LLM_CASSETTE_LATENCY"] = str(args.cassette_latency)
+    elif args.record_cassette:
+        os.environ["LLM_CASSETTE_RECORD"] = args.record_cassette
+    with tempfile.TemporaryDirectory() as logs_dir:
+        os.environ["LOGS_DIR"] = logs_dir
+        report = run_suite(
+            [s.strip() for s in args.scenarios.split(",") if s.strip()],
+            args.iterations,
+            args.concurrency,
+            args.llm_latency_ms,
+            args.api_llm,
+            args.repeat,
+        )
+        logger_mod.shutdown_logs()
+        save_cassettes()
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
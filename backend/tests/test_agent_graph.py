@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.core.types import ExecutionResult, IntentName, Plan
+from app.graph.agent_graph import get_turn_graph
+
+class Review:
+    def __init__(self, approved, score):
+        self.approved = approved
+        self.score = score
+
+
+class Agents:
+    """Scriptable LLM agents; records the call order."""
+
+    def __init__(self, intent="check_balance", missing=(), plan_ok=True, exec_ok=True, review_ok=True):
+        self.intent, self.missing = intent, list(missing)
+        self.plan_ok, self.exec_ok, self.review_ok = plan_ok, exec_ok, review_ok
+        self.calls = []
+
+    def _plan(self, msg):
+        self.calls.append("planner")
+        slots = {"account_number": "123456", "auth_token": None if self.missing else "tok"}
+        return Plan(intent=self.intent, slots=slots, missing_slots=self.missing, rationale="")
+
+    def sync(self):
+        agents = self
+
+        class Planner:
+            def run(self, msg):
+                return agents._plan(msg)
+
+        class Reviewer:
+            def review_plan(self, plan):
+                agents.calls.append("plan_review")
+                return Review(agents.plan_ok, 9.0)
+
+            def review_execution(self, plan, result):
+                agents.calls.append("execution_review")
+                return Review(agents.review_ok, 8.0)
+
+        def execute(plan):
+            agents.calls.append("execute")
+            return ExecutionResult(success=agents.exec_ok, data={"balance": 10})
+
+        def respond(result):
+            agents.calls.append("respond")
+            return "Your balance is 10."
+
+        return Planner(), Reviewer(), execute, respond, lambda user, reason: f"FB: {reason}"
+
+    def async_(self):
+        agents = self
+
+        class Planner:
+            async def arun(self, msg):
+                return agents._plan(msg)
+
+        class Reviewer:
+            async def areview_plan(self, plan):
+                agents.calls.append("plan_review")
+                return Review(agents.plan_ok, 9.0)
+
+            async def areview_execution(self, plan, result):
+                agents.calls.append("execution_review")
+                return Review(agents.review_ok, 8.0)
+
+        async def execute(plan):
+            agents.calls.append("execute")
+            return ExecutionResult(success=agents.exec_ok, data={"balance": 10})
+
+        async def respond(result):
+            agents.calls.append("respond")
+            return "Your balance is 10."
+
+        async def fallback(user, reason):
+            return f"FB: {reason}"
+
+        return Planner(), Reviewer(), execute, respond, fallback
+
+
+@pytest.fixture
+def llm_mode(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+
+
+def _pipeline(monkeypatch, agents):
+    pipe = AgentPipeline()
+    monkeypatch.setattr(pipe, "_get_agents", lambda logger: agents.sync())
+    monkeypatch.setattr(pipe, "_get_async_agents", lambda logger: agents.async_())
+    return pipe
+
+
+def _run(pipe, engine, monkeypatch, mode, sid):
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    message = "what's my balance"
+    if mode == "sync":
+        return pipe.process(message, session_id=sid)
+    return asyncio.run(pipe.aprocess(message, session_id=sid))
+
+
+SCENARIOS = {
+    "completed": {},
+    "clarification": {"missing": ["auth_token"]},
+    "no_intent": {"intent": None},
+    "plan_rejected": {"plan_ok": False},
+    "execution_failed": {"exec_ok": False},
+    "execution_rejected": {"review_ok": False},
+}
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_graph_engine_matches_inline_engine(llm_mode, monkeypatch, scenario, mode):
+    responses = {}
+    for engine in ("inline", "graph"):
+        agents = Agents(**SCENARIOS[scenario])
+        pipe = _pipeline(monkeypatch, agents)
+        response = _run(pipe, engine, monkeypatch, mode, sid=f"{engine}-{scenario}")
+        responses[engine] = response.model_dump(exclude={"session_id"})
+    assert responses["graph"] == responses["inline"]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_responder_only_runs_for_approved_executions(llm_mode, monkeypatch, mode):
+    agents = Agents(review_ok=False)
+    pipe = _pipeline(monkeypatch, agents)
+    response = _run(pipe, "graph", monkeypatch, mode, sid="rejected")
+    assert agents.calls == ["planner", "plan_review", "execute", "execution_review"]
+    assert response.messages[-1].content.startswith("FB: Execution review failed")
+
+
+def test_speculative_branches_run_in_one_step(llm_mode, monkeypatch):
+    monkeypatch.setattr(pipeline_mod, "SPECULATIVE_EXECUTION", True)
+    monkeypatch.setattr(pipeline_mod, "SPECULATIVE_EXCLUDED_INTENTS", {"transfer_money"})
+    agents = Agents(plan_ok=False)
+    pipe = _pipeline(monkeypatch, agents)
+    response = _run(pipe, "graph", monkeypatch, "async", sid="speculative")
+    assert agents.calls[:1] == ["planner"] and set(agents.calls[1:]) == {"plan_review", "execute"}
+    assert response.messages[-1].content.startswith("FB: Plan review failed")
+
+
+def test_streaming_events_match_inline_engine(llm_mode, monkeypatch):
+    async def collect(pipe, sid):
+        return [event["event"] async for event in pipe.astream("what's my balance", session_id=sid)]
+
+    events = {}
+    for engine in ("inline", "graph"):
+        monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+        pipe = _pipeline(monkeypatch, Agents())
+        events[engine] = asyncio.run(collect(pipe, f"stream-{engine}"))
+    assert events["graph"] == events["inline"]
+    assert events["graph"][:4] == ["plan", "plan_review", "execution", "execution_review"]
+
+
+def test_graph_is_compiled_once_and_keeps_session_state(llm_mode, monkeypatch):
+    assert get_turn_graph() is get_turn_graph()
+    agents = Agents(missing=["auth_token"])
+    pipe = _pipeline(monkeypatch, agents)
+    first = _run(pipe, "graph", monkeypatch, "sync", sid="multi")
+    assert first.awaiting_user and first.intent == IntentName.check_balance
+    agents.missing = []
+    second = _run(pipe, "graph", monkeypatch, "async", sid="multi")
+    assert second.state.value == "idle" and second.plan_review_score == 9.0
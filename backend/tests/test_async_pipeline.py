@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+from app.core.logger import FileLogWriter, set_log_writer
+from app.core.pipeline import AgentPipeline
+from app.core.state_backend import MemoryStateBackend
+from app.llm.bedrock import clear_clients
+from app.llm.fake import FakeChatModel
+
+
+def test_aprocess_rule_mode_matches_process(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    pipe = AgentPipeline()
+
+    async def flow():
+        r1 = await pipe.aprocess("Please replace my card")
+        r2 = await pipe.aprocess("credit, ship to 123 Main St, it's lost", session_id=r1.session_id)
+        return r1, r2
+
+    r1, r2 = asyncio.run(flow())
+    assert r1.awaiting_user is True and len(r1.missing_slots) == 3
+    assert r2.awaiting_user is False
+    assert r2.intent == r1.intent
+
+
+def test_rule_turns_run_off_the_event_loop(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    pipe = AgentPipeline()
+    turn_threads = []
+    process_turn = pipe._process_turn
+
+    def recording_turn(*args):
+        turn_threads.append(threading.get_ident())
+        return process_turn(*args)
+
+    monkeypatch.setattr(pipe, "_process_turn", recording_turn)
+    # Hybrid routing in LLM mode sends a complete request to the rule agents
+    monkeypatch.setattr(pipeline_mod, "LLM_ROUTING", "hybrid")
+
+    async def flow():
+        loop_thread = threading.get_ident()
+        for use_llm in (False, True):
+            monkeypatch.setattr(pipeline_mod, "USE_LLM", use_llm)
+            await pipe.aprocess("check balance for account 123456 token ABCD")
+        return loop_thread
+
+    loop_thread = asyncio.run(flow())
+    assert len(turn_threads) == 2 and loop_thread not in turn_threads
+
+
+def test_aprocess_llm_mode_uses_async_agents(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(executioner_llm.random, "random", lambda: 0.0)  # tool always available
+    pipe = AgentPipeline()
+
+    async def concurrent_turns():
+        return await asyncio.gather(
+            *(pipe.aprocess("transfer 10 from 111111 to 222222") for _ in range(20))
+        )
+
+    responses = asyncio.run(concurrent_turns())
+    assert len({r.session_id for r in responses}) == 20
+    for r in responses:
+        assert r.awaiting_user is False
+        assert r.plan_review_score == 7.0 and r.execution_review_score == 7.0
+        assert r.messages[-1].content == "All set!"
+
+
+def test_fake_chat_model_latency_is_awaited_concurrently():
+    model = FakeChatModel(latency_ms=50)
+
+    async def burst():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(model.ainvoke([{"role": "user", "content": "hi"}]) for _ in range(10)))
+        return loop.time() - start
+
+    assert asyncio.run(burst()) < 0.4
+    assert model.calls == 10
+
+
+@pytest.mark.parametrize("engine", ["inline", "graph"])
+def test_llm_and_streamed_turns_do_state_and_log_io_off_the_event_loop(monkeypatch, tmp_path, engine):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    monkeypatch.setattr(executioner_llm.random, "random", lambda: 0.0)  # tool always available
+    clear_clients()
+    io_threads = []
+
+    class RecordingBackend(MemoryStateBackend):
+        def load(self, session_id):
+            io_threads.append(("load", threading.get_ident()))
+            return super().load(session_id)
+
+        def save(self, session_id, data, expected_version):
+            io_threads.append(("save", threading.get_ident()))
+            return super().save(session_id, data, expected_version)
+
+    class RecordingWriter(FileLogWriter):
+        def append(self, path, record):
+            io_threads.append(("log", threading.get_ident()))
+            super().append(path, record)
+
+    set_log_writer(RecordingWriter())
+    pipe = AgentPipeline(state_backend=RecordingBackend())
+
+    async def flow():
+        await pipe.aprocess("transfer 10 from 111111 to 222222")
+        [e async for e in pipe.astream("transfer 10 from 111111 to 222222")]
+        return threading.get_ident()
+
+    try:
+        loop_thread = asyncio.run(flow())
+    finally:
+        set_log_writer(None)
+        clear_clients()
+    # A processed and a streamed turn, each with a load, an execution claim, a final save and some log records
+    assert {kind for kind, _ in io_threads} == {"load", "save", "log"}
+    assert sum(kind == "load" for kind, _ in io_threads) == 2
+    assert loop_thread not in {thread for _, thread in io_threads}
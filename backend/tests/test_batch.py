@@ -0,0 +1,95 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.main import app
+
+
+def _items():
+    items = []
+    for i in range(20):
+        sid = f"batch-{i}"
+        items += [
+            (sid, "Please replace my card"),
+            (sid, "credit"),
+            (sid, "ship to 123 Main St"),
+            (sid, "it's lost"),
+        ]
+    return items
+
+
+def test_process_many_keeps_input_and_session_order(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    pipe = AgentPipeline()
+
+    items = _items()
+    results = pipe.process_many(items)
+    assert [r.session_id for r in results] == [sid for sid, _ in items]
+    for i in range(0, len(results), 4):
+        chain = results[i:i + 4]
+        assert [len(r.missing_slots) for r in chain] == [3, 2, 1, 0]
+        assert chain[-1].awaiting_user is False
+
+
+def test_process_many_without_session_ids_starts_new_sessions(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    results = AgentPipeline().process_many([(None, "check my balance")] * 5)
+    assert len({r.session_id for r in results}) == 5
+
+
+def test_chat_batch_endpoint_json_and_ndjson(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    client = TestClient(app)
+    body = {"items": [{"session_id": "b1", "message": "Please replace my card"}, {"session_id": "b1", "message": "credit"}]}
+
+    r = client.post("/chat/batch", json=body)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [len(x["missing_slots"]) for x in results] == [3, 2]
+
+    r = client.post("/chat/batch", json={**body, "items": [{"message": "hello"}] * 3, "stream": True})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert all("session_id" in line["response"] for line in lines)
+
+
+def test_failed_turns_are_reported_per_item(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    pipe = AgentPipeline()
+    process = pipe.process
+
+    def flaky(message, session_id=None):
+        if message == "boom":
+            raise RuntimeError("planner crashed")
+        return process(message, session_id=session_id)
+
+    monkeypatch.setattr(pipe, "process", flaky)
+    results = pipe.process_many([("a", "check my balance"), ("b", "boom"), ("b", "credit"), ("a", "Please replace my card")])
+    assert results[0].session_id == "a" and results[3].session_id == "a"
+    assert isinstance(results[1], RuntimeError)
+    # Later turns of a failed session are not run on top of its unknown state
+    assert isinstance(results[2], pipeline_mod.BatchTurnSkipped)
+
+    monkeypatch.setattr("app.main.pipeline", pipe)
+    client = TestClient(app)
+    body = {"items": [{"session_id": "c", "message": "boom"}, {"session_id": "d", "message": "hello"}]}
+    r = client.post("/chat/batch", json=body)
+    assert r.status_code == 200
+    assert r.json()["results"][0] is None and r.json()["results"][1]["session_id"] == "d"
+    assert r.json()["errors"] == [{"index": 0, "error": "RuntimeError", "detail": "planner crashed"}]
+
+    lines = [json.loads(line) for line in client.post("/chat/batch", json={**body, "stream": True}).text.splitlines()]
+    assert lines[0] == {"index": 0, "error": "RuntimeError", "detail": "planner crashed"} and "response" in lines[1]
+
+
+def test_batch_size_is_capped(monkeypatch):
+    import app.core.types as types_mod
+
+    body = {"items": [{"message": "hello"}] * (types_mod.BATCH_MAX_ITEMS + 1)}
+    assert TestClient(app).post("/chat/batch", json=body).status_code == 422
@@ -0,0 +1,41 @@
+from app.agents_llm.planner_llm import LLMPlanner
+from app.agents_llm.reviewer_llm import LLMReviewer
+from app.llm.bedrock import clear_clients, get_bedrock_client
+from app.llm.fake import FakeChatModel
+
+
+def test_clients_are_shared_per_model_region_and_params(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "bedrock")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    clear_clients()
+    a = get_bedrock_client()
+    assert get_bedrock_client() is a
+    assert get_bedrock_client(region="us-east-1") is a
+    assert get_bedrock_client(temperature=0.9) is not a
+    assert get_bedrock_client(region="eu-west-1") is not a
+    monkeypatch.setenv("BEDROCK_MAX_TOKENS", "256")
+    assert get_bedrock_client() is not a
+    clear_clients()
+
+
+def test_agents_reuse_the_registry_client(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    clear_clients()
+    planner = LLMPlanner(logger=None)
+    reviewer = LLMReviewer(logger=None)
+    assert isinstance(planner.llm, FakeChatModel)
+    assert planner.llm is reviewer.llm is get_bedrock_client()
+    clear_clients()
+
+
+def test_fake_clients_are_keyed_by_injected_latency(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "50")
+    clear_clients()
+    slow = get_bedrock_client()
+    assert slow.latency_s == 0.05
+    # Inference params don't apply to the fake, so they share its client
+    assert get_bedrock_client(temperature=0.9) is slow
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    assert get_bedrock_client().latency_s == 0
+    clear_clients()
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from benchmarks import suite
+
+
+@pytest.fixture(autouse=True)
+def _restore_globals(monkeypatch, tmp_path):
+    # The suite flips LLM mode, the fake backend and the log backend process-wide
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", pipeline_mod.USE_LLM)
+    monkeypatch.setattr(logger_mod, "LOG_BACKEND", logger_mod.LOG_BACKEND)
+    yield
+    logger_mod.shutdown_logs()
+
+
+def test_suite_runs_every_layer_and_reports_metrics():
+    report = suite.run_suite(suite.SCENARIOS, iterations=8, concurrency=4, llm_latency_ms=0)
+    assert set(report["results"]) == set(suite.SCENARIOS)
+    for metrics in report["results"].values():
+        assert metrics["throughput_per_s"] > 0
+        assert 0 <= metrics["p50_ms"] <= metrics["p99_ms"]
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"results": {"api_chat": {"throughput_per_s": 100.0, "p50_ms": 10.0, "p99_ms": 20.0}}}
+    current = {"results": {"api_chat": {"throughput_per_s": 70.0, "p50_ms": 11.0, "p99_ms": 30.0}}}
+    regressions = suite.compare(current, baseline, tolerance=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("api_chat.throughput_per_s")
+    assert regressions[1].startswith("api_chat.p99_ms")
+    assert suite.compare(baseline, current, tolerance=0.2) == []
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path):
+    out = tmp_path / "results.json"
+    args = ["--scenarios", "nlu", "--iterations", "5", "--repeat", "1", "--out", str(out)]
+    assert suite.main(args) == 0
+    assert "nlu" in json.loads(out.read_text())["results"]
+    impossible = tmp_path / "baseline.json"
+    impossible.write_text('{"results": {"nlu": {"throughput_per_s": 1e12}}}')
+    assert suite.main(args + ["--baseline", str(impossible)]) == 1
+
+
+def test_main_runs_on_the_segment_log_backend(tmp_path):
+    out = tmp_path / "results.json"
+    args = ["--scenarios", "pipeline_single", "--iterations", "5", "--repeat", "1", "--log-backend", "segment", "--out", str(out)]
+    assert suite.main(args) == 0
+    report = json.loads(out.read_text())
+    assert report["meta"]["log_backend"] == "segment" and report["results"]["pipeline_single"]["throughput_per_s"] > 0
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.concurrency import LockStripes, acquire_async
+from app.core.pipeline import USE_LLM, AgentPipeline
+from benchmarks.bench_concurrency import run_stress
+
+
+@pytest.mark.skipif(USE_LLM, reason="Stress flow targets rule-based mode")
+def test_interleaved_turns_keep_session_state_consistent(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    report = run_stress(AgentPipeline(), sessions=100, workers=32)
+    assert report["turns"] == 400
+    assert report["inconsistent_sessions"] == 0
+
+
+def test_async_turns_of_one_session_queue_without_overlap():
+    stripes = LockStripes(stripes=4)
+    inside, peak = 0, 0
+
+    async def turn():
+        nonlocal inside, peak
+        async with stripes.alock_for("s1"):
+            inside += 1
+            peak = max(peak, inside)
+            await asyncio.sleep(0.001)
+            inside -= 1
+
+    async def main():
+        await asyncio.gather(*(turn() for _ in range(20)))
+
+    asyncio.run(main())
+    assert peak == 1 and not stripes.lock_for("s1").locked()
+
+
+def test_acquire_async_waits_for_thread_holders_and_survives_cancellation():
+    lock = threading.Lock()
+    lock.acquire()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(acquire_async(lock), 0.02)
+        # The abandoned waiter takes the lock once it is free and hands it straight back
+        lock.release()
+        await asyncio.wait_for(acquire_async(lock), 5)
+
+    asyncio.run(main())
+    assert lock.locked()
+    lock.release()
@@ -0,0 +1,160 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import app.core.intent_classifier as classifier_mod
+import app.core.pipeline as pipeline_mod
+from app.core.intent_classifier import IntentClassifier, labelled_messages, train_from_logs
+from app.core.logger import flush_logs
+from app.core.nlu import detect_intent
+from app.core.pipeline import AgentPipeline
+from app.core.routing import HybridRouter
+from app.core.types import IntentName
+from app.llm.bedrock import clear_clients
+
+TRAINING = {
+    "card_replace": ["I lost my credit card", "my debit card was stolen", "replace my card", "my card got lost yesterday",
+                     "need a new card my card is broken", "my card was stolen at the mall"],
+    "report_fraud": ["there is a fraud on my account", "unauthorized charge on my statement", "I want to dispute a transaction",
+                     "suspicious transaction on my card", "someone used my account without permission"],
+    "open_account": ["open a savings account", "create an account", "can I open a new checking account",
+                     "I'd like to open an account", "open account please"],
+    "check_balance": ["check my balance", "what's my balance", "how much do I have", "show my account balance",
+                      "tell me my current balance"],
+    "transfer_money": ["transfer 10 from 111111 to 222222", "send $25 to 333333", "pay 99.50 to 123456",
+                       "transfer money to my friend", "send money to my mom"],
+}
+# Regex misses that the classifier should catch, and messages it must leave alone
+PARAPHRASES = {
+    "I misplaced my card": IntentName.card_replace,
+    "someone charged me without permission": IntentName.report_fraud,
+    "set up a new checking account": IntentName.open_account,
+}
+OUT_OF_SCOPE = ["hello there", "thanks", "ship to 123 Main St", "credit", "what are your opening hours"]
+
+
+def _train(pairs):
+    return IntentClassifier.train([m for m, _ in pairs], [i for _, i in pairs])
+
+
+@pytest.fixture
+def classifier():
+    return _train([(m, intent) for intent, messages in TRAINING.items() for m in messages])
+
+
+@pytest.fixture
+def loaded(monkeypatch, classifier):
+    monkeypatch.setattr(classifier_mod, "_classifier", classifier)
+    monkeypatch.setattr(classifier_mod, "_classifier_loaded", True)
+    return classifier
+
+
+def test_paraphrases_are_classified_and_out_of_scope_messages_are_not(classifier):
+    assert all(detect_intent(m) is None for m in [*PARAPHRASES, *OUT_OF_SCOPE])
+    intents, confidence = classifier.predict_batch([*PARAPHRASES, *OUT_OF_SCOPE])
+    assert intents == [*PARAPHRASES.values()] + [None] * len(OUT_OF_SCOPE)
+    assert confidence.shape == (len(PARAPHRASES) + len(OUT_OF_SCOPE),)
+    assert classifier.stats()["accepted"] == len(PARAPHRASES)
+
+
+def test_batch_scores_match_one_at_a_time(classifier):
+    texts = ["I misplaced my card", "", "x", "send money to my mom"]
+    batch = classifier.scores(texts)
+    single = np.vstack([classifier.scores([t]) for t in texts])
+    assert np.allclose(batch, single, atol=1e-6)
+
+
+def test_artifact_round_trip(classifier, tmp_path):
+    path = str(tmp_path / "intent_classifier.npz")
+    classifier.save(path)
+    loaded = IntentClassifier.load(path)
+    assert loaded.labels == classifier.labels and loaded.ngrams == classifier.ngrams
+    texts = [*PARAPHRASES, *OUT_OF_SCOPE]
+    assert np.array_equal(loaded.scores(texts), classifier.scores(texts))
+
+
+def test_training_pairs_come_from_new_requests_in_logs(monkeypatch, tmp_path, loaded):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    pipe = AgentPipeline()
+    sid = pipe.process("replace my card").session_id
+    pipe.process("credit", session_id=sid)
+    pipe.process("transfer 10 from 111111 to 222222")
+    # Labelled by the classifier itself: never fed back into training
+    pipe.process("I misplaced my card")
+    flush_logs()
+
+    assert sorted(labelled_messages(str(tmp_path))) == [
+        ("replace my card", "card_replace"),
+        ("transfer 10 from 111111 to 222222", "transfer_money"),
+    ]
+    assert set(train_from_logs(str(tmp_path)).labels) == {IntentName.card_replace, IntentName.transfer_money}
+
+
+def test_pipeline_uses_the_classifier_only_when_regex_finds_nothing(monkeypatch, tmp_path, loaded):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    pipe = AgentPipeline()
+    r = pipe.process("I misplaced my card")
+    assert r.intent == IntentName.card_replace and r.awaiting_user
+    # Clarification replies stay with the pending plan
+    r = pipe.process("ship to 123 Main St", session_id=r.session_id)
+    assert r.intent == IntentName.card_replace and "delivery_address" not in r.missing_slots
+    assert pipe.process("hello there").intent is None
+
+
+def test_hybrid_router_keeps_confident_classifier_turns_off_the_llm(monkeypatch, loaded):
+    router = HybridRouter(threshold=0.5)
+    assert router.route("I misplaced my card") == "rule"
+    assert router.route("hello there") == "llm"
+    monkeypatch.setattr(classifier_mod, "_classifier", None)
+    assert router.route("I misplaced my card") == "llm"
+
+
+@pytest.mark.parametrize("engine", ["inline", "graph"])
+def test_llm_turns_consult_the_classifier_before_the_llm_planner(monkeypatch, tmp_path, loaded, engine):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    clear_clients()
+    planned = []
+    run, arun = pipeline_mod.LLMPlanner.run, pipeline_mod.LLMPlanner.arun
+
+    async def counted_arun(self, user_message):
+        planned.append(user_message)
+        return await arun(self, user_message)
+
+    monkeypatch.setattr(pipeline_mod.LLMPlanner, "run", lambda self, m: planned.append(m) or run(self, m))
+    monkeypatch.setattr(pipeline_mod.LLMPlanner, "arun", counted_arun)
+    pipe = AgentPipeline()
+    sync = pipe.process("I misplaced my card")
+    assert sync.intent == IntentName.card_replace
+    assert asyncio.run(pipe.aprocess("I misplaced my card")).intent == IntentName.card_replace
+    assert planned == []
+    # Unsure predictions and clarification replies still go to the LLM planner
+    pipe.process("hello there")
+    pipe.process("credit", session_id=sync.session_id)
+    assert planned == ["hello there", "credit"]
+    clear_clients()
+
+
+@pytest.mark.parametrize("engine", ["inline", "graph"])
+def test_regex_intents_are_never_overridden_by_the_classifier(monkeypatch, tmp_path, engine):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    clear_clients()
+    consulted = []
+    # A confident classifier that disagrees with the regex
+    monkeypatch.setattr(pipeline_mod, "predict_intent", lambda m: consulted.append(m) or IntentName.report_fraud)
+    message = "check balance for account 123456 token ABCD"
+    assert detect_intent(message) == IntentName.check_balance
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    assert AgentPipeline().process(message).intent == IntentName.check_balance
+    # LLM turns send a regex hit to the LLM planner, not the classifier
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    pipe = AgentPipeline()
+    assert pipe.process(message).intent != IntentName.report_fraud
+    assert asyncio.run(pipe.aprocess(message)).intent != IntentName.report_fraud
+    assert consulted == []
+    clear_clients()
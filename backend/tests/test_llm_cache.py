@@ -0,0 +1,65 @@
+import asyncio
+
+import app.llm.cache as cache_mod
+from app.llm.bedrock import acall_llm_json, call_llm_json
+from app.llm.cache import LLMResponseCache, SqliteCacheTier
+from app.llm.fake import FakeChatModel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_returns_fresh_copies_and_tracks_hit_rate():
+    cache = LLMResponseCache(max_bytes=1024, ttl_s=60)
+    assert cache.get("k") is None
+    cache.put("k", {"approved": True, "issues": [], "score": 8})
+    first = cache.get("k")
+    first["score"] = 1
+    assert cache.get("k") == {"approved": True, "issues": [], "score": 8}
+    assert cache.stats()["hits"] == 2 and cache.stats()["hit_rate"] == round(2 / 3, 4)
+
+
+def test_cache_evicts_lru_by_bytes_and_expires_by_ttl():
+    clock = FakeClock()
+    cache = LLMResponseCache(max_bytes=40, ttl_s=10, clock=clock)
+    cache.put("a", "x" * 15)
+    cache.put("b", "y" * 15)
+    cache.get("a")
+    cache.put("c", "z" * 15)  # over budget: "b" is least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 15
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= 40
+    clock.now += 11
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "llm_cache.db")
+    first = LLMResponseCache(disk=SqliteCacheTier(db))
+    first.put("k", {"intent": "check_balance", "slots": {}})
+    first.disk.close()
+
+    second = LLMResponseCache(disk=SqliteCacheTier(db))
+    assert second.get("k") == {"intent": "check_balance", "slots": {}}
+    assert second.get("k") is not None  # now served from memory
+    assert second.stats()["disk_hits"] == 1 and second.stats()["hits"] == 1
+
+
+def test_cache_is_switched_per_agent(monkeypatch):
+    monkeypatch.setattr(cache_mod, "LLM_CACHE_AGENTS", "plan_review")
+    monkeypatch.setattr(cache_mod, "_cache", LLMResponseCache())
+    model = FakeChatModel()
+    prompt = "You review a plan ... score ... Plan: {}"
+    for _ in range(3):
+        call_llm_json(prompt, model, agent="plan_review")
+    assert model.calls == 1
+    asyncio.run(acall_llm_json(prompt, model, agent="plan_review"))
+    assert model.calls == 1
+    for _ in range(2):
+        call_llm_json(prompt, model, agent="execution_review")
+    assert model.calls == 3
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+import app.llm.cache as cache_mod
+from app.core.pipeline import AgentPipeline
+from app.llm.bedrock import call_llm_json, clear_clients, get_bedrock_client
+from app.llm.cassette import (
+    Cassette,
+    CassetteChatModel,
+    CassetteMiss,
+    CassetteRecorder,
+    cassette_key,
+    close_cassettes,
+    open_cassette,
+)
+from app.llm.fake import FakeChatModel
+
+SESSIONS = [
+    ["Please replace my card", "credit", "ship to 123 Main St", "it's lost"],
+    ["transfer 10 from 111111 to 222222"],
+]
+USAGE = {"input_tokens": 120, "output_tokens": 8, "total_tokens": 128}
+
+
+def _messages(prompt):
+    return [{"role": "user", "content": prompt}]
+
+
+def _run(monkeypatch):
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(executioner_llm, "LLM_TOOL_AVAILABILITY", 1.0)
+    monkeypatch.setattr(cache_mod, "LLM_CACHE_AGENTS", "")
+    clear_clients()
+    pipe = AgentPipeline()
+    out = []
+    for i, messages in enumerate(SESSIONS):
+        for message in messages:
+            r = pipe.process(message, session_id=f"s{i}")
+            out.append((r.messages[-1].content, r.intent, r.state, r.plan_review_score, r.execution_review_score))
+    clear_clients()
+    return out
+
+
+def test_llm_mode_sessions_replay_from_a_recorded_cassette(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm.jsonl.gz")
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("LLM_CASSETTE_RECORD", path)
+    recorded = _run(monkeypatch)
+    close_cassettes()
+
+    monkeypatch.delenv("LLM_CASSETTE_RECORD")
+    monkeypatch.setenv("LLM_BACKEND", "cassette")
+    monkeypatch.setenv("LLM_CASSETTE", path)
+    assert _run(monkeypatch) == recorded
+    stats = open_cassette(path).stats()
+    assert stats["misses"] == 0 and stats["hits"] == stats["entries"] > 0
+    close_cassettes()
+
+
+def test_recorder_wraps_clients_and_keeps_their_identity(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("LLM_CASSETTE_RECORD", str(tmp_path / "c.jsonl.gz"))
+    clear_clients()
+    client = get_bedrock_client()
+    assert isinstance(client, CassetteRecorder) and isinstance(client.inner, FakeChatModel)
+    call_llm_json("Summarize the execution result for the user", agent="responder")
+    assert client.cassette.stats()["recorded"] == 1
+    clear_clients()
+    close_cassettes()
+
+
+def test_replay_is_deterministic_and_sleeps_the_recorded_latency(tmp_path):
+    path = str(tmp_path / "c.jsonl.gz")
+    cassette = Cassette(path)
+    key = cassette_key(_messages("You review a plan"))
+    cassette.add(key, "plan_review", '{"approved": true, "score": 8.5}', 0.05, u=USAGE)
+    cassette.add(key, "plan_review", '{"approved": false, "score": 3.0}', 0.01)
+    cassette.save()
+
+    model = CassetteChatModel(Cassette(path), latency_scale=1.0)
+    start = time.perf_counter()
+    first = model.invoke(_messages("You review a plan"))
+    assert time.perf_counter() - start >= 0.05
+    assert first.content == '{"approved": true, "score": 8.5}' and first.usage_metadata == USAGE
+    # Repeated prompts cycle through their recordings in order
+    assert "false" in model.invoke(_messages("You review a plan")).content
+    assert "true" in model.invoke(_messages("You review a plan")).content
+
+    fast = CassetteChatModel(Cassette(path), latency_scale=0.0)
+    start = time.perf_counter()
+    fast.invoke(_messages("You review a plan"))
+    assert time.perf_counter() - start < 0.05
+    with pytest.raises(CassetteMiss):
+        fast.invoke(_messages("never recorded"))
+    assert fast.cassette.stats()["misses"] == 1
+
+
+def test_saves_append_and_streams_keep_time_to_first_token(tmp_path):
+    path = str(tmp_path / "c.jsonl.gz")
+    cassette = Cassette(path)
+    recorder = CassetteRecorder(FakeChatModel(latency_ms=20), cassette)
+    recorder.invoke(_messages("hello"))
+    cassette.save()
+
+    async def stream(model):
+        return "".join([c.content async for c in model.astream(_messages("Summarize the execution result"))])
+
+    streamed = asyncio.run(stream(recorder))
+    cassette.save()
+    reloaded = Cassette(path)
+    assert len(reloaded) == 2
+    entry = reloaded.next(cassette_key(_messages("Summarize the execution result")))
+    assert entry["a"] == "responder" and entry["ft"] >= 20 and entry["ms"] >= entry["ft"]
+    assert asyncio.run(stream(CassetteChatModel(reloaded))) == streamed
+    assert reloaded.summary()["responder"]["calls"] == 1
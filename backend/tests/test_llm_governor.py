@@ -0,0 +1,262 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+import app.llm.cache as cache_mod
+from app.core.pipeline import AgentPipeline
+from app.llm.bedrock import clear_clients, get_bedrock_client
+from app.llm.fake import FakeThrottlingException
+from app.llm.governor import CircuitBreaker, LLMGovernor, LLMUnavailable, set_governor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _governor(**kwargs):
+    kwargs.setdefault("retry_base_s", 0.001)
+    kwargs.setdefault("rng", lambda: 1.0)
+    return LLMGovernor(**kwargs)
+
+
+def _flaky(failures, exc=FakeThrottlingException):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc()
+        return "ok"
+
+    return fn, calls
+
+
+def test_throttling_is_retried_with_backoff():
+    governor = _governor(max_retries=2)
+    fn, calls = _flaky(2)
+    assert governor.call("planner", fn) == "ok"
+    assert len(calls) == 3 and governor.counts == {"retry": 2}
+
+    fn, calls = _flaky(3)
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", fn)
+    assert info.value.reason == "throttled" and len(calls) == 3
+
+
+def test_other_errors_are_not_retried():
+    governor = _governor(max_retries=2)
+    fn, calls = _flaky(1, exc=RuntimeError)
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", fn)
+    assert info.value.reason == "error" and len(calls) == 1
+    assert isinstance(info.value.__cause__, RuntimeError)
+
+
+def test_deadline_bounds_sync_and_async_calls():
+    governor = _governor(timeout_s=0.05)
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", lambda: time.sleep(0.3))
+    assert info.value.reason == "timeout"
+    assert time.monotonic() - start < 0.2
+
+    with pytest.raises(LLMUnavailable) as info:
+        asyncio.run(governor.acall("planner", lambda: asyncio.sleep(0.3)))
+    assert info.value.reason == "timeout"
+
+
+def test_global_and_per_agent_caps_bound_in_flight_calls():
+    governor = _governor(max_concurrency=3, agent_limits={"planner": 1})
+    active = {"planner": 0, "reviewer": 0, "total": 0}
+    peak = dict(active)
+    lock = threading.Lock()
+
+    async def work(agent):
+        with lock:
+            active[agent] += 1
+            active["total"] += 1
+            peak[agent] = max(peak[agent], active[agent])
+            peak["total"] = max(peak["total"], active["total"])
+        await asyncio.sleep(0.01)
+        with lock:
+            active[agent] -= 1
+            active["total"] -= 1
+
+    async def burst():
+        agents = ["planner"] * 4 + ["reviewer"] * 8
+        await asyncio.gather(*(governor.acall(a, lambda a=a: work(a)) for a in agents))
+
+    asyncio.run(burst())
+    assert peak["planner"] == 1 and peak["total"] == 3
+    assert governor.in_flight == 0
+
+
+def test_slots_stay_held_until_the_request_returns():
+    governor = _governor(max_concurrency=1, timeout_s=0.05)
+    release = threading.Event()
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", release.wait)
+    assert info.value.reason == "timeout"
+    # The caller gave up, but the request is still in flight and keeps its slot
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", lambda: "never")
+    assert info.value.reason == "overloaded"
+    assert governor.counts == {"overloaded": 1, "timeout": 1}
+    release.set()
+    deadline = time.monotonic() + 1
+    while governor.in_flight and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert governor.call("planner", lambda: "ok") == "ok"
+
+
+def test_cancelled_waiters_hand_back_the_slots_they_took():
+    governor = _governor(max_concurrency=1, agent_limits={"planner": 1}, timeout_s=1.0)
+
+    async def run():
+        release = asyncio.Event()
+        holder = asyncio.create_task(governor.acall("reviewer", release.wait))
+        await asyncio.sleep(0.01)
+        # Takes the planner slot, then queues for the global one held by the reviewer
+        waiter = asyncio.create_task(governor.acall("planner", lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        assert governor.in_flight == 0
+        # Both the planner and the global slot are free again
+        await asyncio.gather(*(governor.acall("planner", lambda: asyncio.sleep(0)) for _ in range(3)))
+
+    asyncio.run(run())
+    assert "overloaded" not in governor.counts
+
+
+def test_streams_hold_their_slot_and_share_the_deadline():
+    governor = _governor(timeout_s=0.1)
+
+    async def tokens(delay):
+        for token in ("a", "b", "c"):
+            await asyncio.sleep(delay)
+            yield token
+
+    async def run():
+        stream = governor.astream("responder", lambda: tokens(0.001))
+        assert await stream.__anext__() == "a"
+        # The open stream keeps its slot until it ends
+        assert governor.in_flight == 1
+        assert [t async for t in stream] == ["b", "c"]
+        assert governor.in_flight == 0
+
+        # Each chunk is fast, but together they overrun the deadline
+        with pytest.raises(LLMUnavailable) as info:
+            [t async for t in governor.astream("responder", lambda: tokens(0.04))]
+        assert info.value.reason == "timeout"
+
+    asyncio.run(run())
+    assert governor.in_flight == 0 and governor.counts == {"timeout": 1}
+
+
+def test_breaker_opens_then_probes_after_cooldown():
+    clock = Clock()
+    governor = _governor(max_retries=0, breaker=CircuitBreaker(failures=2, cooldown_s=10, clock=clock))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            governor.call("planner", _flaky(1, exc=RuntimeError)[0])
+    assert governor.is_open()
+
+    fn, calls = _flaky(0)
+    with pytest.raises(LLMUnavailable) as info:
+        governor.call("planner", fn)
+    assert info.value.reason == "circuit_open" and not calls
+
+    clock.now = 10
+    assert not governor.is_open() and governor.breaker.state == "half_open"
+    assert governor.breaker.allow() is True  # the probe
+    assert governor.breaker.allow() is False and governor.is_open()
+    governor.breaker.record_failure()
+    assert governor.breaker.state == "open"
+
+    clock.now = 20
+    assert governor.call("planner", fn) == "ok"
+    assert governor.breaker.state == "closed" and governor.breaker.opens == 1
+
+
+@pytest.fixture
+def failing_bedrock(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "1")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(executioner_llm.random, "random", lambda: 0.0)  # tool always available
+    monkeypatch.setattr(cache_mod, "LLM_CACHE_AGENTS", "")
+    clear_clients()
+    # Opens after the planner and plan review fail, so the executioner is refused without sending
+    governor = _governor(max_retries=1, breaker=CircuitBreaker(failures=2, cooldown_s=60))
+    set_governor(governor)
+    yield governor
+    set_governor(None)
+    clear_clients()
+
+
+def test_pipeline_degrades_to_rule_agents_then_reroutes_while_open(failing_bedrock):
+    pipe = AgentPipeline()
+    client = get_bedrock_client()
+    r1 = pipe.process("transfer 10 from 111111 to 222222")
+    # Every LLM stage fell back to its rule-based counterpart
+    assert r1.awaiting_user is False and r1.execution_review_score is not None
+    assert r1.messages[-1].content.startswith("Transfer initiated")
+    assert failing_bedrock.is_open()
+
+    calls = client.calls
+    r2 = asyncio.run(pipe.aprocess("transfer 10 from 111111 to 222222"))
+    assert r2.messages[-1].content.startswith("Transfer initiated")
+    assert client.calls == calls  # breaker open: no model calls at all
+
+
+@pytest.mark.parametrize("engine", ["inline", "graph"])
+@pytest.mark.parametrize("reason, rerouted", [("overloaded", True), ("circuit_open", True), ("timeout", False), ("error", False)])
+def test_executioner_is_rerouted_only_when_the_request_was_never_sent(monkeypatch, tmp_path, engine, reason, rerouted):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    clear_clients()
+    pipe = AgentPipeline()
+    get_agents, get_async_agents = pipe._get_agents, pipe._get_async_agents
+
+    def unavailable(plan):
+        raise LLMUnavailable("executioner", reason)
+
+    async def aunavailable(plan):
+        raise LLMUnavailable("executioner", reason)
+
+    def with_executioner(agents, executioner):
+        return lambda logger: agents(logger)[:2] + (executioner,) + agents(logger)[3:]
+
+    monkeypatch.setattr(pipe, "_get_agents", with_executioner(get_agents, unavailable))
+    monkeypatch.setattr(pipe, "_get_async_agents", with_executioner(get_async_agents, aunavailable))
+    rule_runs = []
+    get_rule_agents = pipe._get_rule_agents
+
+    def rule_agents(logger):
+        agents = get_rule_agents(logger)
+        run = agents[2].run
+        agents[2].run = lambda plan: rule_runs.append(plan.intent) or run(plan)
+        return agents
+
+    monkeypatch.setattr(pipe, "_get_rule_agents", rule_agents)
+
+    for r in (pipe.process("transfer 10 from 111111 to 222222"), asyncio.run(pipe.aprocess("transfer 10 from 111111 to 222222"))):
+        # A request that may have reached the model is never run a second time by the rule executioner
+        assert (r.execution_review_score is not None) is rerouted
+    assert len(rule_runs) == (2 if rerouted else 0)
+    clear_clients()
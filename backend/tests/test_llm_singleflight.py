@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app.llm.singleflight as singleflight_mod
+from app.llm.bedrock import acall_llm_json, call_llm_json
+from app.llm.fake import FakeChatModel
+from app.llm.governor import LLMUnavailable
+from app.llm.singleflight import SingleFlight
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    flights = SingleFlight()
+    monkeypatch.setattr(singleflight_mod, "_singleflight", flights)
+    monkeypatch.setattr("app.llm.bedrock.LLM_COALESCE", True)
+    return flights
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_followers_share_the_leaders_result():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return {"intent": "check_balance"}
+
+    with ThreadPoolExecutor(5) as pool:
+        futures = [pool.submit(flights.do, "k", slow) for _ in range(5)]
+        _wait_for(lambda: flights.followers == 4)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(value is results[0][0] for value, _ in results)
+    assert flights.stats()["coalescing_ratio"] == 0.8 and flights.stats()["in_flight"] == 0
+
+
+def test_followers_receive_the_leaders_error_and_later_calls_start_fresh():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(flights.do, "k", failing) for _ in range(3)]
+        _wait_for(lambda: flights.followers == 2)
+        release.set()
+        errors = []
+        for future in futures:
+            with pytest.raises(RuntimeError, match="boom") as info:
+                future.result()
+            errors.append(info.value)
+
+    # Each caller raises its own instance (and traceback); followers' copies chain to the leader's
+    assert len({id(error) for error in errors}) == 3
+    assert all(error.__cause__ in errors for error in errors if error.__cause__ is not None)
+    assert flights.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_async_waiters_each_get_their_own_error():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise LLMUnavailable("planner", "timeout")
+
+    async def burst():
+        return await asyncio.gather(*(flights.ado("k", failing, "planner") for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(burst())
+    assert len({id(error) for error in errors}) == 3
+    assert all(isinstance(error, LLMUnavailable) and error.reason == "timeout" for error in errors)
+    assert len({id(error.__traceback__) for error in errors}) == 3
+
+
+def test_concurrent_identical_prompts_make_one_model_call(flights):
+    model = FakeChatModel(latency_ms=50)
+    prompt = "Respond to the user ... Execution: {}"
+
+    async def burst():
+        same = [acall_llm_json(prompt, model, agent="execution_review") for _ in range(5)]
+        other = acall_llm_json(prompt + " (other)", model, agent="execution_review")
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(burst())
+    assert results == ["All set!"] * 6
+    assert model.calls == 2
+    assert flights.followers == 4 and flights.leaders == 2
+
+
+def test_sync_callers_coalesce_and_get_their_own_parsed_copy(flights):
+    model = FakeChatModel(latency_ms=100)
+    prompt = "Return JSON with intent and slots for: what's my balance"
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: call_llm_json(prompt, model, agent="execution_review"), range(4)))
+
+    assert model.calls == 1
+    assert all(r == {"intent": None, "slots": {}} for r in results)
+    assert len({id(r) for r in results}) == 4
+
+
+def test_executioner_calls_are_never_coalesced(flights):
+    model = FakeChatModel(latency_ms=50)
+    prompt = "Return JSON with intent and slots for: transfer 10 from 111111 to 222222"
+
+    with ThreadPoolExecutor(3) as pool:
+        list(pool.map(lambda _: call_llm_json(prompt, model, agent="executioner"), range(3)))
+
+    async def burst():
+        return await asyncio.gather(*(acall_llm_json(prompt, model, agent="executioner") for _ in range(3)))
+
+    asyncio.run(burst())
+    assert model.calls == 6 and flights.leaders == 0 and flights.followers == 0
+
+
+def test_coalescing_can_be_switched_off(flights, monkeypatch):
+    monkeypatch.setattr("app.llm.bedrock.LLM_COALESCE", False)
+    model = FakeChatModel(latency_ms=20)
+
+    async def burst():
+        return await asyncio.gather(*(acall_llm_json("Okay?", model, agent="execution_review") for _ in range(3)))
+
+    asyncio.run(burst())
+    assert model.calls == 3 and flights.leaders == 0
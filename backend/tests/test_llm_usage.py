@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+import app.llm.cache as cache_mod
+from app.core import metrics
+from app.core.logger import flush_logs
+from app.core.pipeline import AgentPipeline
+from app.llm.bedrock import astream_llm_text, call_llm_json, clear_clients
+from app.llm.fake import FakeChatModel
+from app.llm.usage import token_cost, usage_tokens
+from app.main import app
+
+AGENTS = ("planner", "plan_review", "executioner", "execution_review", "responder")
+
+
+def _llm_mode(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(cache_mod, "LLM_CACHE_AGENTS", "")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(executioner_llm, "LLM_TOOL_AVAILABILITY", 1.0)
+    clear_clients()
+
+
+def _usage_records(tmp_path, sid):
+    flush_logs()
+    with open(tmp_path / f"session_{sid}.jsonl", encoding="utf-8") as f:
+        return [r["payload"] for r in map(json.loads, f) if r["event"] == "llm_usage"]
+
+
+def test_tokens_are_attributed_to_agent_and_intent_and_logged_per_session(monkeypatch, tmp_path):
+    _llm_mode(monkeypatch, tmp_path)
+    labels = dict(intent="transfer_money", kind="input")
+    before = {a: metrics.LLM_TOKENS.value(agent=a, **labels) for a in AGENTS}
+    cost_before = metrics.LLM_COST_USD.value(agent="plan_review", intent="transfer_money")
+
+    pipe = AgentPipeline()
+    pipe.process("transfer 10 from 111111 to 222222", session_id="billed")
+    pipe.process("transfer 20 from 111111 to 222222", session_id="billed")
+
+    for agent in AGENTS:
+        assert metrics.LLM_TOKENS.value(agent=agent, **labels) > before[agent], agent
+    assert metrics.LLM_COST_USD.value(agent="plan_review", intent="transfer_money") > cost_before
+
+    first, second = _usage_records(tmp_path, "billed")
+    assert set(first["turn"]) == set(AGENTS)
+    turn_input = sum(u["input_tokens"] for u in first["turn"].values())
+    totals = first["session_in_process"]
+    assert totals["input_tokens"] == turn_input and totals["calls"] == len(AGENTS)
+    # Totals keep running across the turns this process serves, and say which process that is
+    assert second["session_in_process"]["calls"] == 2 * len(AGENTS)
+    assert second["session_in_process"]["cost_usd"] > totals["cost_usd"] > 0
+    assert first["pid"] == second["pid"] == os.getpid()
+    clear_clients()
+
+
+def test_rule_turns_and_cache_hits_cost_nothing(monkeypatch, tmp_path):
+    _llm_mode(monkeypatch, tmp_path)
+    monkeypatch.setattr(cache_mod, "LLM_CACHE_AGENTS", "planner")
+    before = metrics.LLM_BILLED_CALLS.value(agent="planner", intent="none")
+    prompt = "You extract user intent (usage test) json intent slots"
+    call_llm_json(prompt, agent="planner")
+    call_llm_json(prompt, agent="planner")
+    assert metrics.LLM_BILLED_CALLS.value(agent="planner", intent="none") == before + 1
+
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    AgentPipeline().process("check balance for account 123456 token ABCD", session_id="free")
+    assert _usage_records(tmp_path, "free") == []
+    clear_clients()
+
+
+def test_usage_is_read_from_either_bedrock_shape_and_streams():
+    assert usage_tokens(AIMessage(content="x", usage_metadata={"input_tokens": 3, "output_tokens": 1, "total_tokens": 4})) == (3, 1)
+    resp = AIMessage(content="x", response_metadata={"usage": {"prompt_tokens": 7, "completion_tokens": 2}})
+    assert usage_tokens(resp) == (7, 2) and usage_tokens(AIMessage(content="x")) is None
+    assert token_cost(1000, 1000) > token_cost(1000, 0) > 0
+
+    before = metrics.LLM_TOKENS.value(agent="responder", intent="none", kind="output")
+
+    async def stream():
+        return "".join([t async for t in astream_llm_text("Summarize the execution result", FakeChatModel(), agent="responder")])
+
+    assert asyncio.run(stream())
+    assert metrics.LLM_TOKENS.value(agent="responder", intent="none", kind="output") > before
+
+
+def test_usage_endpoint_summarizes_by_agent_and_intent(monkeypatch, tmp_path):
+    _llm_mode(monkeypatch, tmp_path)
+    client = TestClient(app)
+    client.post("/chat", json={"message": "transfer 10 from 111111 to 222222"})
+    body = client.get("/usage").json()
+    assert body["totals"]["calls"] >= len(AGENTS) and body["totals"]["cost_usd"] > 0
+    assert body["by_intent"]["transfer_money"]["input_tokens"] > 0
+    assert body["by_agent"]["plan_review"]["input_tokens_per_call"] > 0
+    assert "llm_tokens_total{" in client.get("/metrics").text
+    clear_clients()
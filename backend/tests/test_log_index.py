@@ -0,0 +1,234 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.log_index as log_index_mod
+import app.core.pipeline as pipeline_mod
+from app.core.log_index import SessionLogIndex
+from app.core.log_segments import SegmentLogWriter, SegmentStore
+from app.core.logger import FileLogWriter, SessionLogger
+from app.core.pipeline import AgentPipeline
+from app.core.types import ExecutionResult, IntentName, Plan
+
+
+def _transfer(logs_dir, session_id, success):
+    log = SessionLogger(session_id, base_dir=str(logs_dir), writer=FileLogWriter())
+    plan = Plan(intent=IntentName.transfer_money, slots={"amount": "10"})
+    log.user_message("transfer 10")
+    log.step("planner", {"user_message": "transfer 10"}, plan)
+    log.state_transition("idle", "executing")
+    log.step("executioner", {"plan": plan}, ExecutionResult(success=success, error=None if success else "declined"))
+    log.state_transition("executing", "completed" if success else "failed")
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    return tmp_path
+
+
+def test_index_tags_events_with_carried_intent_and_state(logs):
+    _transfer(logs, "ok", True)
+    _transfer(logs, "bad", False)
+    index = SessionLogIndex(logs_dir=str(logs))
+
+    failed, cursor = index.search_events(name="executioner", intent="transfer_money", success=False)
+    assert cursor is None
+    assert [(e["session_id"], e["state"], e["success"]) for e in failed] == [("bad", "executing", False)]
+
+    sessions, _ = index.search_sessions(state="failed")
+    assert [s["session_id"] for s in sessions] == ["bad"]
+    assert sessions[0]["intent"] == "transfer_money" and sessions[0]["records"] == 5
+
+
+def test_index_is_incremental_and_skips_partial_lines(logs, monkeypatch):
+    monkeypatch.setattr(log_index_mod, "LOG_INDEX_RESCAN_SECONDS", 3600)
+    _transfer(logs, "s", True)
+    index = SessionLogIndex(logs_dir=str(logs))
+    assert index.refresh() == 5
+    assert index.refresh() == 0
+
+    # Appends by other processes to existing files wait for a forced (or periodic) rescan
+    path = logs / "session_s.jsonl"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": "2030-01-01T00:00:00Z", "session_id": "s", "event": "info", "payload": {}}))
+    assert index.refresh(force=True) == 0
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert index.refresh() == 0
+    assert index.refresh(force=True) == 1
+    events, _ = index.search_events(session_id="s", since="2030-01-01T00:00:00Z", with_records=True)
+    assert [e["record"]["event"] for e in events] == ["info"]
+    assert events[0]["state"] == "completed"
+
+
+def test_refresh_reads_only_what_the_writers_report(logs, monkeypatch):
+    _transfer(logs, "a", True)
+    index = SessionLogIndex(logs_dir=str(logs))
+    assert index.refresh() == 5
+    monkeypatch.setattr(index, "_session_files", lambda: pytest.fail("rescanned the logs directory"))
+    assert index.refresh() == 0
+    _transfer(logs, "a", False)
+    assert index.refresh() == 5
+    sessions, _ = index.search_sessions(state="failed")
+    assert [s["session_id"] for s in sessions] == ["a"]
+    index.close()
+
+
+def test_other_workers_logs_are_picked_up_without_a_forced_refresh(logs, monkeypatch):
+    monkeypatch.setattr(log_index_mod, "LOG_INDEX_RESCAN_SECONDS", 3600)
+    store = SegmentStore(root=str(logs / "segments"))
+    store.append({"seg": [json.dumps({"ts": "2030-01-01T00:00:00Z", "session_id": "seg", "event": "info"}).encode()]})
+    index = SessionLogIndex(logs_dir=str(logs))
+    # Pin the mtimes in the past so the writes below are sure to move them
+    os.utime(logs, ns=(0, 0))
+    os.utime(logs / "segments" / "index.sqlite3", ns=(0, 0))
+    assert index.refresh() == 1
+
+    # Written directly, as another worker process would: the append listener never hears of these
+    record = {"ts": "2030-01-01T00:00:01Z", "session_id": "other", "event": "info", "payload": {}}
+    (logs / "session_other.jsonl").write_text(json.dumps(record) + "\n")
+    store.append({"seg": [json.dumps({**record, "session_id": "seg"}).encode()]})
+    assert index.refresh() == 2
+
+    # Appends to an existing file are caught by the periodic rescan
+    with open(logs / "session_other.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    assert index.refresh() == 0
+    monkeypatch.setattr(log_index_mod, "LOG_INDEX_RESCAN_SECONDS", 0)
+    assert index.refresh() == 1
+    store.close()
+    index.close()
+
+
+def test_segment_logs_are_indexed(logs):
+    store = SegmentStore(root=str(logs / "segments"))
+    writer = SegmentLogWriter(store=store, max_records=1000, interval_ms=60_000)
+    index = SessionLogIndex(logs_dir=str(logs))
+    log = SessionLogger("seg", base_dir=str(logs), writer=writer)
+    log.user_message("transfer 10")
+    log.state_transition("idle", "executing")
+    writer.flush()
+    assert index.refresh() == 2
+    log.step("executioner", {"plan": Plan(intent=IntentName.transfer_money)}, ExecutionResult(success=False))
+    log.state_transition("executing", "failed")
+    writer.flush()
+
+    failed, _ = index.search_events(name="executioner", success=False, with_records=True)
+    assert [(e["session_id"], e["intent"], e["state"]) for e in failed] == [("seg", "transfer_money", "executing")]
+    assert failed[0]["record"]["payload"]["name"] == "executioner"
+    events, _ = index.search_events(session_id="seg", with_records=True)
+    assert [e["record"]["event"] for e in events] == ["user_message", "state_transition", "agent_step", "state_transition"]
+    writer.close()
+    index.close()
+
+
+def test_purged_logs_are_skipped_and_forgotten(logs, monkeypatch):
+    now = [1_000_000.0]
+    store = SegmentStore(root=str(logs / "segments"), bucket_s=60, clock=lambda: now[0])
+    monkeypatch.setattr(log_index_mod, "_index", SessionLogIndex(logs_dir=str(logs)))
+    for session_id in ("old", "new"):
+        record = {"ts": "2030-01-01T00:00:00Z", "session_id": session_id, "event": "info", "payload": {}}
+        store.append({session_id: [json.dumps(record).encode()]})
+        log_index_mod._index.refresh(force=True)
+        now[0] += 120
+    _transfer(logs, "gone", True)
+    log_index_mod._index.refresh()
+    assert store.purge_before(now[0]) == 1
+    os.remove(logs / "session_gone.jsonl")
+
+    r = _admin_client(monkeypatch).get("/admin/sessions/events", params={"records": "true"})
+    assert r.status_code == 200
+    assert [e["session_id"] for e in r.json()["items"]] == ["new"]
+    # Their rows are dropped too, not just skipped
+    events, _ = log_index_mod._index.search_events()
+    assert [e["session_id"] for e in events] == ["new"]
+    store.close()
+
+
+def test_filtered_queries_use_indexes(logs):
+    index = SessionLogIndex(logs_dir=str(logs))
+    sql, params = index._event_query(event="agent_step", intent="transfer_money", since="2024-01-01T00:00:00Z")
+    plan = " ".join(row[-1] for row in index._conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "USING INDEX" in plan
+
+
+def test_pagination_cursor_walks_all_matches(logs):
+    for i in range(3):
+        _transfer(logs, f"s{i}", True)
+    index = SessionLogIndex(logs_dir=str(logs))
+    seen, cursor = [], 0
+    while True:
+        page, cursor = index.search_events(event="state_transition", limit=2, cursor=cursor)
+        seen += page
+        if cursor is None:
+            break
+    assert len(seen) == 6
+    assert [e["id"] for e in seen] == sorted(e["id"] for e in seen)
+    assert list(index.iter_events(event="state_transition", page_size=4)) == seen
+
+
+def _admin_client(monkeypatch):
+    import app.main as main_mod
+
+    monkeypatch.setattr(main_mod, "ADMIN_TOKEN", "secret")
+    return TestClient(main_mod.app, headers={"X-Admin-Token": "secret"})
+
+
+def test_admin_endpoints_search_fetch_and_stream(logs, monkeypatch):
+    monkeypatch.setattr(log_index_mod, "_index", SessionLogIndex(logs_dir=str(logs)))
+    pipe = AgentPipeline()
+    waiting = pipe.process("Please replace my card").session_id
+    pipe.process("transfer 10 from 111111 to 222222", session_id="done")
+    _transfer(logs, "bad", False)
+    client = _admin_client(monkeypatch)
+
+    r = client.get("/admin/sessions", params={"state": "awaiting_clarification"})
+    assert r.status_code == 200
+    assert [s["session_id"] for s in r.json()["items"]] == [waiting]
+
+    r = client.get(
+        "/admin/sessions/events",
+        params={"name": "executioner", "intent": "transfer_money", "success": "false", "within_s": 3600},
+    )
+    assert [e["session_id"] for e in r.json()["items"]] == ["bad"]
+
+    r = client.get("/admin/sessions/done", params={"limit": 2})
+    body = r.json()
+    assert [e["record"]["event"] for e in body["items"]] == ["user_message", "agent_step"]
+    assert body["next_cursor"] is not None
+
+    r = client.get("/admin/sessions/done", params={"stream": "true"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0]["record"]["payload"]["message"] == "transfer 10 from 111111 to 222222"
+    assert lines[-1]["state"] == "idle"
+
+    # Another worker's append to an existing file, seen right away with refresh=true
+    with open(logs / "session_bad.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": "2030-01-01T00:00:00Z", "session_id": "bad", "event": "info", "payload": {}}) + "\n")
+    monkeypatch.setattr(log_index_mod, "LOG_INDEX_RESCAN_SECONDS", 3600)
+    r = client.get("/admin/sessions/bad", params={"event": "info", "refresh": "true"})
+    assert [e["ts"] for e in r.json()["items"]] == ["2030-01-01T00:00:00Z"]
+
+    assert client.get("/admin/sessions/events", params={"since": "yesterday"}).status_code == 400
+    assert client.get("/admin/sessions/events", params={"until": "garbage", "stream": "true"}).status_code == 400
+
+
+def test_admin_endpoints_fail_closed(logs, monkeypatch):
+    import app.main as main_mod
+
+    monkeypatch.setattr(log_index_mod, "_index", SessionLogIndex(logs_dir=str(logs)))
+    monkeypatch.setattr(main_mod, "ADMIN_TOKEN", "")
+    client = TestClient(main_mod.app)
+    # Hidden until a token is configured
+    assert client.get("/admin/sessions").status_code == 404
+    assert client.get("/admin/sessions", headers={"X-Admin-Token": ""}).status_code == 404
+
+    monkeypatch.setattr(main_mod, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/sessions").status_code == 401
+    assert client.get("/admin/sessions", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get("/admin/sessions", headers={"X-Admin-Token": "secret"}).status_code == 200
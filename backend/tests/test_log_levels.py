@@ -0,0 +1,84 @@
+import json
+
+import app.core.logger as logger_mod
+import app.core.pipeline as pipeline_mod
+from app.core import metrics
+from app.core.logger import FileLogWriter, SessionLogger
+from app.core.pipeline import AgentPipeline
+from app.core.types import IntentName, Plan
+
+
+def _records(tmp_path, sid):
+    path = tmp_path / f"session_{sid}.jsonl"
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _run_turn(monkeypatch, tmp_path, level, message="transfer 10 from 111111 to 222222", rates=None):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    monkeypatch.setattr(logger_mod, "LOG_LEVEL", level)
+    monkeypatch.setattr(logger_mod, "LOG_SAMPLE_RATES", rates or {})
+    AgentPipeline().process(message, session_id=level)
+    return _records(tmp_path, level)
+
+
+def test_summary_tier_reduces_steps_to_key_fields(monkeypatch, tmp_path):
+    records = _run_turn(monkeypatch, tmp_path, "summary")
+    steps = [r["payload"] for r in records if r["event"] == "agent_step"]
+    assert [s["name"] for s in steps] == ["planner", "reviewer", "executioner", "reviewer", "responder"]
+    assert all(set(s) == {"name", "output"} for s in steps)
+    assert steps[0]["output"] == {"intent": "transfer_money", "missing_slots": []}
+    assert set(steps[1]["output"]) == {"approved", "score"}
+    assert {r["event"] for r in records} >= {"user_message", "assistant_message", "state_transition"}
+
+
+def test_messages_tier_keeps_only_conversation(monkeypatch, tmp_path):
+    records = _run_turn(monkeypatch, tmp_path, "messages")
+    assert [r["event"] for r in records] == ["user_message", "assistant_message"]
+
+
+def test_sampled_intent_is_logged_in_full(monkeypatch, tmp_path):
+    records = _run_turn(monkeypatch, tmp_path, "messages", rates={"transfer_money": 1.0})
+    steps = [r["payload"] for r in records if r["event"] == "agent_step"]
+    assert steps and "input" in steps[0]
+
+
+def test_escalated_turn_is_logged_in_full(monkeypatch, tmp_path):
+    monkeypatch.setattr(logger_mod, "LOG_LEVEL", "messages")
+    logger = SessionLogger("esc", base_dir=str(tmp_path), writer=FileLogWriter())
+    plan = Plan(intent=IntentName.check_balance, slots={}, missing_slots=[])
+    with logger.turn():
+        logger.step("planner", {"user_message": "hi"}, plan)
+        logger.escalate("execution_failed")
+    records = _records(tmp_path, "esc")
+    assert records[0]["payload"]["output"]["intent"] == "check_balance"
+    assert records[-1]["payload"] == {"message": "Turn logged in full", "reasons": ["execution_failed"]}
+
+    with logger.turn():
+        logger.step("planner", {"user_message": "hi"}, plan)
+    assert len(_records(tmp_path, "esc")) == 2
+
+
+def test_llm_fallback_escalates(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(logger_mod, "LOG_LEVEL", "messages")
+    AgentPipeline().process("hello there", session_id="fb")  # fake planner finds no intent
+    records = _records(tmp_path, "fb")
+    assert any(r["event"] == "agent_step" for r in records)
+    assert records[-1]["payload"]["reasons"] == ["fallback"]
+
+
+def test_write_time_is_observed_when_the_turn_is_flushed(monkeypatch, tmp_path):
+    monkeypatch.setattr(logger_mod, "LOG_LEVEL", "messages")
+    logger = SessionLogger("timed", base_dir=str(tmp_path), writer=FileLogWriter())
+    before = metrics.LOG_WRITE_SECONDS.count(backend="file")
+    with logger.turn():
+        logger.user_message("hi")
+        logger.step("planner", {"user_message": "hi"}, None)
+        logger.assistant_message("hello")
+        # Buffered records haven't reached the writer yet
+        assert metrics.LOG_WRITE_SECONDS.count(backend="file") == before
+    # One observation per record the writer got; the dropped step costs nothing
+    assert metrics.LOG_WRITE_SECONDS.count(backend="file") == before + 2
@@ -0,0 +1,116 @@
+import gzip
+import os
+
+import pytest
+
+from app.core.log_segments import SegmentLogWriter, SegmentStore
+from app.core.logger import SessionLogger
+
+
+class _Clock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _segments(root):
+    return sorted(
+        os.path.join(dirpath, name)
+        for dirpath, _, names in os.walk(root)
+        for name in names
+        if name.startswith("seg-")
+    )
+
+
+@pytest.mark.parametrize("codec", ["none", "gzip", "zstd"])
+def test_segment_writer_round_trips_sessions(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    store = SegmentStore(root=str(tmp_path / "segments"), codec=codec)
+    writer = SegmentLogWriter(store=store, max_records=1000, interval_ms=60_000)
+    a = SessionLogger("a", base_dir=str(tmp_path), writer=writer)
+    b = SessionLogger("b", base_dir=str(tmp_path), writer=writer)
+    a.user_message("hello")
+    b.user_message("other")
+    writer.flush()
+    a.assistant_message("hi")
+    writer.flush()
+
+    assert [r["event"] for r in writer.read_session("a")] == ["user_message", "assistant_message"]
+    assert [r["payload"]["message"] for r in writer.read_session("b")] == ["other"]
+    assert writer.read_session("missing") == []
+    # No per-session files, everything lives in one segment
+    assert not list(tmp_path.glob("session_*.jsonl"))
+    assert len(_segments(store.root)) == 1
+    writer.close()
+
+
+def test_gzip_segments_are_plain_concatenated_members(tmp_path):
+    store = SegmentStore(root=str(tmp_path), codec="gzip")
+    store.append({"a": [b'{"n":1}'], "b": [b'{"n":2}']})
+    store.append({"a": [b'{"n":3}']})
+    (path,) = _segments(tmp_path)
+    with open(path, "rb") as f:
+        assert gzip.decompress(f.read()) == b'{"n":1}\n{"n":2}\n{"n":3}\n'
+    assert store.read_session("a") == [{"n": 1}, {"n": 3}]
+    store.close()
+
+
+def test_segments_rotate_by_size_and_time_bucket(tmp_path):
+    clock = _Clock(7200.0)
+    store = SegmentStore(root=str(tmp_path), codec="none", max_bytes=64, bucket_s=3600, clock=clock)
+    line = b'{"pad":"' + b"x" * 40 + b'"}'
+    for _ in range(3):
+        store.append({"s": [line]})
+    assert len(_segments(tmp_path)) == 3
+
+    clock.now += 3600
+    store.append({"s": [line]})
+    buckets = {os.path.basename(os.path.dirname(p)) for p in _segments(tmp_path)}
+    assert buckets == {"19700101T020000", "19700101T030000"}
+    assert len(store.read_session("s")) == 4
+    store.close()
+
+
+def test_purge_before_drops_old_buckets_and_index_rows(tmp_path):
+    clock = _Clock(0.0)
+    store = SegmentStore(root=str(tmp_path), codec="gzip", bucket_s=60, clock=clock)
+    store.append({"old": [b'{"n":1}']})
+    clock.now = 600.0
+    store.append({"new": [b'{"n":2}']})
+
+    assert store.purge_before(300.0) == 1
+    assert store.read_session("old") == []
+    assert store.read_session("new") == [{"n": 2}]
+    assert len(_segments(tmp_path)) == 1
+    store.close()
+
+
+def test_index_survives_reopen(tmp_path):
+    store = SegmentStore(root=str(tmp_path), codec="gzip")
+    store.append({"s": [b'{"n":1}']})
+    store.close()
+
+    reopened = SegmentStore(root=str(tmp_path), codec="gzip")
+    reopened.append({"s": [b'{"n":2}']})
+    assert reopened.read_session("s") == [{"n": 1}, {"n": 2}]
+    assert len(_segments(tmp_path)) == 2
+    reopened.close()
+
+
+def test_processes_sharing_a_root_never_share_a_segment(tmp_path, monkeypatch):
+    clock = _Clock(7200.0)
+    # Two workers rolling over into the same bucket at once: both list the bucket before either creates a segment
+    monkeypatch.setattr(os, "listdir", lambda path: [])
+    first = SegmentStore(root=str(tmp_path), codec="gzip", clock=clock)
+    second = SegmentStore(root=str(tmp_path), codec="gzip", clock=clock)
+    first.append({"a": [b'{"n":1}']})
+    second.append({"b": [b'{"n":2}', b'{"n":3}']})
+    first.append({"a": [b'{"n":4}']})
+    assert len(_segments(tmp_path)) == 2
+    assert first.read_session("a") == second.read_session("a") == [{"n": 1}, {"n": 4}]
+    assert first.read_session("b") == [{"n": 2}, {"n": 3}]
+    first.close()
+    second.close()
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+
+from app.core.logger import BufferedLogWriter, SessionLogger
+
+
+def _read_events(path):
+    return [json.loads(line)["event"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_buffered_writer_holds_records_until_flush(tmp_path):
+    writer = BufferedLogWriter(max_records=1000, interval_ms=60_000)
+    logger = SessionLogger("s1", base_dir=str(tmp_path), writer=writer)
+    logger.user_message("hello")
+    logger.assistant_message("hi")
+    log_file = tmp_path / "session_s1.jsonl"
+    assert not log_file.exists()
+
+    writer.flush()
+    assert _read_events(log_file) == ["user_message", "assistant_message"]
+    writer.close()
+
+
+def test_buffered_writer_flushes_on_size_threshold(tmp_path):
+    writer = BufferedLogWriter(max_records=3, interval_ms=60_000)
+    logger = SessionLogger("s2", base_dir=str(tmp_path), writer=writer)
+    for i in range(3):
+        logger.info("tick", i=i)
+    log_file = tmp_path / "session_s2.jsonl"
+    deadline = time.monotonic() + 2
+    while not log_file.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _read_events(log_file) == ["info", "info", "info"]
+    writer.close()
+
+
+def test_buffered_writer_flushes_on_interval_and_close(tmp_path):
+    writer = BufferedLogWriter(max_records=1000, interval_ms=20)
+    a = SessionLogger("a", base_dir=str(tmp_path), writer=writer)
+    b = SessionLogger("b", base_dir=str(tmp_path), writer=writer)
+    a.user_message("one")
+    deadline = time.monotonic() + 2
+    while not (tmp_path / "session_a.jsonl").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (tmp_path / "session_a.jsonl").exists()
+
+    b.state_transition("idle", "executing")
+    writer.close()
+    assert _read_events(tmp_path / "session_b.jsonl") == ["state_transition"]
+    # Writes after shutdown go straight to disk
+    b.info("late")
+    assert _read_events(tmp_path / "session_b.jsonl") == ["state_transition", "info"]
+
+
+def test_buffered_writer_survives_a_failed_batch(tmp_path):
+    writer = BufferedLogWriter(max_records=1000, interval_ms=20)
+    write_batch, failures = writer._write_batch, []
+
+    def flaky(batch):
+        if not failures:
+            failures.append(len(batch))
+            raise OSError("disk full")
+        write_batch(batch)
+
+    writer._write_batch = flaky
+    logger = SessionLogger("f", base_dir=str(tmp_path), writer=writer)
+    logger.info("lost")
+    deadline = time.monotonic() + 2
+    while not failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    logger.info("kept")
+    while not (tmp_path / "session_f.jsonl").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer._thread.is_alive()
+    assert writer.dropped == 1
+    assert [json.loads(line)["payload"]["message"] for line in (tmp_path / "session_f.jsonl").read_text().splitlines()] == ["kept"]
+    writer.close()
+
+
+def test_buffered_writer_drops_records_beyond_max_pending(tmp_path):
+    writer = BufferedLogWriter(max_records=2, interval_ms=60_000, max_pending=2)
+    write_batch, writing, release = writer._write_batch, threading.Event(), threading.Event()
+
+    def stalled(batch):
+        writing.set()
+        release.wait(2)
+        write_batch(batch)
+
+    writer._write_batch = stalled
+    logger = SessionLogger("p", base_dir=str(tmp_path), writer=writer)
+    logger.info("a")
+    logger.info("b")
+    assert writing.wait(2)
+    # The flush thread is stuck on the first batch: two more fit, the rest are dropped
+    for message in ("c", "d", "e", "f"):
+        logger.info(message)
+    assert writer.dropped == 2
+    release.set()
+    writer.close()
+    assert [json.loads(line)["payload"]["message"] for line in (tmp_path / "session_p.jsonl").read_text().splitlines()] == ["a", "b", "c", "d"]
+
+
+def test_models_are_serialized_lazily_once_per_turn(tmp_path):
+    from app.core.logger import FileLogWriter
+    from app.core.types import IntentName, Plan
+
+    plan = Plan(intent=IntentName.check_balance, slots={"account_number": "123456"}, missing_slots=["auth_token"])
+    for writer in (FileLogWriter(), BufferedLogWriter(max_records=1000, interval_ms=60_000)):
+        lazy = SessionLogger("lazy", base_dir=str(tmp_path / writer.name), writer=writer)
+        eager = SessionLogger("eager", base_dir=str(tmp_path / writer.name), writer=writer)
+        for name in ("planner", "reviewer", "responder"):
+            lazy.step(name, {"plan": plan}, plan)
+            eager.step(name, {"plan": plan.model_dump()}, plan.model_dump())
+        writer.flush()
+
+        def payloads(sid):
+            lines = (tmp_path / writer.name / f"session_{sid}.jsonl").read_text(encoding="utf-8").splitlines()
+            return [json.loads(line)["payload"] for line in lines]
+
+        assert payloads("lazy") == payloads("eager")
+        memo = writer.memo if isinstance(writer, FileLogWriter) else writer
+        assert memo.serializations == 1
+        writer.close()
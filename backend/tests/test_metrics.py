@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+import app.core.pipeline as pipeline_mod
+from app.core import metrics
+from app.core.metrics import Histogram, Registry
+from app.core.pipeline import AgentPipeline
+from app.main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.register(Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, stage='plan"ner')
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="plan\\"ner",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="plan\\"ner",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="plan\\"ner",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="plan\\"ner"} 3' in text
+
+
+def test_pipeline_records_stage_and_turn_latency(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    labels = dict(mode="rule", intent="transfer_money")
+    before = {s: metrics.STAGE_SECONDS.count(stage=s, **labels) for s in ("planner", "plan_review", "execution", "execution_review", "responder")}
+    turns_before = metrics.TURN_SECONDS.count(outcome="completed", **labels)
+
+    AgentPipeline().process("transfer 10 from 111111 to 222222")
+
+    for s, n in before.items():
+        assert metrics.STAGE_SECONDS.count(stage=s, **labels) == n + 1, s
+    assert metrics.TURN_SECONDS.count(outcome="completed", **labels) == turns_before + 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    client = TestClient(app)
+    client.post("/chat", json={"message": "Please replace my card"})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'agent_turn_seconds_count{mode="rule",intent="card_replace",outcome="clarification"}' in body
+    assert "session_log_write_seconds_bucket" in body
+    assert "agent_sessions_size" in body and "llm_cache_hit_rate" in body and "agent_routing_rule_share" in body
@@ -1,5 +1,7 @@
 from app.core.nlu import detect_intent, extract_slots
 from app.core.types import IntentName
+from benchmarks import legacy_nlu
+from benchmarks.nlu_corpus import generate_corpus
 
 
 def test_detect_intent_card_replace():
@@ -29,4 +31,12 @@ def test_extract_slots_transfer():
     slots, missing = extract_slots(intent, text)
     assert slots["sender_account"] == "111111"
     assert slots["receiver_account"] == "222222"
-    assert slots["amount"] == "25" 
\ No newline at end of file
+    assert slots["amount"] == "25"
+
+
+def test_compiled_nlu_matches_legacy_on_generated_corpus():
+    intents = [None, *IntentName]
+    for text in generate_corpus(5000):
+        assert detect_intent(text) == legacy_nlu.detect_intent(text), text
+        for intent in intents:
+            assert extract_slots(intent, text) == legacy_nlu.extract_slots(intent, text), (intent, text)
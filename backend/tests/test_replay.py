@@ -0,0 +1,101 @@
+import app.agents.planner as planner_mod
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+from app.agents_llm.executioner_llm import _execution_prompt
+from app.agents_llm.fallback_agent_llm import _fallback_prompt
+from app.agents_llm.planner_llm import LLMPlanner
+from app.agents_llm.responder_llm import _summary_prompt
+from app.agents_llm.reviewer_llm import LLMReviewer
+from app.core.logger import flush_logs
+from app.core.pipeline import AgentPipeline
+from app.core.replay import read_sessions, recorded_responses, replay
+from app.core.types import ExecutionResult, IntentName, Plan
+from app.llm.bedrock import clear_clients
+from app.llm.fake import ReplayChatModel, prompt_agent
+
+SESSIONS = [
+    ["Please replace my card", "credit", "ship to 123 Main St", "it's lost"],
+    ["transfer 10 from 111111 to 222222"],
+    ["check balance for account 123456 token ABCD", "hello", "cancel"],
+]
+
+
+def _record(tmp_path, monkeypatch, llm=False):
+    logs = tmp_path / "recorded"
+    monkeypatch.setenv("LOGS_DIR", str(logs))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", llm)
+    if llm:
+        monkeypatch.setenv("LLM_BACKEND", "fake")
+        monkeypatch.setattr(executioner_llm, "LLM_TOOL_AVAILABILITY", 1.0)
+        clear_clients()
+    pipe = AgentPipeline()
+    for i, messages in enumerate(SESSIONS):
+        for message in messages:
+            pipe.process(message, session_id=f"s{i}")
+    flush_logs()
+    clear_clients()
+    return str(logs)
+
+
+def test_replay_of_unchanged_code_matches_every_turn(tmp_path, monkeypatch):
+    logs = _record(tmp_path, monkeypatch)
+    report = replay(logs, workers=2)
+    assert report["sessions"] == 3 and report["turns"] == 8 and report["llm_sessions"] == 0
+    assert report["turn_match_rate"] == 1.0 and report["mismatches"] == 0
+    assert report["field_accuracy"]["slots"] == 1.0 and report["turns_per_s"] > 0
+
+
+def test_replay_reports_regressions_in_changed_code(tmp_path, monkeypatch):
+    logs = _record(tmp_path, monkeypatch)
+    # A "changed NLU" that no longer recognises transfers; forked workers inherit it
+    detect = planner_mod.detect_intent
+    monkeypatch.setattr(planner_mod, "detect_intent", lambda t: None if "transfer" in t else detect(t))
+    report = replay(logs, workers=2)
+    fields = {(d["message"], d["field"]) for d in report["diffs"]}
+    assert ("transfer 10 from 111111 to 222222", "intent") in fields
+    assert report["field_accuracy"]["intent"] < 1.0 and report["turn_match_rate"] < 1.0
+
+
+def test_llm_sessions_replay_offline_from_recorded_responses(tmp_path, monkeypatch):
+    logs = _record(tmp_path, monkeypatch, llm=True)
+    sessions = read_sessions(logs)
+    assert all(s.llm for s in sessions)
+    transfer = sessions[1].turns[0].responses
+    assert set(transfer) == {"planner", "plan_review", "execution_review", "executioner", "responder"}
+
+    monkeypatch.setenv("LLM_BACKEND", "bedrock")
+    report = replay(logs, workers=2)
+    assert report["llm_sessions"] == 3 and report["llm_unrecorded_calls"] == 0
+    # planner, plan review, executioner, execution review and responder for each completed turn
+    assert report["llm_recorded_calls"] >= 5 * 3
+    assert report["turn_match_rate"] == 1.0
+
+
+def test_recorded_responses_skip_rule_based_clarification_questions():
+    plan = {"intent": "card_replace", "slots": {"card_type": None}, "missing_slots": ["card_type"]}
+    records = [
+        {"event": "agent_step", "payload": {"name": "planner_llm", "input": {}, "output": plan}},
+        {"event": "state_transition", "payload": {"from": "idle", "to": "awaiting_clarification"}},
+        {"event": "assistant_message", "payload": {"message": "Which card type?"}},
+    ]
+    assert recorded_responses(records) == {"planner": {"intent": "card_replace", "slots": {"card_type": None}}}
+
+
+def test_every_llm_prompt_maps_to_its_agent():
+    plan = Plan(intent=IntentName.check_balance, slots={}, missing_slots=[])
+    result = ExecutionResult(success=True, data={})
+    model = ReplayChatModel()
+    planner, reviewer = LLMPlanner(None, llm=model), LLMReviewer(None, llm=model)
+    prompts = {
+        "planner": planner._prompt("what's my balance"),
+        "plan_review": reviewer._plan_prompt(plan),
+        "execution_review": reviewer._exec_prompt(plan, result),
+        "executioner": _execution_prompt(plan),
+        "responder": _summary_prompt(result),
+        "fallback": _fallback_prompt("hi", "no intent"),
+    }
+    assert {agent: prompt_agent(p) for agent, p in prompts.items()} == {agent: agent for agent in prompts}
+    model.load({"responder": "Recorded reply"})
+    assert model.invoke([{"role": "user", "content": prompts["responder"]}]).content == "Recorded reply"
+    model.invoke([{"role": "user", "content": prompts["fallback"]}])
+    assert model.misses == 1
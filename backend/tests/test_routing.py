@@ -0,0 +1,61 @@
+import asyncio
+
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.core.routing import HybridRouter, rule_confidence
+from app.core.types import IntentName, Plan
+
+
+def test_rule_confidence_weighs_intent_and_slot_coverage():
+    assert rule_confidence(None, {}) == 0.0
+    assert rule_confidence(IntentName.check_balance, {}) == 0.5
+    assert rule_confidence(IntentName.check_balance, {"account_number": "123456"}) == 0.75
+    full = {"sender_account": "111111", "receiver_account": "222222", "amount": "10"}
+    assert rule_confidence(IntentName.transfer_money, full) == 1.0
+
+
+def test_router_scores_clarification_replies_against_pending_plan():
+    router = HybridRouter()
+    pending = Plan(
+        intent=IntentName.card_replace,
+        slots={"card_type": "credit", "delivery_address": "123 Main St", "reason": None},
+        missing_slots=["reason"],
+    )
+    assert router.route("it's lost", pending) == "rule"
+    assert router.route("it's lost") == "llm"
+    assert router.route("transfer 10 from 111111 to 222222") == "rule"
+    assert router.stats() == {"rule_turns": 2, "llm_turns": 1, "rule_share": 0.6667, "llm_calls_avoided_est": 10}
+
+
+def test_hybrid_mode_keeps_confident_turns_off_the_llm(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(pipeline_mod, "LLM_ROUTING", "hybrid")
+    pipe = AgentPipeline()
+    llm_turns = []
+
+    class DummyPlanner:
+        def run(self, msg):
+            llm_turns.append(msg)
+            return Plan(intent=None, slots={}, missing_slots=[], rationale="")
+
+        async def arun(self, msg):
+            return self.run(msg)
+
+    async def afallback(user, reason):
+        return f"FB: {reason}"
+
+    monkeypatch.setattr(pipe, "_get_agents", lambda logger: (DummyPlanner(), None, None, None, lambda u, r: f"FB: {r}"))
+    monkeypatch.setattr(pipe, "_get_async_agents", lambda logger: (DummyPlanner(), None, None, None, afallback))
+
+    r = pipe.process("transfer 10 from 111111 to 222222")
+    assert r.awaiting_user is False and r.intent == IntentName.transfer_money
+    r = asyncio.run(pipe.aprocess("check balance for account 123456 token ABCD"))
+    assert r.awaiting_user is False and r.intent == IntentName.check_balance
+    assert llm_turns == []
+
+    r = pipe.process("I need help with something")
+    assert r.messages[-1].content.startswith("FB:")
+    assert llm_turns == ["I need help with something"]
+    stats = pipe.routing_stats()
+    assert stats["rule_turns"] == 2 and stats["llm_turns"] == 1
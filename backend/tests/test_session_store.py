@@ -0,0 +1,59 @@
+from app.core.pipeline import AgentPipeline, SessionContext, _is_awaiting_clarification
+from app.core.session_store import LRUSessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used_over_cap():
+    store = LRUSessionStore(max_sessions=2, idle_ttl_s=0)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert store.get("a") == 1  # a becomes most recent
+    store.put("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1 and store.get("c") == 3
+    assert store.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_lru_idle_ttl_expires_entries():
+    clock = FakeClock()
+    evicted = []
+    store = LRUSessionStore(max_sessions=10, idle_ttl_s=60, clock=clock, on_evict=lambda k, v: evicted.append(k))
+    store.put("a", 1)
+    clock.now = 30
+    store.put("b", 2)
+    clock.now = 61
+    store.put("c", 3)  # sweep drops "a"
+    assert evicted == ["a"]
+    clock.now = 200
+    assert store.get("b") is None
+    assert len(store) == 1
+
+
+def test_lru_prefers_evicting_unprotected_sessions():
+    store = LRUSessionStore(max_sessions=2, idle_ttl_s=0, is_protected=lambda v: v == "awaiting")
+    store.put("waiting", "awaiting")
+    store.put("done", "idle")
+    store.put("new", "idle")
+    assert store.get("waiting") == "awaiting"
+    assert store.get("done") is None
+
+
+def test_pipeline_keeps_clarification_sessions_under_pressure():
+    store = LRUSessionStore(max_sessions=2, idle_ttl_s=0, is_protected=_is_awaiting_clarification)
+    pipe = AgentPipeline(session_store=store)
+    r1 = pipe.process("Please replace my card")
+    assert r1.awaiting_user is True
+    for _ in range(5):
+        pipe.process("transfer 10 from 111111 to 222222")
+    assert len(store) == 2
+    r2 = pipe.process("credit, ship to 123 Main St, it's lost", session_id=r1.session_id)
+    assert r2.awaiting_user is False
+    assert pipe.session_stats()["evictions"] == 4
+    assert isinstance(store.get(r1.session_id), SessionContext)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.core.types import ExecutionResult, Plan
+
+DELAY = 0.1
+MEET_TIMEOUT_S = 5.0
+
+
+class Rendezvous:
+    """Plan review and execution both block here until the other has arrived,
+    so a turn only finishes if the two really ran concurrently."""
+
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=MEET_TIMEOUT_S)
+        self.arrived = 0
+        self.both = None
+
+    def meet(self):
+        time.sleep(DELAY)
+        self.barrier.wait()
+
+    async def ameet(self):
+        await asyncio.sleep(DELAY)
+        if self.both is None:
+            self.both = asyncio.Event()
+        self.arrived += 1
+        if self.arrived == 2:
+            self.both.set()
+        await asyncio.wait_for(self.both.wait(), MEET_TIMEOUT_S)
+
+
+class Sleep:
+    def meet(self):
+        time.sleep(DELAY)
+
+    async def ameet(self):
+        await asyncio.sleep(DELAY)
+
+
+class DummyPlanner:
+    def __init__(self, intent):
+        self.intent = intent
+
+    def run(self, msg):
+        return Plan(intent=self.intent, slots={}, missing_slots=[], rationale="")
+
+    async def arun(self, msg):
+        return self.run(msg)
+
+
+class DummyReviewer:
+    def __init__(self, approve, meeting):
+        self.approve = approve
+        self.meeting = meeting
+
+    def review_plan(self, plan):
+        self.meeting.meet()
+        class R: approved = self.approve; score = 9.0
+        return R()
+
+    async def areview_plan(self, plan):
+        await self.meeting.ameet()
+        class R: approved = self.approve; score = 9.0
+        return R()
+
+    def review_execution(self, plan, exec_result):
+        class R: approved = True; score = 9.0
+        return R()
+
+    async def areview_execution(self, plan, exec_result):
+        return self.review_execution(plan, exec_result)
+
+
+def _agents(pipe, monkeypatch, intent, approve, meeting=None):
+    executed = []
+    meeting = meeting or Sleep()
+
+    def exec_ok(plan):
+        meeting.meet()
+        executed.append(plan.intent)
+        return ExecutionResult(success=True, data={"ok": True})
+
+    async def aexec_ok(plan):
+        await meeting.ameet()
+        executed.append(plan.intent)
+        return ExecutionResult(success=True, data={"ok": True})
+
+    async def arespond(result):
+        return "All done!"
+
+    async def afallback(user, reason):
+        return f"FB: {reason}"
+
+    agents = (DummyPlanner(intent), DummyReviewer(approve, meeting), exec_ok, lambda r: "All done!", lambda u, r: f"FB: {r}")
+    async_agents = (DummyPlanner(intent), DummyReviewer(approve, meeting), aexec_ok, arespond, afallback)
+    monkeypatch.setattr(pipe, "_get_agents", lambda logger: agents)
+    monkeypatch.setattr(pipe, "_get_async_agents", lambda logger: async_agents)
+    return executed
+
+
+def _speculative_mode(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(pipeline_mod, "SPECULATIVE_EXECUTION", True)
+    monkeypatch.setattr(pipeline_mod, "SPECULATIVE_EXCLUDED_INTENTS", {"transfer_money"})
+
+
+def test_speculative_overlaps_review_and_execution(monkeypatch, tmp_path):
+    _speculative_mode(monkeypatch, tmp_path)
+    pipe = AgentPipeline()
+    executed = _agents(pipe, monkeypatch, "check_balance", approve=True, meeting=Rendezvous())
+    r = pipe.process("check my balance")
+    assert r.messages[-1].content == "All done!" and executed == ["check_balance"]
+
+    executed = _agents(pipe, monkeypatch, "check_balance", approve=True, meeting=Rendezvous())
+    r = asyncio.run(pipe.aprocess("check my balance"))
+    assert r.messages[-1].content == "All done!" and executed == ["check_balance"]
+
+
+def test_speculative_result_discarded_when_review_rejects(monkeypatch, tmp_path):
+    _speculative_mode(monkeypatch, tmp_path)
+    pipe = AgentPipeline()
+    executed = _agents(pipe, monkeypatch, "check_balance", approve=False)
+    r = pipe.process("check my balance")
+    assert executed  # ran speculatively ...
+    assert r.messages[-1].content.startswith("FB: Plan review failed")  # ... but never surfaced
+    assert r.execution_review_score is None
+
+
+def test_excluded_intents_are_never_speculated(monkeypatch, tmp_path):
+    _speculative_mode(monkeypatch, tmp_path)
+    pipe = AgentPipeline()
+    executed = _agents(pipe, monkeypatch, "transfer_money", approve=False)
+    r = pipe.process("send money")
+    r2 = asyncio.run(pipe.aprocess("send money"))
+    assert executed == []
+    assert all(x.messages[-1].content.startswith("FB:") for x in (r, r2))
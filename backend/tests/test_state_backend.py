@@ -0,0 +1,198 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.core.state_backend import (
+    IDLE_STATE,
+    MemoryStateBackend,
+    RedisStateBackend,
+    SessionMemory,
+    SqliteStateBackend,
+    StateConflict,
+    WatchError,
+    decode_memory,
+    encode_memory,
+)
+from app.core.types import IntentName, Plan, SessionState
+
+
+class FakeRedis:
+    """Just enough of redis-py for RedisStateBackend: get/set/delete and WATCH/MULTI/EXEC pipelines."""
+
+    def __init__(self):
+        self.data = {}
+        self.writes = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.writes[key] = self.writes.get(key, 0) + 1
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.watched = {}
+        self.queued = []
+
+    def watch(self, key):
+        self.watched[key] = self.redis.writes.get(key, 0)
+
+    def get(self, key):
+        return self.redis.get(key)
+
+    def multi(self):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.queued.append((key, value, ex))
+
+    def execute(self):
+        if any(self.redis.writes.get(k, 0) != n for k, n in self.watched.items()):
+            raise WatchError()
+        for key, value, ex in self.queued:
+            self.redis.set(key, value, ex)
+
+    def reset(self):
+        self.watched, self.queued = {}, []
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStateBackend()
+    elif request.param == "sqlite":
+        b = SqliteStateBackend(str(tmp_path / "state.db"))
+        yield b
+        b.close()
+    else:
+        yield RedisStateBackend(FakeRedis())
+
+
+@pytest.fixture(autouse=True)
+def _rule_mode(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+
+
+def test_encoding_round_trips_and_is_compact():
+    plan = Plan(
+        intent=IntentName.card_replace,
+        slots={"card_type": "credit", "delivery_address": None, "reason": None},
+        missing_slots=["delivery_address", "reason"],
+        rationale="r",
+    )
+    memory = SessionMemory(state=SessionState.awaiting_clarification, plan=plan)
+    data = encode_memory(memory)
+    assert decode_memory(data) == memory
+    assert data == b'["awaiting_clarification","card_replace",["credit",null,null],6,"r"]'
+    assert len(data) < len(plan.model_dump_json()) / 2
+
+    odd = Plan(intent=IntentName.transfer_money, slots={"amount": "5"}, missing_slots=["receiver_account", "amount"])
+    assert decode_memory(encode_memory(SessionMemory(SessionState.idle, odd))).plan == odd
+    assert decode_memory(IDLE_STATE) == SessionMemory(state=SessionState.idle, plan=None)
+
+
+def test_save_is_check_and_set(backend):
+    assert backend.load("s") is None
+    assert backend.save("s", b"one", 0) == 1
+    with pytest.raises(StateConflict):
+        backend.save("s", b"stale", 0)
+    assert backend.save("s", b"two", 1) == 2
+    with pytest.raises(StateConflict):
+        backend.save("s", b"stale", 1)
+    assert backend.load("s") == (b"two", 2)
+    assert backend.stats() == {"loads": 2, "saves": 2, "conflicts": 2}
+    backend.delete("s")
+    assert backend.load("s") is None
+
+
+def test_redis_save_conflicts_when_key_changes_under_watch():
+    redis = FakeRedis()
+    backend = RedisStateBackend(redis)
+    backend.save("s", b"one", 0)
+
+    class Racing(FakePipeline):
+        def multi(self):
+            redis.set("agentic:state:s", b"2|other")
+
+    redis.pipeline = lambda: Racing(redis)
+    with pytest.raises(StateConflict):
+        backend.save("s", b"two", 1)
+    assert redis.get("agentic:state:s") == b"2|other"
+
+
+def test_clarification_continues_on_another_worker(backend):
+    worker_a, worker_b = AgentPipeline(state_backend=backend), AgentPipeline(state_backend=backend)
+    r1 = worker_a.process("Please replace my card")
+    assert r1.awaiting_user is True
+    r2 = worker_b.process("credit, ship to 123 Main St, it's lost", session_id=r1.session_id)
+    assert r2.awaiting_user is False and r2.intent == IntentName.card_replace
+    # The completed turn cleared the plan for every worker
+    r3 = worker_a.process("credit", session_id=r1.session_id)
+    assert r3.intent is None
+
+
+def test_sqlite_state_survives_restart(tmp_path):
+    path = str(tmp_path / "state.db")
+    r1 = AgentPipeline(state_backend=SqliteStateBackend(path)).process("Please replace my card")
+    restarted = AgentPipeline(state_backend=SqliteStateBackend(path))
+    r2 = restarted.process("credit, ship to 123 Main St, it's lost", session_id=r1.session_id)
+    assert r2.awaiting_user is False
+
+
+def test_one_load_and_at_most_one_save_per_turn_besides_the_execution_claim():
+    backend = MemoryStateBackend()
+    pipe = AgentPipeline(state_backend=backend)
+    sid = pipe.process("Please replace my card").session_id  # idle -> awaiting: saved
+    pipe.process("credit", session_id=sid)  # still awaiting, slot added: saved
+    pipe.process("ship to 123 Main St, it's lost", session_id=sid)  # claimed as executing, back to idle: saved
+    pipe.process("transfer 10 from 111111 to 222222", session_id=sid)  # claimed as executing, back to idle: saved
+    assert backend.stats() == {"loads": 4, "saves": 6, "conflicts": 0}
+
+
+class RacingBackend(MemoryStateBackend):
+    """Another worker saves the session right after this worker loads it."""
+
+    def load(self, session_id):
+        loaded = super().load(session_id)
+        MemoryStateBackend.save(self, session_id, IDLE_STATE, loaded[1] if loaded else 0)
+        return loaded
+
+
+def test_concurrent_update_is_rejected_with_409(monkeypatch):
+    import app.main as main_mod
+
+    backend = RacingBackend()
+    with pytest.raises(StateConflict):
+        AgentPipeline(state_backend=backend).process("Please replace my card", session_id="s")
+
+    monkeypatch.setattr(main_mod.pipeline, "_state", RacingBackend())
+    r = TestClient(main_mod.app).post("/chat", json={"message": "Please replace my card", "session_id": "s2"})
+    assert r.status_code == 409
+    assert r.json()["session_id"] == "s2"
+
+
+def test_conflicting_turns_fail_before_executing():
+    pipe = AgentPipeline(state_backend=RacingBackend())
+    executed = []
+    get_rule_agents = pipe._get_rule_agents
+
+    def rule_agents(logger):
+        agents = get_rule_agents(logger)
+        agents[2].run = executed.append
+        return agents
+
+    pipe._get_rule_agents = rule_agents
+    with pytest.raises(StateConflict):
+        pipe.process("transfer 10 from 111111 to 222222", session_id="s")
+    assert executed == []
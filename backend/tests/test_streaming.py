@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+
+import app.agents_llm.executioner_llm as executioner_llm
+import app.core.pipeline as pipeline_mod
+from app.core.pipeline import AgentPipeline
+from app.core.state_backend import MemoryStateBackend, decode_memory
+from app.core.types import IntentName, Plan, SessionState
+from app.llm.bedrock import clear_clients
+from app.llm.fake import FakeChatModel
+from app.llm.governor import LLMGovernor, set_governor
+from app.main import app
+
+
+def _collect(pipe, message, session_id=None):
+    async def run():
+        return [e async for e in pipe.astream(message, session_id=session_id)]
+
+    return asyncio.run(run())
+
+
+def _llm_mode(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", True)
+    monkeypatch.setattr(executioner_llm.random, "random", lambda: 0.0)  # tool always available
+    clear_clients()
+
+
+def test_fake_astream_tokens_concatenate_to_reply():
+    async def run():
+        return [c.content async for c in FakeChatModel().astream([{"role": "user", "content": "hi there"}])]
+
+    tokens = asyncio.run(run())
+    assert "".join(tokens) == "Okay."
+
+
+def test_astream_emits_stages_then_tokens_then_done(monkeypatch, tmp_path):
+    _llm_mode(monkeypatch, tmp_path)
+    pipe = AgentPipeline()
+
+    async def fake_plan_run(self, user_message):
+        from app.core.types import IntentName, Plan
+
+        return Plan(intent=IntentName.check_balance, slots={"account_number": "123456", "auth_token": "abcd"}, missing_slots=[])
+
+    monkeypatch.setattr(pipeline_mod.LLMPlanner, "arun", fake_plan_run)
+    events = _collect(pipe, "check balance 123456 token abcd")
+    names = [e["event"] for e in events]
+    assert names[:4] == ["plan", "plan_review", "execution", "execution_review"]
+    assert names[-1] == "done" and "token" in names
+    tokens = "".join(e["data"]["text"] for e in events if e["event"] == "token")
+    done = events[-1]["data"]
+    assert done["messages"][-1]["content"] == tokens.strip() == "All set!"
+    assert done["awaiting_user"] is False
+
+
+def test_astream_rule_mode_only_emits_done(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline_mod, "USE_LLM", False)
+    events = _collect(AgentPipeline(), "Please replace my card")
+    assert [e["event"] for e in events] == ["done"]
+    assert events[0]["data"]["missing_slots"]
+
+
+def test_chat_stream_endpoint_sse_format(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path))
+    r = TestClient(app).post("/chat/stream", json={"message": "I lost my card"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in r.text.split("\n\n") if f]
+    event, data = frames[-1].split("\n")
+    assert event == "event: done"
+    assert "session_id" in json.loads(data[len("data: "):])
+
+
+@pytest.mark.parametrize("engine", ["inline", "graph"])
+@pytest.mark.parametrize("streamed", [0, 1])
+def test_failed_stream_falls_back_to_the_rule_responder(monkeypatch, tmp_path, engine, streamed):
+    _llm_mode(monkeypatch, tmp_path)
+    monkeypatch.setattr(pipeline_mod, "PIPELINE_ENGINE", engine)
+    governor = LLMGovernor()
+    set_governor(governor)
+
+    async def fake_plan_run(self, user_message):
+        return Plan(intent=IntentName.check_balance, slots={"account_number": "123456", "auth_token": "abcd"}, missing_slots=[])
+
+    async def broken_astream(self, messages, **_):
+        for _ in range(streamed):
+            yield AIMessageChunk(content="All ")
+        raise RuntimeError("stream dropped")
+
+    monkeypatch.setattr(pipeline_mod.LLMPlanner, "arun", fake_plan_run)
+    monkeypatch.setattr(FakeChatModel, "astream", broken_astream)
+    backend = MemoryStateBackend()
+    pipe = AgentPipeline(state_backend=backend)
+    try:
+        events = _collect(pipe, "check balance 123456 token abcd", session_id="s1")
+    finally:
+        set_governor(None)
+    tokens = [e["data"]["text"] for e in events if e["event"] == "token"]
+    done = events[-1]["data"]
+    assert events[-1]["event"] == "done" and done["awaiting_user"] is False
+    # The governor saw the stream fail, and the turn still completed and released the session
+    assert governor.counts.get("error") == 1
+    assert decode_memory(backend.load("s1")[0]).state == SessionState.idle
+    if streamed:
+        assert tokens == ["All "]
+    else:
+        assert tokens == [done["messages"][-1]["content"]] and tokens[0] != "All set!"